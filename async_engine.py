@@ -0,0 +1,608 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+from batch_jobs import fixed_listing_pages
+from engine_base import (DOWNLOAD_HEADERS, PAGE_HEADERS, DownloadJob, EngineBase, MirrorFailover, RangeNotSatisfied,
+                         RecentLinks)
+from integrity import IntegrityError, ZipHeadCheck, hash_prefix
+from metrics import format_bytes
+from mirror_stats import MirrorTooSlow
+from page_parser import parse_download_mirrors, parse_gallery_page, parse_listing_page
+from resume_state import (discard_partial, load_resume_state, parse_content_range_total, partial_size,
+                          resume_validator, save_resume_state)
+from scheduler import AsyncDownloadScheduler
+from transfer import ProgressThrottle, preallocate
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 為選用套件，未安裝時只能使用執行緒版引擎
+    aiohttp = None
+
+AIOHTTP_AVAILABLE = aiohttp is not None
+
+# 同時解析漫畫頁的協程數、同時抓取的列表頁數，以及整體/每個主機的連線池上限
+PAGE_CONCURRENCY = 64
+LISTING_CONCURRENCY = 8
+CONNECTION_LIMIT = 256
+CONNECTION_LIMIT_PER_HOST = 32
+
+# 各階段之間的佇列容量 (滿了就讓上游等待)
+MANGA_QUEUE_SIZE = 500
+DOWNLOAD_QUEUE_SIZE = 50     # 下載排程只在這個範圍內排序
+
+# 等待失敗工作退避時間時的檢查間隔 (秒)
+RETRY_POLL_INTERVAL = 0.5
+
+class AsyncDownloadEngine(EngineBase):
+    """asyncio 版下載引擎：列表頁 → 漫畫頁 → 下載頁 → 檔案，全部在單一事件迴圈中進行
+    
+    共用的建構參數與進度回呼見 EngineBase；page_concurrency 為同時解析漫畫頁的協程數
+    """
+    
+    def __init__(self, base_url, start_page, end_page, output_folder, max_workers,
+                 page_concurrency=PAGE_CONCURRENCY, listing_concurrency=LISTING_CONCURRENCY, **options):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("asyncio 引擎需要安裝 aiohttp")
+        super().__init__(base_url, start_page, end_page, output_folder, max_workers,
+                         listing_concurrency=listing_concurrency, **options)
+        self.page_concurrency = page_concurrency
+        self.job_finished = asyncio.Event()  # 有漫畫完成時通知等待重試的生產者
+        self.session = None
+        self._loop = None
+        self._task = None
+        self._lock = threading.Lock()
+    
+    def cancel(self):
+        """可從任何執行緒呼叫：取消整個執行，包含進行中的請求"""
+        super().cancel()
+        with self._lock:
+            if self._loop is not None and self._task is not None:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+    
+    def http_error_status(self, error):
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status
+        return None
+    
+    async def fetch(self, url, kind):
+        """經由主機限速器取得整個回應內容；有網頁快取時先檢查快取並以條件請求確認"""
+        body, entry = self.cached_page(url, kind)
+        if body is not None:
+            return body
+        
+        limiter = self.rate_limiter.for_url(url, 'page')
+        wait_start = time.perf_counter()
+        await limiter.acquire_async()
+        self.metrics.inc('sleep_seconds', time.perf_counter() - wait_start, reason='rate_limit')
+        self.metrics.inc('requests', kind=kind)
+        status, retry_after = None, None
+        start = time.perf_counter()
+        try:
+            headers = entry.conditional_headers() if entry is not None else {}
+            async with self.session.get(url, headers=headers) as response:
+                status, retry_after = response.status, response.headers.get('Retry-After')
+                self.metrics.inc('responses', kind=kind, status=str(status))
+                if status == 304 and entry is not None:
+                    return self.http_cache.record_revalidated(entry, response.headers)
+                response.raise_for_status()
+                content = await response.read()
+                self.metrics.observe('request_seconds', time.perf_counter() - start, kind=kind)
+                self.metrics.inc('bytes', len(content), kind=kind, host=limiter.host)
+                if self.http_cache is not None:
+                    self.http_cache.store(url, content, response.headers)
+                return content
+        except Exception:
+            if status is None:
+                self.metrics.inc('request_errors', kind=kind)
+            raise
+        finally:
+            limiter.release(status, retry_after, error=status is None)
+    
+    async def get_listing_page(self, page_num, base_url=None):
+        """抓取並解析一個列表頁 (漫畫連結與分頁資訊)；失敗時回傳 None"""
+        page_url = self.get_page_url(page_num, base_url)
+        try:
+            self.on_log(f"🔍 正在分析頁面: {page_url}")
+            with self.metrics.timer('stage_seconds', stage='listing'):
+                content = await self.fetch(page_url, 'listing')
+                with self.metrics.timer('parse_seconds', kind='listing'):
+                    listing = parse_listing_page(content, page_url)
+            self.on_log(f"✅ 在此頁找到 {len(listing.links)} 個漫畫")
+            return listing
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_log(f"❌ 頁面分析失敗 {page_url}: {str(e)}")
+            return None
+    
+    async def resume_journal(self, manga_queue):
+        """把工作日誌中上次未完成的工作排入佇列，回傳日誌中已有的漫畫網址 (列表掃描時不再重複加入)"""
+        items, journal_links = self.load_journal()
+        for item in items:
+            await manga_queue.put(item)
+        return journal_links
+    
+    async def discover_manga(self, manga_queue):
+        """列表頁生產者：先恢復工作日誌中未完成的工作，再依序掃描每個搜尋，
+        同一個漫畫 (依 aid) 在不同搜尋中只處理一次
+        """
+        queued_keys = {self.index_key_for(manga_url) for manga_url in await self.resume_journal(manga_queue)}
+        for index, search in enumerate(self.searches):
+            if len(self.searches) > 1:
+                self.on_log(f"📚 搜尋 {index + 1}/{len(self.searches)}: {search.url}")
+            await self.discover_search(manga_queue, index, search, queued_keys)
+        
+        self.on_log(f"🎯 總共找到 {self.total_count} 個漫畫")
+    
+    async def discover_search(self, manga_queue, index, search, queued_keys):
+        """同時抓取一個搜尋後面幾頁，依頁碼順序把漫畫網址送入佇列，
+        到達搜尋結果的最後一頁就停止 (上次已掃描過的頁面不再抓取)
+        """
+        search_key, pages = self.unscanned_pages(search)
+        seen = RecentLinks()
+        if search.manga_urls is not None:
+            for page_num, listing in fixed_listing_pages(search, pages):
+                if await self.queue_listing(manga_queue, index, search_key, page_num, listing, seen, queued_keys):
+                    return
+            return
+        
+        pending = {}
+        next_index = 0
+        try:
+            for position, page_num in enumerate(pages):
+                # 第一頁回來之前只抓一頁：搜尋結果只有一頁時不必多發請求
+                window = self.listing_concurrency if position > 0 else 1
+                while next_index < len(pages) and len(pending) < window:
+                    pending[pages[next_index]] = asyncio.create_task(
+                        self.get_listing_page(pages[next_index], search.url))
+                    next_index += 1
+                listing = await pending.pop(page_num)
+                if listing is None:
+                    continue  # 這頁抓取失敗，繼續掃描下一頁 (下次執行會再抓取)
+                if await self.queue_listing(manga_queue, index, search_key, page_num, listing, seen, queued_keys):
+                    break
+        finally:
+            for task in pending.values():
+                task.cancel()
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+    
+    async def queue_listing(self, manga_queue, index, search_key, page_num, listing, seen, queued_keys):
+        """把搜尋 index 列表頁中的新漫畫送入佇列；已到最後一頁時回傳 True"""
+        pending_links, stop_reason = self.take_listing(index, search_key, page_num, listing, seen, queued_keys)
+        for manga_url in pending_links:
+            await manga_queue.put(manga_url)
+        return bool(stop_reason)
+    
+    async def schedule_retries(self, manga_queue):
+        """列表掃描結束後，依退避時間把失敗的工作重新排入佇列，直到每個漫畫都完成或移入失敗清單"""
+        while not self.all_completed():
+            self.job_finished.clear()
+            for item in self.due_retries():
+                await manga_queue.put(item)
+            try:
+                await asyncio.wait_for(self.job_finished.wait(), RETRY_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def resolve_manga(self, manga_url):
+        """解析單個漫畫：取得標題與最終下載連結，不需下載時回傳 None"""
+        # 漫畫頁只抓取、解析一次，標題與下載頁連結都從同一個結果取得
+        content = await self.fetch(manga_url, 'gallery')
+        with self.metrics.timer('parse_seconds', kind='gallery'):
+            page = parse_gallery_page(content, manga_url)
+        if self.catalog is not None:
+            self.catalog.record(self.index_key_for(manga_url), page)
+        if self.skip_existing(manga_url, page.title):
+            return None
+        
+        download_urls = []
+        if page.download_page_url:
+            content = await self.fetch(page.download_page_url, 'download_page')
+            with self.metrics.timer('parse_seconds', kind='download_page'):
+                download_urls = parse_download_mirrors(content, page.download_page_url)
+        return self.create_job(manga_url, page, download_urls)
+    
+    async def probe_size(self, job):
+        """以 HEAD 請求取得檔案大小，回傳扣除 .part 已下載部分後還需要下載的位元組數；無法取得時回傳 None"""
+        download_url = self.mirror_stats.rank(job.download_urls)[0]
+        limiter = self.rate_limiter.for_url(download_url, 'file')
+        wait_start = time.perf_counter()
+        await limiter.acquire_async()
+        self.metrics.inc('sleep_seconds', time.perf_counter() - wait_start, reason='rate_limit')
+        self.metrics.inc('requests', kind='probe')
+        status, retry_after = None, None
+        start = time.perf_counter()
+        try:
+            async with self.session.head(download_url, headers=DOWNLOAD_HEADERS, allow_redirects=True) as response:
+                status, retry_after = response.status, response.headers.get('Retry-After')
+                self.metrics.observe('request_seconds', time.perf_counter() - start, kind='probe')
+                self.metrics.inc('responses', kind='probe', status=str(status))
+                size = response.content_length if response.ok else None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.metrics.inc('request_errors', kind='probe')
+            return None
+        finally:
+            limiter.release(status, retry_after, error=status is None)
+        return self.remaining_size(job, size)
+    
+    async def resolve_worker(self, manga_queue, scheduler):
+        while True:
+            item = await manga_queue.get()
+            if item is None:
+                return
+            if isinstance(item, DownloadJob):
+                # 重試時佇列中可能是已解析的下載工作
+                job = item
+            else:
+                try:
+                    with self.metrics.timer('stage_seconds', stage='resolve'):
+                        job = await self.resolve_manga(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.on_log(f"❌ 處理失敗: {str(e)}")
+                    self.fail_job(item, str(e))
+                    continue
+                if job is None:
+                    self.complete_job(item)
+                    continue
+            if self.needs_size():
+                job.size = await self.probe_size(job)
+            if self.harvest_only:
+                self.complete_job(job.manga_url)
+                continue
+            await scheduler.put(job)
+    
+    async def download_worker(self, scheduler):
+        while True:
+            job = await scheduler.get()
+            if job is None:
+                return
+            # 未完成的部分保留在 .part 檔，下次執行時續傳；目前的位移也記入工作日誌
+            part_path = f"{job.filepath}.part"
+            try:
+                self.journal.mark_downloading(job.manga_url, partial_size(part_path))
+                with self.metrics.timer('stage_seconds', stage='download'):
+                    sha256 = await self.download_file(job.download_urls, job.filepath, job.title)
+                if sha256:
+                    # 後處理交給背景執行緒與行程池，不阻塞事件迴圈
+                    self.record_download(job, sha256)
+                else:
+                    self.fail_job(job.manga_url, "下載失敗", partial_size(part_path))
+            except asyncio.CancelledError:
+                self.journal.mark_downloading(job.manga_url, partial_size(part_path))
+                raise
+            except Exception as e:
+                self.on_log(f"❌ 處理失敗: {str(e)}")
+                self.fail_job(job.manga_url, str(e), partial_size(part_path))
+            finally:
+                await scheduler.done(job)
+    
+    async def download_from(self, download_url, filepath, title, download_id, mirror_urls):
+        """從單一鏡像下載 (有 .part 檔時從中斷處續傳)，寫入時同時計算 SHA-256，
+        完成後檢查 zip 結構並改名為正式檔名；成功時回傳 SHA-256，失敗以例外拋出
+        """
+        part_path = f"{filepath}.part"
+        alternatives = [url for url in mirror_urls if url != download_url]
+        offset, state = load_resume_state(part_path, download_url, alternatives)
+        if state.get('segments'):
+            # 執行緒版引擎分段下載到一半的 .part：依各段進度補齊，不從頭下載
+            total_size = await self.download_segments(download_url, part_path, state, title, download_id)
+            return self.finish_download(download_url, filepath, title, download_id, total_size, None)
+        previous_size = state.get('total_size')
+        
+        headers = dict(DOWNLOAD_HEADERS)
+        headers['Accept-Encoding'] = 'identity'  # 續傳時位移必須對應原始位元組
+        if offset > 0:
+            headers['Range'] = f"bytes={offset}-"
+            validator = resume_validator(state, download_url)
+            if validator:
+                headers['If-Range'] = validator
+            self.on_progress(download_id, f"🔁 從 {offset / 1048576:.1f} MB 續傳: {title}")
+        else:
+            self.on_progress(download_id, f"📥 開始下載: {title}")
+        
+        limiter = self.rate_limiter.for_url(download_url, 'file')
+        wait_start = time.perf_counter()
+        await limiter.acquire_async()
+        self.metrics.inc('sleep_seconds', time.perf_counter() - wait_start, reason='rate_limit')
+        self.metrics.inc('requests', kind='file')
+        status, retry_after = None, None
+        start = time.perf_counter()
+        try:
+            async with self.session.get(download_url, headers=headers,
+                                        timeout=aiohttp.ClientTimeout(sock_read=120)) as response:
+                status, retry_after = response.status, response.headers.get('Retry-After')
+                self.metrics.observe('request_seconds', time.perf_counter() - start, kind='file')
+                self.metrics.inc('responses', kind='file', status=str(status))
+                if status == 416 and offset > 0:
+                    # 請求範圍超出檔案大小：.part 可能已完整，否則捨棄重下
+                    total_size = parse_content_range_total(response.headers.get('Content-Range'))
+                    if total_size != offset:
+                        discard_partial(part_path)
+                        raise IOError("續傳範圍無效，將重新下載")
+                    digest = hash_prefix(part_path, offset)
+                else:
+                    response.raise_for_status()
+                    if 'text/html' in response.headers.get('Content-Type', ''):
+                        raise IntegrityError("伺服器回傳的是 HTML 網頁而不是 zip 檔")
+                    
+                    if offset > 0 and status != 206:
+                        self.on_log(f"⚠️ 伺服器不支援續傳，重新下載: {title}")
+                        offset = 0
+                    if status == 206:
+                        total_size = parse_content_range_total(response.headers.get('Content-Range'))
+                        if previous_size and total_size != previous_size:
+                            # 換鏡像續傳時沒有可用的 ETag，以總大小確認是同一個檔案
+                            discard_partial(part_path)
+                            raise IOError("續傳的檔案大小與先前不同，將重新下載")
+                    else:
+                        total_size = response.content_length
+                    
+                    state = {
+                        'url': download_url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'total_size': total_size,
+                        'bytes_written': offset,
+                        'preallocated': bool(self.preallocate and total_size),
+                    }
+                    save_resume_state(part_path, state)
+                    digest = hash_prefix(part_path, offset) if offset > 0 else hashlib.sha256()
+                    
+                    downloaded_size = 0
+                    progress = ProgressThrottle(lambda done: self.on_progress(
+                        download_id, f"📥 下載中: {title} ({done / total_size * 100:.1f}%)"))
+                    transfer_start = next_speed_check = time.perf_counter()
+                    with open(part_path, 'r+b' if offset > 0 else 'wb') as f:
+                        if state['preallocated']:
+                            preallocate(f, total_size)
+                        f.seek(offset)
+                        # 從頭下載時檢查 zip 標頭，續傳的部分已在第一次下載時檢查過
+                        head_check = ZipHeadCheck() if offset == 0 else None
+                        try:
+                            # iter_any 直接交出已收到的資料，不再切成固定大小的區塊
+                            async for chunk in response.content.iter_any():
+                                if head_check is not None:
+                                    head_check.feed(chunk)
+                                f.write(chunk)
+                                digest.update(chunk)
+                                downloaded_size += len(chunk)
+                                if self.bandwidth is not None:
+                                    delay = await self.bandwidth.consume_async(len(chunk))
+                                    self.metrics.inc('sleep_seconds', delay, reason='bandwidth')
+                                if total_size:
+                                    progress.update(offset + downloaded_size)
+                                
+                                now = time.perf_counter()
+                                if alternatives and now >= next_speed_check:
+                                    # 每秒比較一次目前速度與其他鏡像的歷史速度
+                                    next_speed_check = now + 1
+                                    elapsed = now - transfer_start
+                                    remaining = total_size - offset - downloaded_size if total_size else None
+                                    if self.mirror_stats.should_leave(download_url, alternatives,
+                                                                      downloaded_size, elapsed, remaining):
+                                        raise MirrorTooSlow(f"速度只有 {format_bytes(downloaded_size / elapsed)}/s")
+                        finally:
+                            state['bytes_written'] = offset + downloaded_size
+                            if state['preallocated']:
+                                f.truncate(offset + downloaded_size)
+                            save_resume_state(part_path, state)
+                            elapsed = time.perf_counter() - transfer_start
+                            self.metrics.record_transfer(download_url, downloaded_size, elapsed)
+                            self.mirror_stats.record_transfer(download_url, downloaded_size, elapsed)
+        except Exception:
+            if status is None:
+                self.metrics.inc('request_errors', kind='file')
+            raise
+        finally:
+            limiter.release(status, retry_after, error=status is None)
+        
+        return self.finish_download(download_url, filepath, title, download_id, total_size, digest)
+    
+    async def download_segments(self, download_url, part_path, state, title, download_id):
+        """依 .part 紀錄中各段 [起始, 結束, 已寫入] 的進度，以 Range 請求同時補齊每一段，回傳檔案總大小
+        
+        各段的進度隨時寫回紀錄，中斷後下次 (任一引擎) 都能接著續傳；
+        伺服器回應的檔案與紀錄不符時捨棄 .part，由下一次嘗試從頭下載
+        """
+        total_size = state['total_size']
+        segments = state['segments']
+        if not os.path.exists(part_path) or os.path.getsize(part_path) != total_size:
+            discard_partial(part_path)
+            raise IOError("分段下載的 .part 大小不符，將重新下載")
+        
+        validator = resume_validator(state, download_url)
+        progress = ProgressThrottle(lambda done: self.on_progress(
+            download_id, f"📥 下載中: {title} ({done / total_size * 100:.1f}%)"))
+        self.on_progress(download_id, f"🔁 依 {len(segments)} 段的進度續傳: {title}")
+        
+        async def fetch_segment(segment):
+            start, end = segment[0], segment[1]
+            position = start + segment[2]
+            if position > end:
+                return
+            headers = dict(DOWNLOAD_HEADERS)
+            headers['Range'] = f"bytes={position}-{end}"
+            headers['Accept-Encoding'] = 'identity'
+            if validator:
+                headers['If-Range'] = validator
+            
+            limiter = self.rate_limiter.for_url(download_url, 'file')
+            wait_start = time.perf_counter()
+            await limiter.acquire_async()
+            self.metrics.inc('sleep_seconds', time.perf_counter() - wait_start, reason='rate_limit')
+            self.metrics.inc('requests', kind='file')
+            status, retry_after = None, None
+            transfer_start, first_position = time.perf_counter(), position
+            try:
+                async with self.session.get(download_url, headers=headers,
+                                            timeout=aiohttp.ClientTimeout(sock_read=120)) as response:
+                    status, retry_after = response.status, response.headers.get('Retry-After')
+                    self.metrics.inc('responses', kind='file', status=str(status))
+                    response.raise_for_status()
+                    content_range_total = parse_content_range_total(response.headers.get('Content-Range'))
+                    if status != 206 or content_range_total != total_size:
+                        # 檔案已變更、換了內容不同的鏡像或伺服器不再支援 Range，整個 .part 都不可信
+                        raise RangeNotSatisfied(download_url)
+                    with open(part_path, 'r+b') as f:
+                        f.seek(position)
+                        async for chunk in response.content.iter_any():
+                            chunk = chunk[:end + 1 - position]
+                            f.write(chunk)
+                            position += len(chunk)
+                            segment[2] += len(chunk)
+                            progress.update(sum(s[2] for s in segments))
+                            if self.bandwidth is not None:
+                                delay = await self.bandwidth.consume_async(len(chunk))
+                                self.metrics.inc('sleep_seconds', delay, reason='bandwidth')
+                            if position > end:
+                                break
+            except Exception:
+                if status is None:
+                    self.metrics.inc('request_errors', kind='file')
+                raise
+            finally:
+                limiter.release(status, retry_after, error=status is None)
+                elapsed = time.perf_counter() - transfer_start
+                self.metrics.record_transfer(download_url, position - first_position, elapsed)
+                self.mirror_stats.record_transfer(download_url, position - first_position, elapsed)
+        
+        tasks = [asyncio.create_task(fetch_segment(segment)) for segment in segments]
+        try:
+            await asyncio.gather(*tasks)
+        except RangeNotSatisfied:
+            discard_partial(part_path)
+            raise IOError("伺服器不再支援分段續傳，將重新下載")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            state['bytes_written'] = sum(segment[2] for segment in segments)
+            if os.path.exists(part_path):
+                save_resume_state(part_path, state)
+        
+        if any(start + written <= end for start, end, written in segments):
+            raise IOError("分段下載未完成")
+        return total_size
+    
+    async def download_file(self, download_urls, filepath, title, max_retries=3):
+        """下載檔案 - 先寫入 .part 檔並支援斷點續傳，失敗時重試
+        
+        download_urls 為同一個檔案的所有鏡像，切換與重試的順序見 MirrorFailover。
+        成功時回傳 SHA-256，失敗時回傳 False
+        """
+        failover = MirrorFailover(self, download_urls, filepath, title, max_retries)
+        download_id = f"download_{hash(title) % 10000}"
+        for wait_time, download_url in failover.attempts():
+            if wait_time:
+                await asyncio.sleep(wait_time)
+            try:
+                sha256 = await self.download_from(download_url, filepath, title, download_id, failover.mirror_urls)
+                failover.succeeded(download_url)
+                return sha256
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failover.failed(download_url, e)
+        return False
+    
+    async def run_pipeline(self, manga_queue, scheduler, resolvers, downloaders):
+        """掃描列表頁並排入重試，全部完成後依序讓解析與下載協程結束"""
+        await self.discover_manga(manga_queue)
+        await self.schedule_retries(manga_queue)
+        for _ in resolvers:
+            await manga_queue.put(None)
+        await asyncio.gather(*resolvers)
+        await scheduler.close()
+        await asyncio.gather(*downloaders)
+        if self.post_processor is not None:
+            # 等待剩餘的檔案處理完畢
+            await asyncio.to_thread(self.post_processor.close)
+    
+    async def watch_workers(self, pipeline, workers):
+        """執行 pipeline 直到完成；有工作協程因未處理的例外結束時立即拋出該例外
+        
+        該協程手上的漫畫不會再呼叫 complete_job/fail_job，完成數永遠到不了總數，
+        不中止的話 schedule_retries 會一直等待 (執行緒版引擎由 run_worker 做同樣的處理)。
+        """
+        main = asyncio.ensure_future(pipeline)
+        pending = {main, *workers}
+        try:
+            while not main.done():
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not main and not task.cancelled() and task.exception() is not None:
+                        self.on_log(f"❌ 工作協程異常結束: {task.exception()}")
+                        raise task.exception()
+            return main.result()
+        finally:
+            if not main.done():
+                main.cancel()
+                await asyncio.gather(main, return_exceptions=True)
+    
+    async def _run(self):
+        self.open_stores()
+        connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST, ssl=False)
+        timeout = aiohttp.ClientTimeout(total=None, connect=30, sock_read=30)
+        try:
+            async with aiohttp.ClientSession(headers=PAGE_HEADERS, connector=connector, timeout=timeout) as session:
+                self.session = session
+                self.on_overall(0, 0)
+                self.on_log(f"🚀 asyncio 引擎: {self.page_concurrency} 個解析協程、{self.max_workers} 個下載協程")
+                self.start_post_processing()
+                
+                manga_queue = asyncio.Queue(maxsize=MANGA_QUEUE_SIZE)
+                scheduler = AsyncDownloadScheduler(DOWNLOAD_QUEUE_SIZE, order=self.download_order,
+                                                   max_inflight_bytes=self.max_inflight_bytes,
+                                                   prefer_tags=self.prefer_tags)
+                resolvers = [asyncio.create_task(self.resolve_worker(manga_queue, scheduler))
+                             for _ in range(self.page_concurrency)]
+                downloaders = [asyncio.create_task(self.download_worker(scheduler))
+                               for _ in range(self.max_workers)]
+                try:
+                    await self.watch_workers(self.run_pipeline(manga_queue, scheduler, resolvers, downloaders),
+                                             [*resolvers, *downloaders])
+                finally:
+                    # 取消時一併中止所有進行中的請求
+                    for task in [*resolvers, *downloaders]:
+                        task.cancel()
+                    await asyncio.gather(*resolvers, *downloaders, return_exceptions=True)
+            
+            self.finish_run()
+        finally:
+            self.close_stores()
+    
+    def run(self):
+        """在目前執行緒建立事件迴圈並執行到結束；被取消時回傳 False"""
+        loop = asyncio.new_event_loop()
+        try:
+            with self._lock:
+                self._loop = loop
+                self._task = loop.create_task(self._run())
+                if self.is_cancelled:
+                    self._task.cancel()
+            loop.run_until_complete(self._task)
+            return True
+        except asyncio.CancelledError:
+            return False
+        except KeyboardInterrupt:
+            # Ctrl+C：先讓所有協程收到取消並清理完畢
+            self.is_cancelled = True
+            self._task.cancel()
+            try:
+                loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+            raise
+        finally:
+            with self._lock:
+                self._loop = None
+                self._task = None
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
@@ -0,0 +1,96 @@
+import json
+import threading
+from dataclasses import dataclass
+
+from page_parser import ListingPage
+
+@dataclass(slots=True)
+class SearchSpec:
+    """批次中的一個搜尋：搜尋結果網址與頁數範圍
+    
+    manga_urls 不為 None 時不掃描列表頁，改為直接處理這些漫畫 (從目錄選出的下載清單)，url 只用來識別。
+    """
+    url: str
+    start_page: int = 1
+    end_page: int = 1
+    manga_urls: list = None
+
+def fixed_listing_pages(search, pages):
+    """把搜尋指定的漫畫清單當作唯一的一頁 (第 1 頁)，產生與掃描列表頁相同的 (頁碼, ListingPage)"""
+    if 1 in pages:
+        yield 1, ListingPage(search.url, list(dict.fromkeys(search.manga_urls)), page_numbers=[1])
+
+def load_batch(path, start_page=1, end_page=1):
+    """讀取批次檔，回傳 [SearchSpec]；沒有指定頁數的搜尋使用 start_page、end_page
+    
+    支援兩種格式：
+    - JSON 陣列：[{"url": "...", "start_page": 1, "end_page": 5}, "https://..."]
+    - 文字檔：每行「網址 [起始頁 [結束頁]]」，空行與 # 開頭的行會被忽略
+    只寫起始頁時只下載那一頁。
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    
+    if text.lstrip().startswith('['):
+        entries = json.loads(text)
+    else:
+        entries = []
+        for line in text.splitlines():
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            entries.append(dict(zip(['url', 'start_page', 'end_page'], fields)))
+    
+    searches = []
+    for number, entry in enumerate(entries, 1):
+        if isinstance(entry, str):
+            entry = {'url': entry}
+        if not entry.get('url'):
+            raise ValueError(f"批次檔第 {number} 個搜尋沒有網址")
+        first = int(entry.get('start_page', start_page))
+        last = int(entry.get('end_page', first if 'start_page' in entry else end_page))
+        if first > last:
+            raise ValueError(f"批次檔第 {number} 個搜尋的起始頁大於結束頁: {entry['url']}")
+        searches.append(SearchSpec(entry['url'], first, last))
+    if not searches:
+        raise ValueError(f"批次檔中沒有搜尋: {path}")
+    return searches
+
+class SearchProgress:
+    """批次中各搜尋的完成數與總數 (可跨執行緒使用)
+    
+    同一個漫畫出現在多個搜尋時，只算在第一個找到它的搜尋；
+    從工作日誌恢復的漫畫不屬於任何搜尋，只計入總體進度。
+    """
+    
+    def __init__(self, searches, on_search_progress=None):
+        self.searches = searches
+        self.counts = [[0, 0] for _ in searches]  # [已完成, 總數]
+        self.owners = {}                          # 漫畫網址 → 搜尋索引
+        self.on_search_progress = on_search_progress or (lambda index, completed, total: None)
+        self._lock = threading.Lock()
+    
+    def add(self, index, manga_urls, completed=0):
+        """搜尋 index 找到要處理的漫畫 manga_urls，另有 completed 個已下載或跳過"""
+        with self._lock:
+            self.owners.update(dict.fromkeys(manga_urls, index))
+            self.counts[index][0] += completed
+            self.counts[index][1] += len(manga_urls) + completed
+            done, total = self.counts[index]
+        self.on_search_progress(index, done, total)
+    
+    def complete(self, manga_url):
+        """漫畫完成 (下載成功、已存在或移入失敗清單)"""
+        with self._lock:
+            index = self.owners.pop(manga_url, None)
+            if index is None:
+                return
+            self.counts[index][0] += 1
+            done, total = self.counts[index]
+        self.on_search_progress(index, done, total)
+    
+    def summary_lines(self):
+        with self._lock:
+            counts = [tuple(count) for count in self.counts]
+        return [f"{search.url} (第 {search.start_page}-{search.end_page} 頁): {done}/{total}"
+                for search, (done, total) in zip(self.searches, counts)]
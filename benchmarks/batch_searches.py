@@ -0,0 +1,93 @@
+"""
+批次搜尋效能測試：對假網站 (fake_wnacg.py) 上部分重複的多個搜尋 (bench、bench3、bench6…)，比較：
+
+- sequential：舊做法，每個搜尋各自建立引擎依序執行 (共用下載索引，但連線、限速狀態與快取每次重新開始)
+- batch：所有搜尋交給同一個引擎，列表掃描、解析與下載在搜尋之間不停頓，並跨搜尋去除重複的漫畫
+
+用法: python benchmarks/batch_searches.py --searches 4 --pages 2 --latency-ms 30
+      python benchmarks/batch_searches.py --engine async --limiter open
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from batch_jobs import SearchSpec
+from fake_wnacg import SiteConfig, start_site
+from rate_limiter import HostPolicy, RateLimiter
+
+MODES = ['sequential', 'batch']
+
+def build_rate_limiter(name):
+    # open：幾乎不限速，只量測程式本身；default：與實際執行相同的限速參數
+    if name == 'default':
+        return RateLimiter()
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    return RateLimiter(page_policy=policy, file_policy=policy)
+
+def create_engine(searches, output, args):
+    options = dict(index_path=os.path.join(output, 'index.sqlite3'), cache_path=None, mirror_stats_path=None,
+                   journal_path=None, catalog_path=None, rate_limiter=build_rate_limiter(args.limiter),
+                   searches=searches)
+    first = searches[0]
+    if args.engine == 'async':
+        from async_engine import AsyncDownloadEngine
+        return AsyncDownloadEngine(first.url, first.start_page, first.end_page, output, args.workers, **options)
+    from downloader_core import MangaDownloader
+    return MangaDownloader(first.url, first.start_page, first.end_page, output, args.workers, **options)
+
+def run_mode(mode, searches, args):
+    output = tempfile.mkdtemp(prefix='comic_batch_')
+    try:
+        start = time.perf_counter()
+        if mode == 'batch':
+            create_engine(searches, output, args).run()
+        else:
+            for search in searches:
+                create_engine([search], output, args).run()
+        elapsed = time.perf_counter() - start
+        downloaded = len([name for name in os.listdir(output) if name.endswith('.zip')])
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    return downloaded, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--searches', type=int, default=4, help='搜尋數 (相鄰的搜尋每頁有部分漫畫重複)')
+    parser.add_argument('--overlap-step', type=int, default=3, help='每個搜尋的 aid 比前一個偏移多少')
+    parser.add_argument('--pages', type=int, default=2, help='每個搜尋的列表頁數')
+    parser.add_argument('--per-page', type=int, default=12, help='每頁漫畫數')
+    parser.add_argument('--zip-kb', type=int, default=128, help='每個 zip 的大小 (KB)')
+    parser.add_argument('--latency-ms', type=float, default=30, help='伺服器每個回應的延遲')
+    parser.add_argument('--workers', type=int, default=4, help='同時下載數')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread')
+    parser.add_argument('--limiter', choices=['open', 'default'], default='default',
+                        help='open：不限速；default：使用實際的限速參數')
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    
+    config = SiteConfig(pages=args.pages, per_page=args.per_page, zip_size=args.zip_kb * 1024,
+                        latency=args.latency_ms / 1000)
+    server, url = start_site(config)
+    searches = [SearchSpec(url.replace('sname-bench', f'sname-bench{index * args.overlap_step or ""}'), 1, args.pages)
+                for index in range(args.searches)]
+    
+    print(f"{'方式':<12}{'下載數':>8}{'列表請求':>10}{'漫畫頁請求':>12}{'檔案請求':>10}{'秒數':>9}")
+    try:
+        for mode in args.mode:
+            server.stats.reset()
+            downloaded, elapsed = run_mode(mode, searches, args)
+            requests = server.stats.to_dict()['requests']
+            print(f"{mode:<12}{downloaded:>8}{requests.get('listing', 0):>10}{requests.get('gallery', 0):>12}"
+                  f"{requests.get('file', 0):>10}{elapsed:>9.2f}", flush=True)
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+下載排程效能測試：假網站 (fake_wnacg.py) 每隔幾個漫畫有一個大檔，伺服器總頻寬有限，
+以相同的同時下載數比較各種下載順序：
+
+- fifo：依列表順序 (舊做法)
+- smallest：小檔優先
+- fair：各列表頁輪流
+
+量測總時間、第一個檔案完成的時間與平均完成時間 (每個漫畫從開始執行到下載完成的平均秒數)。
+
+用法: python benchmarks/download_scheduling.py --pages 2 --large-every 4 --total-bandwidth-kbps 8192
+      python benchmarks/download_scheduling.py --engine async --order fifo smallest
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from fake_wnacg import SiteConfig, start_site
+from rate_limiter import HostPolicy, RateLimiter
+from scheduler import ORDERS
+
+def run_case(url, order, args):
+    output = tempfile.mkdtemp(prefix='comic_schedule_')
+    finished = []
+    start = time.perf_counter()
+    
+    def on_progress(download_id, text):
+        if text.startswith('✅'):
+            finished.append(time.perf_counter() - start)
+    
+    # 幾乎不限速，只比較排程本身
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    options = dict(on_progress=on_progress, index_path=os.path.join(output, 'index.sqlite3'), cache_path=None,
+                   mirror_stats_path=None, journal_path=None, catalog_path=None,
+                   rate_limiter=RateLimiter(page_policy=policy, file_policy=policy),
+                   download_order=order, max_inflight_bytes=None)
+    if args.engine == 'async':
+        from async_engine import AsyncDownloadEngine
+        engine = AsyncDownloadEngine(url, 1, args.pages, output, args.workers, **options)
+    else:
+        from downloader_core import MangaDownloader
+        engine = MangaDownloader(url, 1, args.pages, output, args.workers, segment_count=1, **options)
+    try:
+        engine.run()
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    return {
+        'completed': len(finished),
+        'elapsed': elapsed,
+        'first': finished[0] if finished else None,
+        'mean': sum(finished) / len(finished) if finished else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=2, help='列表頁數')
+    parser.add_argument('--per-page', type=int, default=12, help='每頁漫畫數')
+    parser.add_argument('--zip-kb', type=int, default=256, help='一般 zip 的大小 (KB)')
+    parser.add_argument('--large-every', type=int, default=4, help='每隔幾個漫畫有一個大檔')
+    parser.add_argument('--large-zip-kb', type=int, default=8192, help='大檔的大小 (KB)')
+    parser.add_argument('--total-bandwidth-kbps', type=float, default=16384, help='伺服器總頻寬 (KB/s)')
+    parser.add_argument('--workers', type=int, default=4, help='同時下載數')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread')
+    parser.add_argument('--order', nargs='+', choices=ORDERS, default=['fifo', 'smallest', 'fair'])
+    args = parser.parse_args()
+    
+    config = SiteConfig(pages=args.pages, per_page=args.per_page, zip_size=args.zip_kb * 1024,
+                        large_every=args.large_every, large_zip_size=args.large_zip_kb * 1024,
+                        total_bandwidth=args.total_bandwidth_kbps * 1024)
+    server, url = start_site(config)
+    
+    print(f"{'順序':<10}{'完成數':>8}{'總秒數':>9}{'首個完成':>10}{'平均完成':>10}")
+    try:
+        for order in args.order:
+            result = run_case(url, order, args)
+            first = f"{result['first']:.2f}" if result['first'] is not None else '-'
+            mean = f"{result['mean']:.2f}" if result['mean'] is not None else '-'
+            print(f"{order:<10}{result['completed']:>8}{result['elapsed']:>9.2f}{first:>10}{mean:>10}", flush=True)
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
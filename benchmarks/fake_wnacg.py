@@ -0,0 +1,337 @@
+"""
+本機假 wnacg 網站：產生列表頁、漫畫頁、下載頁與 zip 檔，
+結構符合下載器依賴的選擇器 (/photos-index-aid-、「本地下載」、.zip)。
+
+可設定回應延遲、頻寬上限、503 注入比例與檔案傳輸中斷比例，zip 支援 Range / If-Range 續傳。
+除了給 pipeline_benchmark.py 使用，也可以單獨啟動，用 GUI 或 CLI 對它下載：
+
+用法: python benchmarks/fake_wnacg.py --port 8765 --pages 5 --latency-ms 50 --bandwidth-kbps 2048
+"""
+import argparse
+import io
+import random
+import re
+import threading
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class SiteConfig:
+    """假網站的內容與網路條件"""
+    pages: int = 5                    # 有內容的列表頁數，之後的頁面沒有漫畫
+    paginator: bool = True            # 列表頁顯示分頁列 (最後一頁沒有「後頁」連結)
+    repeat_last_page: bool = False    # 超出範圍的頁碼重複回傳最後一頁 (部分網站的行為)
+    per_page: int = 12                # 每頁漫畫數
+    zip_size: int = 512 * 1024        # 每個 zip 的大約大小 (位元組)
+    large_every: int = 0              # 每隔幾個漫畫有一個大檔，0 表示大小都相同
+    large_zip_size: int = 8 * 1024 * 1024
+    latency: float = 0.0              # 每個回應前的延遲 (秒)
+    bandwidth: float = None           # 每個連線的傳輸上限 (位元組/秒)，None 表示不限
+    total_bandwidth: float = None     # 所有連線共用的傳輸上限 (位元組/秒)
+    error_rate: float = 0.0           # 隨機回傳 503 的比例
+    drop_rate: float = 0.0            # 檔案傳到一半時中斷連線的比例
+    retry_after: int = 1              # 503 回應的 Retry-After 秒數
+    seed: int = 0
+    
+    def zip_size_for(self, aid):
+        if self.large_every and aid % self.large_every == 0:
+            return self.large_zip_size
+        return self.zip_size
+
+@dataclass
+class SiteStats:
+    """伺服器端的統計 (每次測試前可用 reset() 清除)"""
+    requests: dict = field(default_factory=dict)
+    injected_503: int = 0
+    dropped: int = 0
+    bytes_sent: int = 0
+    first_file_byte_at: float = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.injected_503 = 0
+            self.dropped = 0
+            self.bytes_sent = 0
+            self.first_file_byte_at = None
+    
+    def to_dict(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'injected_503': self.injected_503,
+                'dropped': self.dropped,
+                'bytes_sent': self.bytes_sent,
+            }
+
+class Pacer:
+    """把傳輸速度限制在 rate 位元組/秒 (可被多個連線共用)"""
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self, size):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + size / self.rate
+            delay = self.next_time - now
+        if delay > 0:
+            time.sleep(delay)
+
+@lru_cache(maxsize=32)
+def make_zip(aid, size):
+    """內容固定的 zip (同一個 aid 每次產生相同的位元組，續傳與分段下載才能驗證)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        page_size = 64 * 1024
+        pages = max(1, size // page_size)
+        rng = random.Random(aid)
+        for page in range(pages):
+            info = zipfile.ZipInfo(f'{page + 1:03d}.jpg', date_time=(2024, 1, 1, 0, 0, 0))
+            archive.writestr(info, rng.randbytes(min(page_size, size)))
+    return buffer.getvalue()
+
+def title_for(aid):
+    return f"Bench Manga {aid}"
+
+def listing_url(page, search='bench'):
+    return f'/albums-index-page-{page}-sname-{search}.html'
+
+def search_offset(search):
+    """搜尋 bench 的 aid 從每頁的 0 號開始，bench3 從 3 號開始 (與 bench 部分重複)，用來測試跨搜尋去重"""
+    digits = search[len('bench'):] if search.startswith('bench') else ''
+    return int(digits) if digits.isdigit() else 0
+
+def paginator_html(page, config, search='bench'):
+    links = []
+    for number in range(max(1, page - 4), min(config.pages, page + 4) + 1):
+        if number == page:
+            links.append(f'<span class="thispage">{number}</span>')
+        else:
+            links.append(f'<a href="{listing_url(number, search)}">{number}</a>')
+    if page < config.pages:
+        links.append(f'<span class="next"><a href="{listing_url(page + 1, search)}">後頁&gt;</a></span>')
+    return f'<div class="paginator">{"".join(links)}</div>'
+
+def listing_html(page, config, search='bench'):
+    if page > config.pages:
+        if not config.repeat_last_page:
+            return '<html><body><div class="grid"><p>沒有結果</p></div></body></html>'
+        page = config.pages
+    items = []
+    for index in range(config.per_page):
+        aid = page * 1000 + index + search_offset(search)
+        items.append(
+            f'<li class="li gallary_item"><div class="pic_box">'
+            f'<a href="/photos-index-aid-{aid}.html"><img src="/img/{aid}.jpg"></a></div>'
+            f'<div class="info"><div class="title"><a href="/photos-index-aid-{aid}.html">{title_for(aid)}</a></div>'
+            f'</div></li>'
+        )
+    return (
+        '<html><head><meta charset="utf-8"><title>搜索結果</title></head><body>'
+        f'<div class="grid"><ul class="cc">{"".join(items)}</ul></div>'
+        f'{paginator_html(page, config, search) if config.paginator else ""}'
+        '</body></html>'
+    )
+
+# 漫畫頁資訊欄的分類 (依 aid 輪流)
+CATEGORIES = ['同人誌', '單行本', '雜誌&短篇']
+
+def gallery_html(aid):
+    return (
+        f'<html><head><meta charset="utf-8"><title>{title_for(aid)}</title></head><body>'
+        f'<div id="bodywrap"><h2>{title_for(aid)}</h2>'
+        f'<div class="asTB"><div class="asTBcell uwthumb"><img src="/img/{aid}.jpg"></div>'
+        f'<div class="asTBcell uwconn"><label>分類：{CATEGORIES[aid % len(CATEGORIES)]}</label>'
+        f'<label>頁數：{10 + aid % 40}P</label><p>上傳於2024-{1 + aid % 12:02d}-{1 + aid % 28:02d}</p></div>'
+        f'<a class="btn" href="/download-index-aid-{aid}.html">下載本子</a></div>'
+        f'<div class="addtags"><a class="tagshow" href="/albums-index-tag-bench.html">bench</a>'
+        f'<a class="tagshow" href="/albums-index-tag-tag{aid % 4}.html">tag{aid % 4}</a></div>'
+        '</div></body></html>'
+    )
+
+def download_html(aid):
+    return (
+        '<html><head><meta charset="utf-8"></head><body><div class="download_btns">'
+        f'<a class="down_btn" href="/files/{aid}.zip">本地下載一</a>'
+        f'<a class="down_btn" href="/files2/{aid}.zip">本地下載二</a>'
+        '</div></body></html>'
+    )
+
+class FakeWnacgHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = SiteConfig()
+    stats = SiteStats()
+    total_pacer = None
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def count(self, kind):
+        with self.stats.lock:
+            self.stats.requests[kind] = self.stats.requests.get(kind, 0) + 1
+    
+    def roll(self, rate):
+        if rate <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < rate
+    
+    def inject_error(self):
+        if not self.roll(self.config.error_rate):
+            return False
+        with self.stats.lock:
+            self.stats.injected_503 += 1
+        self.send_body(b'busy', 'text/plain', 503, {'Retry-After': str(self.config.retry_after)})
+        return True
+    
+    def send_body(self, body, content_type, status=200, headers=None, is_file=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        
+        pacer = Pacer(self.config.bandwidth) if self.config.bandwidth else None
+        chunk_size = 16 * 1024
+        # 模擬傳到一半斷線：送出一半內容後關閉連線
+        drop_at = len(body) // 2 if is_file and self.roll(self.config.drop_rate) else None
+        try:
+            for position in range(0, len(body), chunk_size):
+                if drop_at is not None and position >= drop_at:
+                    self.close_connection = True
+                    with self.stats.lock:
+                        self.stats.dropped += 1
+                    return
+                chunk = body[position:position + chunk_size]
+                if pacer:
+                    pacer.wait(len(chunk))
+                if self.total_pacer:
+                    self.total_pacer.wait(len(chunk))
+                self.wfile.write(chunk)
+                with self.stats.lock:
+                    self.stats.bytes_sent += len(chunk)
+                    if is_file and self.stats.first_file_byte_at is None:
+                        self.stats.first_file_byte_at = time.time()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def send_html(self, html):
+        body = html.encode('utf-8')
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_body(body, 'text/html; charset=utf-8', headers={'ETag': etag})
+    
+    def send_zip(self, aid):
+        data = make_zip(aid, self.config.zip_size_for(aid))
+        etag = f'"zip-{aid}-{len(data)}"'
+        headers = {'Accept-Ranges': 'bytes', 'ETag': etag}
+        
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        if match and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), len(data) - 1) if match.group(2) else len(data) - 1
+            if start >= len(data):
+                self.send_body(b'', 'application/zip', 416, {'Content-Range': f'bytes */{len(data)}'})
+                return
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+            self.send_body(data[start:end + 1], 'application/zip', 206, headers, is_file=True)
+        else:
+            self.send_body(data, 'application/zip', 200, headers, is_file=True)
+    
+    def do_HEAD(self):
+        self.do_GET()
+    
+    def do_GET(self):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        
+        path = self.path
+        routes = [
+            ('listing', r'-page-(\d+)(?:-sname-(\w+))?',
+             lambda m: self.send_html(listing_html(int(m.group(1)), self.config, m.group(2) or 'bench'))),
+            ('gallery', r'/photos-index-aid-(\d+)\.html', lambda m: self.send_html(gallery_html(int(m.group(1))))),
+            ('download_page', r'/download-index-aid-(\d+)\.html', lambda m: self.send_html(download_html(int(m.group(1))))),
+            ('file', r'/files2?/(\d+)\.zip', lambda m: self.send_zip(int(m.group(1)))),
+        ]
+        for kind, pattern, respond in routes:
+            match = re.search(pattern, path)
+            if match:
+                self.count(kind)
+                if not self.inject_error():
+                    respond(match)
+                return
+        
+        self.count('not_found')
+        self.send_body(b'not found', 'text/plain', 404)
+
+def start_site(config=None, port=0):
+    """在背景執行緒啟動假網站，回傳 (server, 搜尋結果網址)"""
+    handler = type('SiteHandler', (FakeWnacgHandler,), {
+        'config': config or SiteConfig(),
+        'stats': SiteStats(),
+        'rng': random.Random((config or SiteConfig()).seed),
+    })
+    if handler.config.total_bandwidth:
+        handler.total_pacer = Pacer(handler.config.total_bandwidth)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.stats = handler.stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}{listing_url(1)}'
+
+def config_from_args(args):
+    return SiteConfig(
+        pages=args.pages,
+        per_page=args.per_page,
+        zip_size=args.zip_kb * 1024,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None,
+        total_bandwidth=args.total_bandwidth_kbps * 1024 if args.total_bandwidth_kbps else None,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--per-page', type=int, default=12)
+    parser.add_argument('--zip-kb', type=int, default=512)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--bandwidth-kbps', type=float, default=None, help='每個連線的速度上限 (KB/s)')
+    parser.add_argument('--total-bandwidth-kbps', type=float, default=None, help='所有連線合計的速度上限 (KB/s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='隨機回傳 503 的比例 (0~1)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='檔案傳到一半時中斷連線的比例 (0~1)')
+    args = parser.parse_args()
+    
+    server, url = start_site(config_from_args(args), args.port)
+    print(f"假網站已啟動: {url}  (Ctrl+C 結束)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(server.stats.to_dict())
+
+if __name__ == '__main__':
+    main()
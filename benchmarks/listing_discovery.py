@@ -0,0 +1,105 @@
+"""
+列表頁掃描效能測試：假網站 (fake_wnacg.py) 只有前幾頁有結果，下載範圍卻設到很後面，
+只執行列表頁掃描 (不下載)，比較：
+
+- sequential：舊做法，依序抓取範圍內的每一頁
+- thread / async：同時抓取數頁，從分頁列、空白頁或重複結果判斷最後一頁後停止
+
+用法: python benchmarks/listing_discovery.py --result-pages 20 --end-page 200 --latency-ms 50
+      python benchmarks/listing_discovery.py --no-paginator --repeat-last-page
+"""
+import argparse
+import asyncio
+import os
+import queue
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from download_index import DownloadIndex
+from downloader_core import LISTING_CONCURRENCY, MangaDownloader
+from fake_wnacg import SiteConfig, start_site
+from job_journal import JobJournal
+from rate_limiter import HostPolicy, RateLimiter
+
+MODES = ['sequential', 'thread', 'async']
+
+def discover_sequential(url, args):
+    engine = MangaDownloader(url, 1, args.end_page, '.', 1, **engine_options(args))
+    found = set()
+    for page_num in range(1, args.end_page + 1):
+        listing = engine.get_listing_page(page_num)
+        if listing is not None:
+            found.update(listing.links)
+    return len(found)
+
+def discover_thread(url, args):
+    engine = MangaDownloader(url, 1, args.end_page, '.', 1, **engine_options(args))
+    engine.index = DownloadIndex(':memory:')
+    engine.journal = JobJournal(':memory:', url)
+    manga_queue = queue.Queue()
+    engine.discover_manga(manga_queue)
+    return manga_queue.qsize()
+
+def discover_async(url, args):
+    import aiohttp
+    from async_engine import AsyncDownloadEngine
+    engine = AsyncDownloadEngine(url, 1, args.end_page, '.', 1, **engine_options(args))
+    engine.index = DownloadIndex(':memory:')
+    engine.journal = JobJournal(':memory:', url)
+    
+    async def discover():
+        async with aiohttp.ClientSession() as session:
+            engine.session = session
+            manga_queue = asyncio.Queue()
+            await engine.discover_manga(manga_queue)
+            return manga_queue.qsize()
+    
+    return asyncio.run(discover())
+
+def engine_options(args):
+    # open：幾乎不限速，只量測程式本身；default：與實際執行相同的限速參數
+    if args.limiter == 'default':
+        rate_limiter = RateLimiter()
+    else:
+        policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                            initial_concurrency=64, max_concurrency=64)
+        rate_limiter = RateLimiter(page_policy=policy, file_policy=policy)
+    return dict(index_path=None, cache_path=None, mirror_stats_path=None, journal_path=None, catalog_path=None,
+                rate_limiter=rate_limiter, listing_concurrency=args.concurrency)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--result-pages', type=int, default=20, help='假網站有結果的頁數')
+    parser.add_argument('--end-page', type=int, default=200, help='掃描範圍的結束頁')
+    parser.add_argument('--per-page', type=int, default=24, help='每頁漫畫數')
+    parser.add_argument('--latency-ms', type=float, default=50, help='伺服器每個回應的延遲')
+    parser.add_argument('--concurrency', type=int, default=LISTING_CONCURRENCY, help='同時抓取的列表頁數')
+    parser.add_argument('--limiter', choices=['open', 'default'], default='open',
+                        help='open：不限速；default：使用實際的限速參數')
+    parser.add_argument('--no-paginator', action='store_true', help='列表頁不顯示分頁列')
+    parser.add_argument('--repeat-last-page', action='store_true', help='超出範圍的頁碼重複回傳最後一頁')
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    
+    config = SiteConfig(pages=args.result_pages, per_page=args.per_page, latency=args.latency_ms / 1000,
+                        paginator=not args.no_paginator, repeat_last_page=args.repeat_last_page)
+    server, url = start_site(config)
+    runners = {'sequential': discover_sequential, 'thread': discover_thread, 'async': discover_async}
+    
+    print(f"{'方式':<12}{'漫畫數':>8}{'列表請求':>10}{'秒數':>9}")
+    try:
+        for mode in args.mode:
+            server.stats.reset()
+            start = time.perf_counter()
+            found = runners[mode](url, args)
+            elapsed = time.perf_counter() - start
+            requests = server.stats.to_dict()['requests'].get('listing', 0)
+            print(f"{mode:<12}{found:>8}{requests:>10}{elapsed:>9.2f}", flush=True)
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
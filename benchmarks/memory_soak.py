@@ -0,0 +1,113 @@
+"""
+記憶體長時間測試：假網站 (fake_wnacg.py，在另一個行程執行) 提供大量列表頁與漫畫，
+完整執行一次掃描 → 解析 → 下載，每完成一定數量的漫畫記錄一次下載端的 RSS。
+
+記憶體有界時，RSS 在前幾千個漫畫之後就不再上升 (最後一欄為與第一個取樣點的差距)。
+
+用法: python benchmarks/memory_soak.py --items 10000 --per-page 50
+      python benchmarks/memory_soak.py --engine async --items 10000 --sample-every 500
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+from fake_wnacg import listing_url
+from rate_limiter import HostPolicy, RateLimiter
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不量測最高 RSS
+    resource = None
+
+def current_rss_mb():
+    """目前的 RSS (MB)；沒有 /proc 時回傳 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的單位是位元組，Linux 是 KB
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_site(args):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(BENCHMARK_DIR, 'fake_wnacg.py'), '--port', str(port),
+                                '--pages', str(args.pages), '--per-page', str(args.per_page),
+                                '--zip-kb', str(args.zip_kb)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}{listing_url(1)}"
+    for _ in range(100):
+        try:
+            requests.get(url, timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("假網站沒有啟動")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10000, help='漫畫總數')
+    parser.add_argument('--per-page', type=int, default=50, help='每頁漫畫數')
+    parser.add_argument('--zip-kb', type=int, default=1, help='每個 zip 的大小 (KB)')
+    parser.add_argument('--workers', type=int, default=8, help='同時下載數')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread')
+    parser.add_argument('--sample-every', type=int, default=1000, help='每完成幾個漫畫記錄一次 RSS')
+    args = parser.parse_args()
+    args.pages = -(-args.items // args.per_page)
+    
+    server, url = start_site(args)
+    output = tempfile.mkdtemp(prefix='comic_soak_')
+    samples = []
+    start = time.perf_counter()
+    
+    def on_overall(current, total):
+        if current and current % args.sample_every == 0 and (not samples or samples[-1][0] != current):
+            samples.append((current, time.perf_counter() - start, current_rss_mb(), peak_rss_mb()))
+            print(f"{current:>8}{samples[-1][1]:>9.1f}{samples[-1][2]:>10.1f}{samples[-1][3]:>10.1f}"
+                  f"{samples[-1][2] - samples[0][2]:>+10.1f}", flush=True)
+    
+    # 幾乎不限速，只量測程式本身
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    options = dict(on_overall=on_overall, index_path=os.path.join(output, 'index.sqlite3'),
+                   cache_path=os.path.join(output, 'cache.sqlite3'), mirror_stats_path=None,
+                   journal_path=os.path.join(output, 'journal.sqlite3'),
+                   catalog_path=os.path.join(output, 'catalog.sqlite3'),
+                   rate_limiter=RateLimiter(page_policy=policy, file_policy=policy))
+    print(f"{'完成數':>8}{'秒數':>9}{'RSS MB':>10}{'最高 MB':>10}{'增加 MB':>10}")
+    try:
+        if args.engine == 'async':
+            from async_engine import AsyncDownloadEngine
+            engine = AsyncDownloadEngine(url, 1, args.pages, output, args.workers, **options)
+        else:
+            from downloader_core import MangaDownloader
+            engine = MangaDownloader(url, 1, args.pages, output, args.workers, **options)
+        engine.run()
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(output, ignore_errors=True)
+    print(f"共 {engine.completed_count} 個漫畫, {time.perf_counter() - start:.1f} 秒, 最高 RSS {peak_rss_mb():.1f} MB")
+
+if __name__ == '__main__':
+    main()
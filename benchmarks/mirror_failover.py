@@ -0,0 +1,87 @@
+"""
+鏡像選擇與中途切換效能測試：啟動兩個本機假鏡像 (fake_wnacg.py)，
+第一個 (對應「本地下載一」) 較慢且會在傳輸途中斷線，第二個較快，比較：
+
+- first：只使用第一個鏡像 (舊行為，失敗時等待後重試同一個鏡像)
+- ranked：收集所有鏡像，依量測到的速度與錯誤率排序，出錯或太慢時立即改用其他鏡像以 Range 續傳
+
+用法: python benchmarks/mirror_failover.py --files 12 --workers 3 --slow-kbps 256 --fast-kbps 2048 --drop-rate 0.3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from downloader_core import MangaDownloader
+from fake_wnacg import SiteConfig, start_site
+from rate_limiter import HostPolicy, RateLimiter
+
+STRATEGIES = ['first', 'ranked']
+
+def file_url(site_url, aid):
+    return site_url.split('/albums-')[0] + f'/files/{aid}.zip'
+
+def run_strategy(strategy, mirrors, args):
+    """用同一個下載器依序下載所有檔案，回傳 (秒數, 成功數, 下載器)"""
+    output_folder = tempfile.mkdtemp(prefix='comic_mirror_')
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    downloader = MangaDownloader('http://127.0.0.1/', 1, 1, output_folder, args.workers,
+                                 segment_count=1, index_path=None, cache_path=None, mirror_stats_path=None,
+                                 journal_path=None, catalog_path=None,
+                                 rate_limiter=RateLimiter(page_policy=policy, file_policy=policy))
+    
+    def download(aid):
+        urls = [file_url(site_url, aid) for site_url in mirrors]
+        if strategy == 'first':
+            urls = urls[:1]
+        return downloader.download_file(urls, os.path.join(output_folder, f'{aid}.zip'), str(aid))
+    
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(download, range(1, args.files + 1)))
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+    return time.perf_counter() - start, sum(1 for result in results if result), downloader
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=12, help='下載的檔案數')
+    parser.add_argument('--workers', type=int, default=3, help='同時下載數')
+    parser.add_argument('--zip-kb', type=int, default=2048, help='每個 zip 的大小 (KB)')
+    parser.add_argument('--slow-kbps', type=float, default=256, help='第一個鏡像每個連線的速度上限 (KB/s)')
+    parser.add_argument('--fast-kbps', type=float, default=2048, help='第二個鏡像每個連線的速度上限 (KB/s)')
+    parser.add_argument('--drop-rate', type=float, default=0.3, help='第一個鏡像傳到一半斷線的比例 (0~1)')
+    parser.add_argument('--strategy', nargs='+', choices=STRATEGIES, default=STRATEGIES)
+    args = parser.parse_args()
+    
+    slow_config = SiteConfig(zip_size=args.zip_kb * 1024, bandwidth=args.slow_kbps * 1024, drop_rate=args.drop_rate)
+    fast_config = SiteConfig(zip_size=args.zip_kb * 1024, bandwidth=args.fast_kbps * 1024)
+    servers = [start_site(slow_config), start_site(fast_config)]
+    mirrors = [url for _, url in servers]
+    total_mb = args.files * args.zip_kb / 1024
+    
+    print(f"{'策略':<8}{'成功':>6}{'總秒數':>9}{'MB/s':>8}{'切換':>6}{'重試':>6}{'慢鏡像 MB':>11}{'快鏡像 MB':>11}{'斷線':>6}")
+    try:
+        for strategy in args.strategy:
+            for server, _ in servers:
+                server.stats.reset()
+            elapsed, completed, downloader = run_strategy(strategy, mirrors, args)
+            slow, fast = (server.stats.to_dict() for server, _ in servers)
+            print(f"{strategy:<10}{completed:>6}{elapsed:>9.2f}{total_mb / elapsed:>8.2f}"
+                  f"{downloader.metrics.counter('mirror_failovers'):>6}{downloader.metrics.counter('retries'):>6}"
+                  f"{slow['bytes_sent'] / 1048576:>11.1f}{fast['bytes_sent'] / 1048576:>11.1f}{slow['dropped']:>6}",
+                  flush=True)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+if __name__ == '__main__':
+    main()
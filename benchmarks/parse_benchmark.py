@@ -0,0 +1,94 @@
+"""
+HTML 解析效能測試：以 benchmarks/fixtures 下保存的列表頁、漫畫頁、下載頁，
+比較舊版做法 (BeautifulSoup + 依序嘗試每個選擇器) 與 page_parser 各後端的單次走訪擷取。
+
+用法: python benchmarks/parse_benchmark.py --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import page_parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PAGE_URL = 'https://www.wnacg.com/search/index.php?q=test&p=1'
+MANGA_URL = 'https://www.wnacg.com/photos-index-aid-234567.html'
+DOWNLOAD_PAGE_URL = 'https://www.wnacg.com/download-index-aid-234567.html'
+
+def legacy_select(soup, selector):
+    if ':contains(' in selector:
+        text = selector.split(':contains("')[1].split('")')[0]
+        return soup.find_all('a', string=lambda s: s and text in s)
+    return soup.select(selector)
+
+def legacy_links(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    manga_links = []
+    for selector in page_parser.LINK_SELECTORS:
+        links = soup.select(selector)
+        if links:
+            for link in links:
+                href = link.get('href')
+                if href:
+                    full_url = urljoin(PAGE_URL, href)
+                    if full_url not in manga_links:
+                        manga_links.append(full_url)
+            break
+    return manga_links
+
+def legacy_gallery(content):
+    # 舊版的標題與下載連結各自解析一次
+    soup = BeautifulSoup(content, 'html.parser')
+    title = next((soup.select_one(s).get_text().strip() for s in page_parser.TITLE_SELECTORS
+                  if soup.select_one(s)), None)
+    soup = BeautifulSoup(content, 'html.parser')
+    download = next((urljoin(MANGA_URL, legacy_select(soup, s)[0].get('href'))
+                     for s in page_parser.DOWNLOAD_SELECTORS if legacy_select(soup, s)), None)
+    return page_parser.clean_title(title, MANGA_URL), download
+
+def legacy_final(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return next((urljoin(DOWNLOAD_PAGE_URL, legacy_select(soup, s)[0].get('href'))
+                 for s in page_parser.FINAL_SELECTORS if legacy_select(soup, s)), None)
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+    
+    pages = {}
+    for name in ('listing', 'gallery', 'download'):
+        with open(os.path.join(FIXTURES, f'{name}.html'), 'rb') as f:
+            pages[name] = f.read()
+    
+    cases = {
+        'listing': (lambda: legacy_links(pages['listing']),
+                    lambda backend: page_parser.parse_manga_links(pages['listing'], PAGE_URL, backend)),
+        'gallery': (lambda: legacy_gallery(pages['gallery']),
+                    lambda backend: (lambda page: (page.title, page.download_page_url))(
+                        page_parser.parse_gallery_page(pages['gallery'], MANGA_URL, backend))),
+        'download': (lambda: legacy_final(pages['download']),
+                     lambda backend: page_parser.parse_final_download_link(pages['download'], DOWNLOAD_PAGE_URL, backend)),
+    }
+    
+    print(f"{'頁面':<10}{'解析器':<22}{'ms/頁':>10}{'加速':>8}  結果一致")
+    for name, (legacy, current) in cases.items():
+        legacy_ms, expected = timed(legacy, args.repeat)
+        print(f"{name:<10}{'舊版 BeautifulSoup':<22}{legacy_ms:>10.3f}{1.0:>8.1f}x")
+        for backend in page_parser.available_backends():
+            ms, result = timed(lambda: current(backend), args.repeat)
+            print(f"{name:<10}{backend:<22}{ms:>10.3f}{legacy_ms / ms:>8.1f}x  {result == expected}")
+
+if __name__ == '__main__':
+    main()
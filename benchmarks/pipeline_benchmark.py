@@ -0,0 +1,171 @@
+"""
+端對端下載流程效能測試：對本機假 wnacg 網站 (fake_wnacg.py) 執行完整的
+列表頁 → 漫畫頁 → 下載頁 → 檔案流程，依引擎與同時下載數組合量測：
+
+- 每分鐘完成的漫畫數
+- 首個檔案位元組時間 (從開始執行到伺服器送出第一個 zip 位元組)
+- 檔案請求的回應時間 (TTFB) p50 / p95
+- 尖峰記憶體 (每個組合在獨立的子程序中執行)
+
+用法:
+    python benchmarks/pipeline_benchmark.py --pages 1 3 --workers 2 4 8 --engine thread async
+    python benchmarks/pipeline_benchmark.py --latency-ms 80 --bandwidth-kbps 1024 --error-rate 0.05 --json-out result.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不量測記憶體
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from fake_wnacg import SiteConfig, start_site
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def build_rate_limiter(name):
+    """default：與實際執行相同的限速參數；open：幾乎不限速，只量測程式本身"""
+    from rate_limiter import HostPolicy, RateLimiter
+    if name == 'default':
+        return RateLimiter()
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    return RateLimiter(page_policy=policy, file_policy=policy)
+
+def run_one(spec):
+    """子程序：執行一次下載並回傳結果 (JSON)"""
+    from downloader_core import MangaDownloader
+    
+    options = dict(index_path=os.path.join(spec['output'], 'index.sqlite3'), cache_path=None,
+                   mirror_stats_path=None, journal_path=None, catalog_path=None,
+                   rate_limiter=build_rate_limiter(spec['limiter']))
+    if spec['engine'] == 'async':
+        from async_engine import AsyncDownloadEngine
+        engine = AsyncDownloadEngine(spec['url'], spec['start_page'], spec['end_page'], spec['output'],
+                                     spec['workers'], **options)
+    else:
+        engine = MangaDownloader(spec['url'], spec['start_page'], spec['end_page'], spec['output'],
+                                 spec['workers'], **options)
+    
+    started_at = time.time()
+    start = time.perf_counter()
+    completed = engine.run()
+    elapsed = time.perf_counter() - start
+    
+    file_latency = engine.metrics.histogram('request_seconds', kind='file') or {}
+    return {
+        'completed': completed,
+        'started_at': started_at,
+        'elapsed': elapsed,
+        'downloaded': len([name for name in os.listdir(spec['output']) if name.endswith('.zip')]),
+        'file_ttfb_p50': file_latency.get('p50'),
+        'file_ttfb_p95': file_latency.get('p95'),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def run_case(server, url, engine, workers, args):
+    output = tempfile.mkdtemp(prefix='comic_bench_')
+    spec = {
+        'url': url,
+        'start_page': args.pages[0],
+        'end_page': args.pages[1],
+        'workers': workers,
+        'engine': engine,
+        'limiter': args.limiter,
+        'output': output,
+    }
+    server.stats.reset()
+    try:
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', json.dumps(spec)],
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f"{engine}/{workers} 執行失敗:\n{process.stderr[-2000:]}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    
+    first_byte_at = server.stats.first_file_byte_at
+    site = server.stats.to_dict()
+    result.update(
+        engine=engine,
+        workers=workers,
+        manga_per_min=result['downloaded'] / result['elapsed'] * 60,
+        first_file_byte=first_byte_at - result['started_at'] if first_byte_at else None,
+        mb_per_s=site['bytes_sent'] / result['elapsed'] / 1048576,
+        server=site,
+    )
+    return result
+
+def format_optional(value, pattern):
+    return pattern.format(value) if value is not None else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs=2, default=[1, 2], metavar=('START', 'END'), help='下載的頁數範圍')
+    parser.add_argument('--per-page', type=int, default=12, help='每頁漫畫數')
+    parser.add_argument('--zip-kb', type=int, default=512, help='每個 zip 的大小 (KB)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8], help='同時下載數 (可多個)')
+    parser.add_argument('--engine', nargs='+', choices=['thread', 'async'], default=['thread'])
+    parser.add_argument('--limiter', choices=['open', 'default'], default='open',
+                        help='open：不限速，量測程式本身；default：使用實際的限速參數')
+    parser.add_argument('--latency-ms', type=float, default=20, help='伺服器每個回應的延遲')
+    parser.add_argument('--bandwidth-kbps', type=float, default=None, help='每個連線的速度上限 (KB/s)')
+    parser.add_argument('--total-bandwidth-kbps', type=float, default=None, help='所有連線合計的速度上限 (KB/s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='隨機回傳 503 的比例 (0~1)')
+    parser.add_argument('--json-out', default=None, help='把結果寫成 JSON，方便比較不同版本')
+    parser.add_argument('--run-one', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+    
+    config = SiteConfig(
+        pages=args.pages[1],
+        per_page=args.per_page,
+        zip_size=args.zip_kb * 1024,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None,
+        total_bandwidth=args.total_bandwidth_kbps * 1024 if args.total_bandwidth_kbps else None,
+        error_rate=args.error_rate,
+    )
+    server, url = start_site(config)
+    
+    results = []
+    print(f"{'引擎':<8}{'下載數':>6}{'漫畫/分':>10}{'總秒數':>9}{'首位元組':>10}"
+          f"{'TTFB p50':>10}{'TTFB p95':>10}{'MB/s':>8}{'尖峰 MB':>9}{'503':>6}")
+    try:
+        for engine in args.engine:
+            for workers in args.workers:
+                result = run_case(server, url, engine, workers, args)
+                results.append(result)
+                print(f"{engine + '/' + str(workers):<10}{result['downloaded']:>6}"
+                      f"{result['manga_per_min']:>10.1f}{result['elapsed']:>9.2f}"
+                      f"{format_optional(result['first_file_byte'], '{:.3f}'):>10}"
+                      f"{format_optional(result['file_ttfb_p50'], '{:.3f}'):>10}"
+                      f"{format_optional(result['file_ttfb_p95'], '{:.3f}'):>10}"
+                      f"{result['mb_per_s']:>8.2f}{format_optional(result['peak_rss_mb'], '{:.1f}'):>9}"
+                      f"{result['server']['injected_503']:>6}", flush=True)
+    finally:
+        server.shutdown()
+    
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
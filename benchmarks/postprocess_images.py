@@ -0,0 +1,138 @@
+"""
+下載後處理效能測試：產生內含 PNG/JPEG 頁面的 zip，以不同的行程數重新打包為 CBZ 並重新壓縮圖片，量測：
+
+- 總秒數與每秒處理頁數
+- 檔案大小的節省比例
+- 主行程與子行程的最高記憶體用量
+- 主行程中另一個執行緒 (代表下載執行緒) 最久被延遲多少毫秒
+
+用法: python benchmarks/postprocess_images.py --archives 3 --pages 12 --workers 1 4
+      python benchmarks/postprocess_images.py --format avif --quality 60
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+from metrics import format_bytes
+from postprocess import IMAGE_FORMATS, PostProcessOptions, PostProcessor, cbz_path, image_format_available
+
+from PIL import Image
+
+def make_page(rng, width, height, image_format):
+    # 漸層加上雜訊，接近掃描頁面的內容
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), rng.uniform(20, 40))
+    page = Image.merge('RGB', [Image.blend(gradient, noise, 0.3), noise, gradient])
+    output = BytesIO()
+    if image_format == 'png':
+        page.save(output, format='PNG')
+    else:
+        page.save(output, format='JPEG', quality=95)
+    return output.getvalue()
+
+def make_archives(folder, args):
+    rng = random.Random(1)
+    paths = []
+    for number in range(args.archives):
+        path = os.path.join(folder, f"bench_{number}.zip")
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+            for page in range(args.pages):
+                image_format = 'png' if page % 2 else 'jpeg'
+                extension = 'png' if image_format == 'png' else 'jpg'
+                archive.writestr(f"img/{page + 1}.{extension}",
+                                 make_page(rng, args.width, args.height, image_format))
+            archive.writestr('info.txt', 'benchmark')
+        paths.append(path)
+    return paths
+
+class Heartbeat:
+    """每隔 interval 秒醒來一次，記錄最久的延遲 (主行程被佔用的程度)"""
+    
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.max_delay = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    
+    def run(self):
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            time.sleep(self.interval)
+            self.max_delay = max(self.max_delay, time.perf_counter() - start - self.interval)
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+def run_case(sources, workers, args):
+    folder = tempfile.mkdtemp(prefix='comic_postprocess_')
+    try:
+        paths = []
+        for source in sources:
+            paths.append(shutil.copy(source, folder))
+        options = PostProcessOptions(cbz=True, image_format=args.format, quality=args.quality,
+                                     min_recompress_bytes=args.min_kb * 1024, workers=workers)
+        processor = PostProcessor(options)
+        start = time.perf_counter()
+        with Heartbeat() as heartbeat:
+            processor.start()
+            for path in paths:
+                processor.submit(path, os.path.basename(path))
+            processor.close()
+        elapsed = time.perf_counter() - start
+        outputs = [cbz_path(path) for path in paths]
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError(f"沒有產生 CBZ: {missing}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return processor.report, elapsed, heartbeat.max_delay
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--archives', type=int, default=3, help='zip 數')
+    parser.add_argument('--pages', type=int, default=12, help='每個 zip 的頁數 (PNG 與 JPEG 各半)')
+    parser.add_argument('--width', type=int, default=1200)
+    parser.add_argument('--height', type=int, default=1700)
+    parser.add_argument('--format', choices=IMAGE_FORMATS, default='webp')
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--min-kb', type=int, default=256, help='只重新壓縮大於此大小的頁面 (KB)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='行程數')
+    args = parser.parse_args()
+    if not image_format_available(args.format):
+        parser.error(f"目前的 Pillow 不支援 {args.format}")
+    
+    source_folder = tempfile.mkdtemp(prefix='comic_postprocess_src_')
+    try:
+        sources = make_archives(source_folder, args)
+        total_pages = args.archives * args.pages
+        print(f"{'行程數':<8}{'秒數':>8}{'頁/秒':>8}{'處理前':>12}{'處理後':>12}{'節省':>8}"
+              f"{'主行程 RSS':>12}{'子行程 RSS':>12}{'執行緒延遲 ms':>14}")
+        for workers in dict.fromkeys(args.workers):
+            report, elapsed, max_delay = run_case(sources, workers, args)
+            saved = 1 - report.bytes_after / report.bytes_before
+            # Linux 的 ru_maxrss 單位為 KB
+            self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+            print(f"{workers:<8}{elapsed:>8.2f}{total_pages / elapsed:>8.1f}{format_bytes(report.bytes_before):>12}"
+                  f"{format_bytes(report.bytes_after):>12}{saved * 100:>7.1f}%{format_bytes(self_rss):>12}"
+                  f"{format_bytes(child_rss):>12}{max_delay * 1000:>14.1f}", flush=True)
+    finally:
+        shutil.rmtree(source_folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+以本機假伺服器驗證 rate_limiter：伺服器在每秒請求數超過上限時回傳 503，
+比較「不限速」與「自適應限速」兩種模式下的成功數、503 數與實際速率。
+
+用法: python benchmarks/rate_limit_stub.py --allowed-rate 5 --requests 100 --threads 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rate_limiter import HostPolicy, RateLimiter
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """一秒內的請求數超過 allowed_rate 時回傳 503 + Retry-After"""
+    protocol_version = 'HTTP/1.1'
+    allowed_rate = 5
+    retry_after = 1
+    recent = deque()
+    lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            throttled = len(self.recent) >= self.allowed_rate
+            if not throttled:
+                self.recent.append(now)
+        
+        body = b'busy' if throttled else b'ok'
+        self.send_response(503 if throttled else 200)
+        if throttled:
+            self.send_header('Retry-After', str(self.retry_after))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server(allowed_rate):
+    ThrottlingHandler.allowed_rate = allowed_rate
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_clients(url, total, threads, limiter=None):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=threads)
+    session.mount('http://', adapter)
+    results = {'ok': 0, 'throttled': 0}
+    lock = threading.Lock()
+    
+    def one_request(_):
+        # 被 503 的請求會重試，直到成功為止
+        while True:
+            host = limiter.for_url(url) if limiter else None
+            if host:
+                host.acquire()
+            response = session.get(url, timeout=10)
+            if host:
+                host.release(response.status_code, response.headers.get('Retry-After'))
+            with lock:
+                if response.status_code == 200:
+                    results['ok'] += 1
+                    return
+                results['throttled'] += 1
+            if not host:
+                time.sleep(0.05)
+    
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_request, range(total)))
+    results['seconds'] = round(time.monotonic() - start, 2)
+    results['rate'] = round(results['ok'] / results['seconds'], 2)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--allowed-rate', type=int, default=5, help='伺服器每秒允許的請求數')
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    
+    server = start_server(args.allowed_rate)
+    url = f'http://127.0.0.1:{server.server_port}/'
+    try:
+        print('不限速:', run_clients(url, args.requests, args.threads))
+        time.sleep(1.5)
+        limiter = RateLimiter(page_policy=HostPolicy(initial_rate=2.0, max_rate=50.0,
+                                                     rate_increase=0.5, max_concurrency=args.threads))
+        print('自適應限速:', run_clients(url, args.requests, args.threads, limiter))
+        print('限速器狀態:', limiter.snapshot())
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
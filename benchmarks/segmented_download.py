@@ -0,0 +1,94 @@
+"""
+分段下載效能測試：本機伺服器支援 Range，但每個連線限速，
+比較單一連線與多連線分段下載同一個大檔案所需的時間。
+
+用法: python benchmarks/segmented_download.py --size-mb 8 --per-connection-kbps 1024 --segments 1 4 8
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from downloader_core import MangaDownloader
+from fake_wnacg import make_zip
+from rate_limiter import HostPolicy, RateLimiter
+
+class ThrottledRangeHandler(BaseHTTPRequestHandler):
+    """支援 Range 的靜態檔案，每個連線的傳輸速度固定上限"""
+    protocol_version = 'HTTP/1.1'
+    payload = b''
+    bytes_per_second = 1024 * 1024
+    chunk_size = 16 * 1024
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        data = self.payload
+        start, end = 0, len(data) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        
+        delay = self.chunk_size / self.bytes_per_second
+        try:
+            for position in range(start, end + 1, self.chunk_size):
+                self.wfile.write(data[position:min(position + self.chunk_size, end + 1)])
+                time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=8)
+    parser.add_argument('--per-connection-kbps', type=int, default=1024, help='每個連線的速度上限 (KB/s)')
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    
+    # 下載完成後會檢查 zip 結構，所以內容必須是真正的 zip 檔
+    ThrottledRangeHandler.payload = make_zip(1, args.size_mb * 1024 * 1024)
+    ThrottledRangeHandler.bytes_per_second = args.per_connection_kbps * 1024
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottledRangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/archive.zip'
+    
+    try:
+        for segment_count in args.segments:
+            output_folder = tempfile.mkdtemp()
+            # 測試時讓主機並發上限足以容納所有分段
+            rate_limiter = RateLimiter(file_policy=HostPolicy(
+                initial_rate=50.0, max_rate=50.0, burst=16.0,
+                initial_concurrency=max(segment_count, 2), max_concurrency=16))
+            downloader = MangaDownloader(url, 1, 1, output_folder, 1,
+                                         segment_count=segment_count, segment_threshold=1024 * 1024,
+                                         rate_limiter=rate_limiter)
+            filepath = os.path.join(output_folder, 'archive.zip')
+            
+            start = time.monotonic()
+            ok = bool(downloader.download_file(url, filepath, 'archive'))
+            elapsed = time.monotonic() - start
+            
+            with open(filepath, 'rb') as f:
+                intact = f.read() == ThrottledRangeHandler.payload
+            print(f"分段數 {segment_count}: {elapsed:6.2f} 秒, "
+                  f"{args.size_mb / elapsed:6.2f} MB/s, 成功={ok}, 內容正確={intact}")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
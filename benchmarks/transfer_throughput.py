@@ -0,0 +1,151 @@
+"""
+單一檔案傳輸效能測試：以本機 HTTP 伺服器 (另一個行程的 python -m http.server) 提供一個大 zip，比較：
+
+- legacy：舊的寫入迴圈 (iter_content 8 KB、每個區塊都組進度字串並回報)
+- adaptive：目前的 download_file (readinto 可重複使用的緩衝區、自動調整區塊大小、節流的進度回報、預先配置檔案空間)
+
+伺服器在另一個行程執行，量測到的 CPU 時間只包含下載端。
+
+用法: python benchmarks/transfer_throughput.py --size-mb 256 --repeat 3
+      python benchmarks/transfer_throughput.py --mode adaptive --fsync
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+from downloader_core import DOWNLOAD_HEADERS, MangaDownloader
+from rate_limiter import HostPolicy, RateLimiter
+
+MODES = ['legacy', 'adaptive']
+
+def make_zip(path, size):
+    # 不壓縮的隨機內容，大小接近 size
+    rng = random.Random(size)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        remaining, number = size, 0
+        while remaining > 0:
+            part = min(remaining, 16 * 1024 * 1024)
+            archive.writestr(f"{number:04d}.jpg", rng.randbytes(part))
+            remaining -= part
+            number += 1
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(directory):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'http.server', str(port), '--bind', '127.0.0.1',
+                                '--directory', directory],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/"
+    for _ in range(100):
+        try:
+            requests.head(url, timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("HTTP 伺服器沒有啟動")
+
+def legacy_download(url, filepath, title):
+    """舊版 download_single 的寫入迴圈"""
+    def on_progress(download_id, text):
+        pass
+    
+    download_id = f"download_{hash(title) % 10000}"
+    with requests.Session() as session:
+        response = session.get(url, headers=DOWNLOAD_HEADERS, stream=True, timeout=30)
+        response.raise_for_status()
+        total_size = int(response.headers.get('content-length', 0))
+        digest = hashlib.sha256()
+        downloaded_size = 0
+        with open(f"{filepath}.part", 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    downloaded_size += len(chunk)
+                    if total_size:
+                        progress = (downloaded_size / total_size) * 100
+                        on_progress(download_id, f"📥 下載中: {title} ({progress:.1f}%)")
+    os.replace(f"{filepath}.part", filepath)
+    return digest.hexdigest()
+
+def adaptive_download(url, filepath, title, args):
+    # 幾乎不限速，只量測寫入迴圈本身
+    policy = HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0,
+                        initial_concurrency=64, max_concurrency=64)
+    output = os.path.dirname(filepath)
+    engine = MangaDownloader(url, 1, 1, output, 1, index_path=os.path.join(output, 'index.sqlite3'),
+                             cache_path=None, mirror_stats_path=None, journal_path=None, catalog_path=None,
+                             segment_count=1,
+                             rate_limiter=RateLimiter(page_policy=policy, file_policy=policy),
+                             preallocate=not args.no_preallocate, fsync=args.fsync)
+    return engine.download_file(url, filepath, title)
+
+def run_case(mode, url, args):
+    output = tempfile.mkdtemp(prefix='comic_transfer_')
+    filepath = os.path.join(output, 'bench.zip')
+    try:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if mode == 'legacy':
+            sha256 = legacy_download(url, filepath, 'bench')
+        else:
+            sha256 = adaptive_download(url, filepath, 'bench', args)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        if not sha256:
+            raise RuntimeError(f"{mode} 下載失敗")
+        size = os.path.getsize(filepath)
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    return size, wall, cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=256, help='zip 的大小 (MB)')
+    parser.add_argument('--repeat', type=int, default=3, help='每種方式重複次數 (取最快的一次)')
+    parser.add_argument('--no-preallocate', action='store_true', help='adaptive 不預先配置檔案空間')
+    parser.add_argument('--fsync', action='store_true', help='adaptive 完成時 fsync')
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='comic_transfer_site_')
+    make_zip(os.path.join(directory, 'bench.zip'), args.size_mb * 1024 * 1024)
+    server, base_url = start_server(directory)
+    url = base_url + 'bench.zip'
+    
+    print(f"{'方式':<10}{'MB':>8}{'秒數':>9}{'MB/s':>10}{'CPU 秒/GB':>12}")
+    try:
+        # 先讀一次，讓檔案進入頁面快取
+        requests.get(url).content
+        for mode in args.mode:
+            best = None
+            for _ in range(args.repeat):
+                result = run_case(mode, url, args)
+                if best is None or result[1] < best[1]:
+                    best = result
+            size, wall, cpu = best
+            megabytes = size / 1024 / 1024
+            print(f"{mode:<10}{megabytes:>8.0f}{wall:>9.2f}{megabytes / wall:>10.1f}"
+                  f"{cpu / (size / 1024 ** 3):>12.2f}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
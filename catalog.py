@@ -0,0 +1,184 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+# 預設目錄位置：與下載索引一樣放在使用者目錄下，跨執行、跨輸出資料夾共用
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.comic_downloader', 'catalog.sqlite3')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS galleries (
+    key TEXT PRIMARY KEY,       -- 與下載索引相同的索引鍵 (aid，沒有 aid 時使用漫畫網址)
+    aid TEXT,
+    manga_url TEXT NOT NULL,
+    title TEXT,
+    category TEXT,
+    page_count INTEGER,
+    size INTEGER,               -- 檔案大小 (位元組)：漫畫頁上的標示或 HEAD 探測的結果
+    uploaded TEXT,              -- 上傳日期 (YYYY-MM-DD)
+    thumbnail_url TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS galleries_size ON galleries (size);
+CREATE INDEX IF NOT EXISTS galleries_page_count ON galleries (page_count);
+CREATE INDEX IF NOT EXISTS galleries_uploaded ON galleries (uploaded);
+CREATE INDEX IF NOT EXISTS galleries_category ON galleries (category);
+CREATE TABLE IF NOT EXISTS gallery_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS gallery_tags_key ON gallery_tags (key);
+'''
+
+# 標題、標籤與分類的全文索引：trigram 分詞可以搜尋中文標題中的任意片段 (至少 3 個字，較短的詞改用 LIKE)
+FTS_TOKENIZERS = [('trigram', 3), ('unicode61', 1)]
+FTS_SCHEMA = ("CREATE VIRTUAL TABLE IF NOT EXISTS galleries_fts "
+              "USING fts5(key UNINDEXED, title, tags, category, tokenize='{}')")
+
+# 目錄只是爬取時順便收集的資料：每累積這麼多筆寫入才 commit 一次 (關閉時寫入剩下的部分)
+COMMIT_BATCH_SIZE = 64
+
+COLUMNS = ['aid', 'manga_url', 'title', 'category', 'page_count', 'size', 'uploaded', 'thumbnail_url']
+
+@dataclass
+class CatalogQuery:
+    """目錄查詢條件 (未指定的條件不限制)"""
+    text: str = None                # 全文搜尋標題、標籤與分類，以空白分隔的每個詞都必須出現
+    tags: list = None               # 必須有全部這些標籤
+    exclude_tags: list = None       # 有任一個這些標籤就排除
+    category: str = None            # 分類包含此文字
+    min_pages: int = None
+    max_pages: int = None
+    max_size: int = None            # 位元組；大小未知的漫畫不符合
+    uploaded_after: str = None      # YYYY-MM-DD (含當天)
+    uploaded_before: str = None     # YYYY-MM-DD (含當天)
+    not_downloaded: bool = False    # 排除下載索引中已完成的漫畫
+    limit: int = None
+    
+    def describe(self):
+        """供日誌與工作日誌使用的查詢描述"""
+        return ' '.join(f"{name}={','.join(value) if isinstance(value, list) else value}"
+                        for name, value in asdict(self).items() if value not in (None, [], False)) or 'all'
+
+class Catalog:
+    """本機 SQLite 漫畫目錄：爬取時順便記錄漫畫頁上的資訊，供離線篩選要下載的漫畫"""
+    
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        # 全文索引需要 SQLite 的 FTS5 模組，沒有時所有文字搜尋都改用 LIKE
+        self.fts_min_length = None
+        for tokenizer, min_length in FTS_TOKENIZERS:
+            try:
+                self._conn.execute(FTS_SCHEMA.format(tokenizer))
+            except sqlite3.OperationalError:
+                continue
+            self.fts_min_length = min_length
+            break
+    
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+    
+    def _commit_batch(self):
+        """累積 COMMIT_BATCH_SIZE 筆寫入才 commit (呼叫前需持有鎖)"""
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_BATCH_SIZE:
+            self._conn.commit()
+            self._uncommitted = 0
+    
+    def record(self, key, page):
+        """新增或更新漫畫頁的解析結果 (GalleryPage)；頁面沒有標示大小時保留原本探測到的大小"""
+        values = [page.aid, page.url, page.title, page.category, page.page_count, page.size, page.uploaded,
+                  page.thumbnail_url]
+        updates = ', '.join(f"{column} = excluded.{column}" for column in COLUMNS if column != 'size')
+        tags = list(dict.fromkeys(page.tags or []))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO galleries (key, {', '.join(COLUMNS)}, updated_at) "
+                f"VALUES (?, {', '.join('?' * len(COLUMNS))}, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}, size = COALESCE(excluded.size, galleries.size), "
+                f"updated_at = excluded.updated_at",
+                [key, *values, time.time()],
+            )
+            self._conn.execute("DELETE FROM gallery_tags WHERE key = ?", (key,))
+            self._conn.executemany("INSERT INTO gallery_tags (tag, key) VALUES (?, ?)",
+                                   [(tag, key) for tag in tags])
+            if self.fts_min_length is not None:
+                self._conn.execute("DELETE FROM galleries_fts WHERE key = ?", (key,))
+                self._conn.execute("INSERT INTO galleries_fts (key, title, tags, category) VALUES (?, ?, ?, ?)",
+                                   (key, page.title, ' '.join(tags), page.category or ''))
+            self._commit_batch()
+    
+    def set_size(self, key, size):
+        """記錄 HEAD 探測到的檔案大小"""
+        with self._lock:
+            self._conn.execute("UPDATE galleries SET size = ? WHERE key = ?", (size, key))
+            self._commit_batch()
+    
+    def text_condition(self, term):
+        if self.fts_min_length is not None and len(term) >= self.fts_min_length:
+            # 以雙引號包住，詞中的符號不會被當作 FTS 查詢語法
+            phrase = '"' + term.replace('"', '""') + '"'
+            return "key IN (SELECT key FROM galleries_fts WHERE galleries_fts MATCH ?)", [phrase]
+        pattern = f"%{term}%"
+        return ("(title LIKE ? OR category LIKE ? OR key IN (SELECT key FROM gallery_tags WHERE tag LIKE ?))",
+                [pattern, pattern, pattern])
+    
+    def search(self, query, index=None):
+        """回傳符合條件的漫畫 (依上傳日期由新到舊)；query.not_downloaded 時需要傳入下載索引 index"""
+        conditions, params = [], []
+        for term in (query.text or '').split():
+            condition, values = self.text_condition(term)
+            conditions.append(condition)
+            params.extend(values)
+        for tag in query.tags or []:
+            conditions.append("key IN (SELECT key FROM gallery_tags WHERE tag = ?)")
+            params.append(tag)
+        if query.exclude_tags:
+            conditions.append(f"key NOT IN (SELECT key FROM gallery_tags WHERE tag IN "
+                              f"({','.join('?' * len(query.exclude_tags))}))")
+            params.extend(query.exclude_tags)
+        if query.category:
+            conditions.append("category LIKE ?")
+            params.append(f"%{query.category}%")
+        for column, operator, value in [('page_count', '>=', query.min_pages), ('page_count', '<=', query.max_pages),
+                                        ('size', '<=', query.max_size), ('uploaded', '>=', query.uploaded_after),
+                                        ('uploaded', '<=', query.uploaded_before)]:
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        
+        sql = f"SELECT key, {', '.join(COLUMNS)} FROM galleries"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY uploaded DESC, key"
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [column[0] for column in cursor.description]
+            entries = [dict(zip(names, row)) for row in cursor.fetchall()]
+            for entry in entries:
+                entry['tags'] = [row[0] for row in self._conn.execute(
+                    "SELECT tag FROM gallery_tags WHERE key = ? ORDER BY tag", (entry['key'],))]
+        
+        if query.not_downloaded and index is not None:
+            done_keys = index.completed_keys(entry['key'] for entry in entries)
+            entries = [entry for entry in entries if entry['key'] not in done_keys]
+        return entries[:query.limit] if query.limit is not None else entries
+    
+    def counts(self):
+        """(漫畫數, 不同標籤數)"""
+        with self._lock:
+            galleries = self._conn.execute("SELECT COUNT(*) FROM galleries").fetchone()[0]
+            tags = self._conn.execute("SELECT COUNT(DISTINCT tag) FROM gallery_tags").fetchone()[0]
+        return galleries, tags
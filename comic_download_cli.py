@@ -0,0 +1,354 @@
+"""
+漫畫批量下載器 - 命令列版本 (不需要 PyQt6，可在無圖形介面的伺服器或 cron 中執行)
+
+用法:
+    python comic_download_cli.py "https://wnacg.com/search/...page-1..." --start-page 1 --end-page 5 -o downloads
+    python comic_download_cli.py URL --engine async --json > progress.jsonl
+    python comic_download_cli.py --batch searches.txt -o downloads
+    python comic_download_cli.py URL --cbz --recompress webp
+    python comic_download_cli.py URL --end-page 20 --harvest
+    python comic_download_cli.py --catalog-list --tag 全彩 --max-size-mb 200 --not-downloaded
+    python comic_download_cli.py --from-catalog --tag 全彩 --max-size-mb 200 --not-downloaded -o downloads
+    python comic_download_cli.py --verify-library downloads
+    python comic_download_cli.py --dead-letters
+"""
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+
+import page_parser
+from batch_jobs import SearchSpec, load_batch
+from catalog import DEFAULT_CATALOG_PATH, Catalog, CatalogQuery
+from download_index import DEFAULT_INDEX_PATH, DownloadIndex
+from downloader_core import LISTING_CONCURRENCY, SEGMENT_COUNT, SEGMENT_THRESHOLD, MangaDownloader
+from http_cache import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_PATH, DEFAULT_CACHE_TTL
+from integrity import VERIFY_WORKERS, verify_library
+from job_journal import DEFAULT_JOURNAL_PATH, MAX_ATTEMPTS, all_dead_letters
+from metrics import format_bytes
+from mirror_stats import DEFAULT_MIRROR_STATS_PATH
+from postprocess import (DEFAULT_MIN_RECOMPRESS_BYTES, DEFAULT_QUALITY, IMAGE_FORMATS, PostProcessOptions,
+                         image_format_available)
+from rate_limiter import FILE_POLICY, PAGE_POLICY, RateLimiter
+from scheduler import DEFAULT_MAX_INFLIGHT_BYTES, DEFAULT_ORDER, ORDERS
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="漫畫批量下載器 (命令列版)")
+    parser.add_argument('url', nargs='?', help="搜尋結果網址")
+    parser.add_argument('--start-page', type=int, default=1, help="起始頁 (預設 1)")
+    parser.add_argument('--end-page', type=int, default=1, help="結束頁 (預設 1)")
+    parser.add_argument('--batch', metavar='FILE', default=None,
+                        help="批次檔：每行「網址 [起始頁 [結束頁]]」或 JSON 陣列，所有搜尋共用同一個引擎與去重 (不需要網址參數)")
+    parser.add_argument('--harvest', action='store_true',
+                        help="只掃描列表頁與漫畫頁、探測檔案大小並寫入目錄，不下載檔案")
+    parser.add_argument('--from-catalog', action='store_true',
+                        help="不掃描列表頁，改為下載目錄中符合查詢條件的漫畫 (不需要網址參數)")
+    parser.add_argument('--catalog-list', action='store_true', help="不下載，列出目錄中符合查詢條件的漫畫")
+    parser.add_argument('--find', default=None, help="目錄查詢：全文搜尋標題、標籤與分類")
+    parser.add_argument('--tag', action='append', default=[], help="目錄查詢：必須有這個標籤 (可重複指定)")
+    parser.add_argument('--exclude-tag', action='append', default=[], help="目錄查詢：排除有這個標籤的漫畫")
+    parser.add_argument('--category', default=None, help="目錄查詢：分類包含此文字")
+    parser.add_argument('--min-pages', type=int, default=None, help="目錄查詢：最少頁數")
+    parser.add_argument('--max-pages', type=int, default=None, help="目錄查詢：最多頁數")
+    parser.add_argument('--max-size-mb', type=float, default=None, help="目錄查詢：檔案大小上限 (MB)")
+    parser.add_argument('--uploaded-after', default=None, metavar='YYYY-MM-DD', help="目錄查詢：上傳日期不早於")
+    parser.add_argument('--uploaded-before', default=None, metavar='YYYY-MM-DD', help="目錄查詢：上傳日期不晚於")
+    parser.add_argument('--not-downloaded', action='store_true', help="目錄查詢：排除下載索引中已完成的漫畫")
+    parser.add_argument('--limit', type=int, default=None, help="目錄查詢：最多幾本")
+    parser.add_argument('-o', '--output', default='downloads', help="輸出資料夾 (預設 ./downloads)")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="同時下載數 (預設 4)")
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                        help="下載引擎：thread (requests) 或 async (需要 aiohttp)")
+    parser.add_argument('--page-concurrency', type=int, default=None,
+                        help="async 引擎同時解析的漫畫頁數")
+    parser.add_argument('--listing-concurrency', type=int, default=LISTING_CONCURRENCY,
+                        help="同時抓取的列表頁數 (到達搜尋結果的最後一頁會自動停止)")
+    parser.add_argument('--segments', type=int, default=SEGMENT_COUNT,
+                        help="大檔分段連線數，1 = 不分段 (僅 thread 引擎)")
+    parser.add_argument('--segment-threshold-mb', type=int, default=SEGMENT_THRESHOLD // (1024 * 1024),
+                        help="超過此大小 (MB) 才分段下載")
+    parser.add_argument('--order', choices=ORDERS, default=DEFAULT_ORDER,
+                        help="下載順序：smallest = 小檔優先；fair = 各列表頁輪流；fifo = 依列表順序")
+    parser.add_argument('--prefer-tag', action='append', default=[], metavar='TAG',
+                        help="有這個標籤的漫畫優先下載 (可重複指定)")
+    parser.add_argument('--max-inflight-mb', type=int, default=DEFAULT_MAX_INFLIGHT_BYTES // (1024 * 1024),
+                        help="同時傳輸中的檔案大小合計上限 (MB)，0 = 不限制")
+    parser.add_argument('--bandwidth-kbps', type=float, default=None,
+                        help="所有下載合計的頻寬上限 (KB/s)")
+    parser.add_argument('--no-preallocate', action='store_true', help="下載前不預先配置檔案空間")
+    parser.add_argument('--fsync', action='store_true', help="檔案下載完成後先寫入磁碟 (fsync) 再改名")
+    parser.add_argument('--cbz', action='store_true',
+                        help="下載完成後重新打包為 CBZ (頁面依序改名為 001.jpg、002.jpg…)")
+    parser.add_argument('--recompress', choices=IMAGE_FORMATS, default=None,
+                        help="下載完成後把較大的 PNG/JPEG 頁面重新壓縮為 WebP 或 AVIF (需要 Pillow)")
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help="重新壓縮的品質 (1-100)")
+    parser.add_argument('--recompress-min-kb', type=int, default=DEFAULT_MIN_RECOMPRESS_BYTES // 1024,
+                        help="只重新壓縮大於此大小的頁面 (KB)")
+    parser.add_argument('--keep-original', action='store_true', help="打包為 CBZ 後保留原始 zip")
+    parser.add_argument('--post-workers', type=int, default=None,
+                        help="重新壓縮圖片的行程數 (預設為 CPU 核心數)")
+    parser.add_argument('--page-rate', type=float, default=None,
+                        help="網頁主機的每秒請求數上限")
+    parser.add_argument('--file-rate', type=float, default=None,
+                        help="檔案鏡像主機的每秒請求數上限")
+    parser.add_argument('--parser', choices=page_parser.available_backends(), default=page_parser.parser_backend,
+                        help="HTML 解析器 (預設使用最快的可用解析器)")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="下載索引 (SQLite) 路徑")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="網頁快取 (SQLite) 路徑")
+    parser.add_argument('--no-cache', action='store_true', help="不使用網頁快取")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL / 3600,
+                        help="漫畫頁、下載頁快取多少小時內不重新確認 (列表頁每次都會確認)")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="網頁快取大小上限 (MB)")
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH,
+                        help="漫畫目錄 (SQLite) 路徑：記錄爬取到的標題、標籤、頁數、大小等資訊")
+    parser.add_argument('--no-catalog', action='store_true', help="不記錄漫畫目錄")
+    parser.add_argument('--mirror-stats', default=DEFAULT_MIRROR_STATS_PATH,
+                        help="各鏡像速度與錯誤率紀錄 (SQLite) 路徑，用於選擇下載鏡像")
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH,
+                        help="工作日誌 (SQLite) 路徑：中斷後以同一個網址與資料夾執行時，從未完成的工作繼續")
+    parser.add_argument('--no-journal', action='store_true', help="不保存工作日誌 (每次從列表頁重新開始)")
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                        help="每個漫畫最多嘗試次數，失敗時以指數退避重新排入，用完後移入失敗清單")
+    parser.add_argument('--retry-dead', action='store_true', help="把這個搜尋失敗清單中的漫畫重新排入")
+    parser.add_argument('--dead-letters', action='store_true', help="不下載，改為列出工作日誌中的失敗清單")
+    parser.add_argument('--metrics-out', default=None,
+                        help="結束時寫出統計檔 (副檔名 .prom 為 Prometheus 文字格式，其餘為 JSON)")
+    parser.add_argument('--verify-library', metavar='FOLDER', default=None,
+                        help="不下載，改為檢查資料夾內所有 zip 檔 (大小、SHA-256、zip 結構)")
+    parser.add_argument('--verify-workers', type=int, default=VERIFY_WORKERS, help="檢查檔案的執行緒數")
+    parser.add_argument('--json', action='store_true', help="以 JSON Lines 格式輸出進度")
+    return parser
+
+def build_rate_limiter(args):
+    """依命令列參數調整各主機的速率上限"""
+    def with_max_rate(policy, max_rate):
+        if max_rate is None:
+            return policy
+        return dataclasses.replace(policy, max_rate=max_rate,
+                                   initial_rate=min(policy.initial_rate, max_rate))
+    return RateLimiter(page_policy=with_max_rate(PAGE_POLICY, args.page_rate),
+                       file_policy=with_max_rate(FILE_POLICY, args.file_rate))
+
+class ProgressPrinter:
+    """把引擎的回呼輸出到終端機：一般文字或 JSON Lines"""
+    
+    def __init__(self, as_json):
+        self.as_json = as_json
+    
+    def emit(self, event, **fields):
+        if self.as_json:
+            print(json.dumps({'time': round(time.time(), 3), 'event': event, **fields}, ensure_ascii=False), flush=True)
+        elif event == 'log':
+            print(f"[{time.strftime('%H:%M:%S')}] {fields['message']}", flush=True)
+        elif event == 'progress':
+            print(f"[{time.strftime('%H:%M:%S')}] {fields['text']}", flush=True)
+        elif event == 'overall' and fields['total']:
+            print(f"[{time.strftime('%H:%M:%S')}] 📊 總體進度: {fields['current']}/{fields['total']}", flush=True)
+        elif event == 'search' and fields['total']:
+            print(f"[{time.strftime('%H:%M:%S')}] 📚 搜尋 {fields['index'] + 1} 進度: "
+                  f"{fields['current']}/{fields['total']}", flush=True)
+    
+    def on_log(self, message):
+        self.emit('log', message=message)
+    
+    def on_progress(self, download_id, text):
+        self.emit('progress', id=download_id, text=text)
+    
+    def on_overall(self, current, total):
+        self.emit('overall', current=current, total=total)
+    
+    def on_search_progress(self, index, current, total):
+        self.emit('search', index=index, current=current, total=total)
+
+def build_post_process(args):
+    """依命令列參數建立下載後處理設定，不需要處理時回傳 None"""
+    if not args.cbz and not args.recompress:
+        return None
+    if args.recompress and not image_format_available(args.recompress):
+        raise RuntimeError(f"重新壓縮為 {args.recompress.upper()} 需要安裝支援此格式的 Pillow")
+    return PostProcessOptions(cbz=args.cbz, image_format=args.recompress, quality=args.quality,
+                              min_recompress_bytes=args.recompress_min_kb * 1024,
+                              keep_original=args.keep_original, workers=args.post_workers)
+
+def create_engine(args, printer, searches=None):
+    common = dict(
+        on_log=printer.on_log,
+        on_progress=printer.on_progress,
+        on_overall=printer.on_overall,
+        on_search_progress=printer.on_search_progress,
+        searches=searches,
+        index_path=args.index,
+        rate_limiter=build_rate_limiter(args),
+        cache_path=None if args.no_cache else args.cache,
+        cache_ttl=args.cache_ttl * 3600,
+        cache_max_bytes=args.cache_size_mb * 1024 * 1024,
+        metrics_path=args.metrics_out,
+        mirror_stats_path=args.mirror_stats,
+        listing_concurrency=args.listing_concurrency,
+        journal_path=None if args.no_journal else args.journal,
+        max_attempts=args.max_attempts,
+        retry_dead=args.retry_dead,
+        download_order=args.order,
+        max_inflight_bytes=args.max_inflight_mb * 1024 * 1024 or None,
+        prefer_tags=args.prefer_tag,
+        bandwidth_limit=args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None,
+        preallocate=not args.no_preallocate,
+        fsync=args.fsync,
+        post_process=build_post_process(args),
+        catalog_path=None if args.no_catalog else args.catalog,
+        harvest_only=args.harvest,
+    )
+    if args.engine == 'async':
+        # 只在需要時才載入 aiohttp
+        from async_engine import PAGE_CONCURRENCY, AsyncDownloadEngine
+        return AsyncDownloadEngine(args.url, args.start_page, args.end_page, args.output, args.workers,
+                                   page_concurrency=args.page_concurrency or PAGE_CONCURRENCY, **common)
+    return MangaDownloader(args.url, args.start_page, args.end_page, args.output, args.workers,
+                           segment_count=args.segments,
+                           segment_threshold=args.segment_threshold_mb * 1024 * 1024, **common)
+
+def run_verify_library(args, printer):
+    """整庫檢查模式：全部通過時回傳 0，有損壞或雜湊不符的檔案時回傳 1"""
+    if not os.path.isdir(args.verify_library):
+        print(f"資料夾不存在: {args.verify_library}", file=sys.stderr)
+        return 2
+    
+    def on_result(result):
+        if args.json:
+            printer.emit('verify', **result)
+        elif result['status'] != 'ok':
+            printer.on_log(f"❌ {result['file']}: {result['reason']}")
+    
+    start = time.perf_counter()
+    results = verify_library(args.verify_library, args.verify_workers, on_result)
+    elapsed = time.perf_counter() - start
+    bad = [result for result in results if result['status'] != 'ok']
+    total_mb = sum(result['size'] for result in results) / 1048576
+    if args.json:
+        printer.emit('verified', files=len(results), failed=len(bad), seconds=round(elapsed, 3))
+    else:
+        printer.on_log(f"🔍 已檢查 {len(results)} 個檔案 ({total_mb:.1f} MB, {elapsed:.1f} 秒)，"
+                       f"{len(bad)} 個有問題")
+    return 1 if bad else 0
+
+def build_catalog_query(args):
+    return CatalogQuery(
+        text=args.find,
+        tags=args.tag,
+        exclude_tags=args.exclude_tag,
+        category=args.category,
+        min_pages=args.min_pages,
+        max_pages=args.max_pages,
+        max_size=int(args.max_size_mb * 1024 * 1024) if args.max_size_mb is not None else None,
+        uploaded_after=args.uploaded_after,
+        uploaded_before=args.uploaded_before,
+        not_downloaded=args.not_downloaded,
+        limit=args.limit,
+    )
+
+def search_catalog(args):
+    """以命令列的查詢條件搜尋目錄 (離線，不發出任何請求)"""
+    query = build_catalog_query(args)
+    catalog = Catalog(args.catalog)
+    index = DownloadIndex(args.index) if query.not_downloaded else None
+    try:
+        return query, catalog.search(query, index)
+    finally:
+        catalog.close()
+        if index is not None:
+            index.close()
+
+def show_catalog(args, printer):
+    """列出目錄中符合條件的漫畫"""
+    query, entries = search_catalog(args)
+    total_size = 0
+    for entry in entries:
+        total_size += entry['size'] or 0
+        if args.json:
+            printer.emit('catalog', **entry)
+        else:
+            size = format_bytes(entry['size']) if entry['size'] else '大小未知'
+            print(f"{entry['title']}\n    {entry['manga_url']}\n"
+                  f"    {entry['category'] or '-'}, {entry['page_count'] or '?'} 頁, {size}, "
+                  f"{entry['uploaded'] or '-'}, 標籤: {', '.join(entry['tags']) or '-'}")
+    if not args.json:
+        print(f"符合 {query.describe()} 的漫畫共 {len(entries)} 本, 合計 {format_bytes(total_size)}")
+    return 0
+
+def show_dead_letters(args, printer):
+    """列出所有搜尋的失敗清單；清單是空的時回傳 0，否則回傳 1"""
+    letters = all_dead_letters(args.journal)
+    for run, record in letters:
+        if args.json:
+            printer.emit('dead_letter', run=run, **dataclasses.asdict(record))
+        else:
+            print(f"{record.title or record.manga_url}\n    {record.manga_url}\n"
+                  f"    失敗 {record.attempts} 次: {record.last_error}\n    工作: {run}")
+    if not args.json:
+        print(f"失敗清單共 {len(letters)} 個漫畫 (以同一個網址與資料夾加上 --retry-dead 執行可重新排入)")
+    return 1 if letters else 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.verify_library:
+        return run_verify_library(args, ProgressPrinter(args.json))
+    if args.dead_letters:
+        return show_dead_letters(args, ProgressPrinter(args.json))
+    if args.catalog_list:
+        return show_catalog(args, ProgressPrinter(args.json))
+    if args.start_page > args.end_page:
+        print("起始頁不能大於結束頁！", file=sys.stderr)
+        return 2
+    searches = None
+    if args.from_catalog:
+        query, entries = search_catalog(args)
+        if not entries:
+            print(f"目錄中沒有符合 {query.describe()} 的漫畫", file=sys.stderr)
+            return 0
+        # 選出的漫畫當作一個不掃描列表頁的搜尋，其餘流程 (去重、工作日誌、續傳) 與一般搜尋相同
+        searches = [SearchSpec(f"catalog:{query.describe()}", manga_urls=[entry['manga_url'] for entry in entries])]
+        args.url = searches[0].url
+    elif args.batch:
+        try:
+            searches = load_batch(args.batch, args.start_page, args.end_page)
+        except (OSError, ValueError) as e:
+            print(f"無法讀取批次檔: {e}", file=sys.stderr)
+            return 2
+        args.url = searches[0].url
+    if not args.url:
+        print("請輸入搜尋結果網址！", file=sys.stderr)
+        return 2
+    
+    page_parser.set_backend(args.parser)
+    printer = ProgressPrinter(args.json)
+    try:
+        engine = create_engine(args, printer, searches)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    
+    try:
+        completed = engine.run()
+    except KeyboardInterrupt:
+        # 兩種引擎都已停止所有工作、保存 .part 的續傳資訊並關閉資料庫後才把 Ctrl+C 拋出來
+        engine.cancel()
+        if args.json:
+            printer.emit('cancelled')
+        else:
+            print("🛑 已取消下載", file=sys.stderr)
+        return 130
+    except Exception as e:
+        if args.json:
+            printer.emit('error', message=str(e))
+        else:
+            print(f"程式錯誤: {str(e)}", file=sys.stderr)
+        return 1
+    
+    printer.emit('finished', completed=completed)
+    return 0 if completed else 130
+
+if __name__ == '__main__':
+    sys.exit(main())
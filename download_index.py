@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# 預設索引位置：放在使用者目錄下，跨執行、跨輸出資料夾共用
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.comic_downloader', 'index.sqlite3')
+
+STATUS_RESOLVED = 'resolved'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS downloads (
+    key TEXT PRIMARY KEY,       -- aid，沒有 aid 時使用漫畫網址
+    manga_url TEXT NOT NULL,
+    title TEXT,
+    final_url TEXT,
+    filepath TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_status ON downloads (status);
+'''
+
+def index_key(manga_url, aid=None):
+    """索引鍵：優先使用 aid，讓同一本漫畫的不同網址視為同一筆"""
+    return f"aid:{aid}" if aid else f"url:{manga_url}"
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """計算檔案的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadIndex:
+    """本機 SQLite 下載索引：記錄每本漫畫的標題、下載網址、大小、雜湊與狀態"""
+    
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL 加 synchronous=NORMAL：commit 時不等待 fsync (每個漫畫在下載過程中都會寫入好幾次)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def completed_keys(self, keys):
+        """從 keys 中找出已完成下載的索引鍵"""
+        keys = list(keys)
+        if not keys:
+            return set()
+        placeholders = ','.join('?' * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM downloads WHERE status = ? AND key IN ({placeholders})",
+                [STATUS_DONE, *keys],
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def get(self, key):
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM downloads WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
+    
+    def record(self, key, manga_url, status, **fields):
+        """新增或更新一筆紀錄；未提供的欄位保留原值"""
+        columns = ['manga_url', 'status', 'updated_at', *fields]
+        values = [manga_url, status, time.time(), *fields.values()]
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO downloads (key, {', '.join(columns)}) "
+                f"VALUES (?, {', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}",
+                [key, *values],
+            )
+            self._conn.commit()
+    
+    def mark_resolved(self, key, manga_url, title, final_url):
+        self.record(key, manga_url, STATUS_RESOLVED, title=title, final_url=final_url)
+    
+    def mark_done(self, key, manga_url, title, filepath, sha256=None):
+        size = os.path.getsize(filepath) if os.path.exists(filepath) else None
+        self.record(key, manga_url, STATUS_DONE, title=title, filepath=filepath, size=size, sha256=sha256)
+    
+    def mark_failed(self, key, manga_url):
+        self.record(key, manga_url, STATUS_FAILED)
+    
+    def counts(self):
+        """各狀態的筆數"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM downloads GROUP BY status").fetchall()
+        return dict(rows)
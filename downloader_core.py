@@ -0,0 +1,768 @@
+import hashlib
+import os
+import time
+import threading
+import queue
+import urllib3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from batch_jobs import fixed_listing_pages
+from engine_base import (DOWNLOAD_HEADERS, LISTING_CONCURRENCY, PAGE_HEADERS, DownloadJob, EngineBase, MirrorFailover,
+                         RangeNotSatisfied, RecentLinks)
+from integrity import IntegrityError, ZipHeadCheck, hash_prefix
+from metrics import format_bytes
+from mirror_stats import MirrorTooSlow
+from page_parser import parse_download_mirrors, parse_gallery_page, parse_listing_page
+from rate_limiter import RequestCancelled
+from resume_state import (discard_partial, load_resume_state, parse_content_range_total, partial_size,
+                          resume_validator, save_resume_state)
+from scheduler import DownloadScheduler
+from transfer import ProgressThrottle, iter_response_chunks, preallocate
+
+# 禁用 SSL 警告
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# 每次執行最多快取的頁面數量
+PAGE_CACHE_SIZE = 256
+
+# 分段下載：檔案超過門檻且伺服器支援 Range 時，拆成多段同時下載
+SEGMENT_COUNT = 4
+SEGMENT_THRESHOLD = 16 * 1024 * 1024
+SEGMENT_MAX_RETRIES = 3
+
+# 各階段之間的佇列容量 (滿了就讓上游等待)；下載排程只在待下載的工作之間排序
+MANGA_QUEUE_SIZE = 100
+DOWNLOAD_QUEUE_SIZE = 32
+QUEUE_POLL_INTERVAL = 0.5
+
+class PageCache:
+    """有容量上限的 LRU 快取 (執行緒安全)"""
+    
+    def __init__(self, max_size=PAGE_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+def split_byte_ranges(total_size, count):
+    """把檔案切成 count 段 [起始, 結束, 0]，結束位置包含在內"""
+    count = max(1, min(count, total_size))
+    step = total_size // count
+    ranges = []
+    for i in range(count):
+        start = i * step
+        end = total_size - 1 if i == count - 1 else start + step - 1
+        ranges.append([start, end, 0])
+    return ranges
+
+class MangaDownloader(EngineBase):
+    """執行緒版下載引擎 (不依賴 Qt)：列表頁 → 漫畫頁 → 下載頁 → 檔案
+    
+    共用的建構參數與進度回呼見 EngineBase；segment_count/segment_threshold 為大檔案的分段下載設定
+    """
+    
+    def __init__(self, base_url, start_page, end_page, output_folder, max_workers,
+                 segment_count=SEGMENT_COUNT, segment_threshold=SEGMENT_THRESHOLD, **options):
+        super().__init__(base_url, start_page, end_page, output_folder, max_workers, **options)
+        self.segment_count = segment_count
+        self.segment_threshold = segment_threshold
+        self.resolver_count = 0
+        self.worker_error = None  # 異常結束的工作執行緒拋出的例外
+        
+        # 設置 requests session 以提升效能
+        self.session = requests.Session()
+        self.session.headers.update(PAGE_HEADERS)
+        
+        # 忽略 SSL 錯誤
+        self.session.verify = False
+        
+        # 漫畫頁面與下載頁面的解析結果快取 (本次執行內共用)
+        self.page_cache = PageCache()
+        
+    def get_listing_page(self, page_num, base_url=None):
+        """抓取並解析一個列表頁 (漫畫連結與分頁資訊)；失敗時回傳 None"""
+        page_url = self.get_page_url(page_num, base_url)
+        try:
+            self.on_log(f"🔍 正在分析頁面: {page_url}")
+            with self.metrics.timer('stage_seconds', stage='listing'):
+                content = self.fetch_page(page_url, 'listing')
+                with self.metrics.timer('parse_seconds', kind='listing'):
+                    listing = parse_listing_page(content, page_url)
+            
+            self.on_log(f"✅ 在此頁找到 {len(listing.links)} 個漫畫")
+            return listing
+            
+        except Exception as e:
+            self.on_log(f"❌ 頁面分析失敗 {page_url}: {str(e)}")
+            return None
+    
+    def iter_listing_pages(self, pages, base_url=None):
+        """依頁碼順序產生 (頁碼, 列表頁)；同時抓取後面幾頁，呼叫端停止迭代時不再發出新的請求"""
+        pending = {}
+        next_index = 0
+        executor = ThreadPoolExecutor(max_workers=self.listing_concurrency)
+        try:
+            for index, page_num in enumerate(pages):
+                # 第一頁回來之前只抓一頁：搜尋結果只有一頁時不必多發請求
+                window = self.listing_concurrency if index > 0 else 1
+                while next_index < len(pages) and len(pending) < window:
+                    pending[pages[next_index]] = executor.submit(self.get_listing_page, pages[next_index], base_url)
+                    next_index += 1
+                yield page_num, pending.pop(page_num).result()
+        finally:
+            # 取消還沒開始的頁面，等已送出的請求結束 (最多 listing_concurrency - 1 個)
+            executor.shutdown(cancel_futures=True)
+    
+    def _fetch(self, url, kind, method='GET', **kwargs):
+        """經由主機限速器發送請求，並依類別記錄請求次數、等待時間與回應延遲"""
+        kwargs.setdefault('timeout', 30)
+        
+        limiter = self.rate_limiter.for_url(url, 'file' if kind in ('file', 'probe') else 'page')
+        wait_start = time.perf_counter()
+        limiter.acquire(lambda: self.is_cancelled)
+        self.metrics.inc('sleep_seconds', time.perf_counter() - wait_start, reason='rate_limit')
+        self.metrics.inc('requests', kind=kind)
+        
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            limiter.release(error=True)
+            self.metrics.inc('request_errors', kind=kind)
+            raise
+        # 串流請求只到收到標頭為止 (首位元組時間)，一般請求包含讀取內容
+        self.metrics.observe('request_seconds', time.perf_counter() - start, kind=kind)
+        self.metrics.inc('responses', kind=kind, status=str(response.status_code))
+        
+        if kwargs.get('stream'):
+            # 串流下載要等內容讀完才歸還並發名額
+            response.host_limiter = limiter
+        else:
+            self.metrics.inc('bytes', len(response.content), kind=kind, host=limiter.host)
+            limiter.release(response.status_code, response.headers.get('Retry-After'))
+        return response
+    
+    def fetch_page(self, url, kind):
+        """取得網頁內容：快取仍新鮮時不發出請求，過期時以條件請求向伺服器確認"""
+        body, entry = self.cached_page(url, kind)
+        if body is not None:
+            return body
+        
+        headers = entry.conditional_headers() if entry is not None else {}
+        response = self._fetch(url, kind, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            return self.http_cache.record_revalidated(entry, response.headers)
+        response.raise_for_status()
+        if self.http_cache is not None:
+            self.http_cache.store(url, response.content, response.headers)
+        return response.content
+    
+    def release_stream(self, response):
+        """串流下載結束後歸還並發名額並關閉連線"""
+        limiter = getattr(response, 'host_limiter', None)
+        if limiter is not None:
+            response.host_limiter = None
+            limiter.release(response.status_code, response.headers.get('Retry-After'))
+        response.close()
+    
+    def get_gallery_page(self, manga_url):
+        """抓取並解析漫畫頁面 (每個網址只抓取、解析一次)"""
+        page = self.page_cache.get(manga_url)
+        if page is not None:
+            return page
+        
+        content = self.fetch_page(manga_url, 'gallery')
+        with self.metrics.timer('parse_seconds', kind='gallery'):
+            page = parse_gallery_page(content, manga_url)
+        self.page_cache.put(manga_url, page)
+        if self.catalog is not None:
+            self.catalog.record(self.index_key_for(manga_url), page)
+        return page
+    
+    def get_download_links(self, manga_url):
+        """從漫畫頁面獲取所有鏡像的下載連結"""
+        try:
+            page = self.get_gallery_page(manga_url)
+            if not page.download_page_url:
+                return []
+            return self.get_download_mirrors(page.download_page_url)
+            
+        except Exception as e:
+            self.on_log(f"❌ 無法獲取下載連結 {manga_url}: {str(e)}")
+            return []
+    
+    def get_download_mirrors(self, download_page_url):
+        """從下載頁面獲取所有鏡像的最終下載連結 (本地下載一、二…)"""
+        cache_key = ('mirrors', download_page_url)
+        mirror_urls = self.page_cache.get(cache_key)
+        if mirror_urls is not None:
+            return mirror_urls
+        
+        try:
+            content = self.fetch_page(download_page_url, 'download_page')
+            with self.metrics.timer('parse_seconds', kind='download_page'):
+                mirror_urls = parse_download_mirrors(content, download_page_url)
+            if mirror_urls:
+                self.page_cache.put(cache_key, mirror_urls)
+            return mirror_urls
+            
+        except Exception as e:
+            self.on_log(f"❌ 無法獲取最終下載連結: {str(e)}")
+            return []
+    
+    def probe_size(self, job):
+        """以 HEAD 請求取得檔案大小，回傳扣除 .part 已下載部分後還需要下載的位元組數；無法取得時回傳 None"""
+        download_url = self.mirror_stats.rank(job.download_urls)[0]
+        try:
+            response = self._fetch(download_url, 'probe', method='HEAD', allow_redirects=True)
+        except RequestCancelled:
+            raise
+        except Exception:
+            return None
+        size = int(response.headers.get('Content-Length') or 0) if response.ok else 0
+        return self.remaining_size(job, size)
+    
+    def limit_bandwidth(self, size):
+        """整體頻寬有上限時，傳輸超前就等待"""
+        if self.bandwidth is not None:
+            self.metrics.inc('sleep_seconds', self.bandwidth.consume(size), reason='bandwidth')
+    
+    def get_manga_title(self, manga_url):
+        """獲取漫畫標題"""
+        try:
+            return self.get_gallery_page(manga_url).title
+        except Exception as e:
+            return f"unknown_manga_{int(time.time())}"
+    
+    def can_segment(self, response, total_size):
+        """伺服器支援 Range 且檔案夠大時才使用多連線分段下載"""
+        return (
+            self.segment_count > 1
+            and total_size is not None
+            and total_size >= self.segment_threshold
+            and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        )
+    
+    def download_single(self, download_url, part_path, offset, state, title, download_id, headers, alternatives=()):
+        """單一連線下載 (可從 offset 續傳)，寫入時同時計算 SHA-256
+        
+        alternatives 為其他鏡像：傳輸速度明顯比它們慢時拋出 MirrorTooSlow，已寫入的部分保留給下一個鏡像續傳。
+        回傳 (檔案總大小, sha256 物件)，改用分段下載時雜湊為 None；取消時回傳 False
+        """
+        headers = dict(headers)
+        previous_size = state.get('total_size')
+        if offset > 0:
+            headers['Range'] = f"bytes={offset}-"
+            headers['Accept-Encoding'] = 'identity'  # 續傳時位移必須對應原始位元組
+            validator = resume_validator(state, download_url)
+            if validator:
+                headers['If-Range'] = validator
+            self.on_progress(download_id, f"🔁 從 {offset / 1048576:.1f} MB 續傳: {title}")
+        
+        segmented = False
+        response = self._fetch(download_url, 'file', stream=True, timeout=120, headers=headers)
+        try:
+            if response.status_code == 416 and offset > 0:
+                # 請求範圍超出檔案大小：.part 可能已完整，否則捨棄重下
+                total_size = parse_content_range_total(response.headers.get('Content-Range'))
+                if total_size != offset:
+                    discard_partial(part_path)
+                    raise IOError("續傳範圍無效，將重新下載")
+                return total_size, hash_prefix(part_path, offset)
+            
+            response.raise_for_status()
+            if 'text/html' in response.headers.get('Content-Type', ''):
+                raise IntegrityError("伺服器回傳的是 HTML 網頁而不是 zip 檔")
+            
+            if offset > 0 and response.status_code != 206:
+                # 伺服器忽略 Range (或檔案已變更)，從頭下載
+                self.on_log(f"⚠️ 伺服器不支援續傳，重新下載: {title}")
+                offset = 0
+            
+            if response.status_code == 206:
+                total_size = parse_content_range_total(response.headers.get('Content-Range'))
+                if previous_size and total_size != previous_size:
+                    # 換鏡像續傳時沒有可用的 ETag，以總大小確認是同一個檔案
+                    discard_partial(part_path)
+                    raise IOError("續傳的檔案大小與先前不同，將重新下載")
+            else:
+                total_size = int(response.headers.get('content-length', 0)) or None
+            
+            state = {
+                'url': download_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'total_size': total_size,
+                'bytes_written': offset,
+            }
+            
+            digest = None
+            if offset == 0 and self.can_segment(response, total_size):
+                # 大檔案改用分段下載，這個連線只用來取得檔案資訊
+                segmented = True
+            else:
+                # 預先配置的 .part 檔大小不代表已下載的位元組數，續傳時改以紀錄中的 bytes_written 為準
+                preallocated = bool(self.preallocate and total_size)
+                state['preallocated'] = preallocated
+                save_resume_state(part_path, state)
+                # 續傳時先補算已下載部分的雜湊，之後的內容邊寫邊算，不必再讀一次檔案
+                digest = hash_prefix(part_path, offset) if offset > 0 else hashlib.sha256()
+                
+                downloaded_size = 0
+                progress = ProgressThrottle(lambda done: self.on_progress(
+                    download_id, f"📥 下載中: {title} ({done / total_size * 100:.1f}%)"))
+                transfer_start = next_speed_check = time.perf_counter()
+                with open(part_path, 'r+b' if offset > 0 else 'wb') as f:
+                    if preallocated:
+                        preallocate(f, total_size)
+                    f.seek(offset)
+                    # 從頭下載時檢查 zip 標頭，續傳的部分已在第一次下載時檢查過
+                    head_check = ZipHeadCheck() if offset == 0 else None
+                    try:
+                        for chunk in iter_response_chunks(response):
+                            if self.is_cancelled:
+                                return False
+                            
+                            if head_check is not None:
+                                head_check.feed(chunk)
+                            f.write(chunk)
+                            digest.update(chunk)
+                            downloaded_size += len(chunk)
+                            self.limit_bandwidth(len(chunk))
+                            if total_size:
+                                progress.update(offset + downloaded_size)
+                            
+                            now = time.perf_counter()
+                            if alternatives and now >= next_speed_check:
+                                # 每秒比較一次目前速度與其他鏡像的歷史速度
+                                next_speed_check = now + 1
+                                elapsed = now - transfer_start
+                                remaining = total_size - offset - downloaded_size if total_size else None
+                                if self.mirror_stats.should_leave(download_url, alternatives,
+                                                                  downloaded_size, elapsed, remaining):
+                                    raise MirrorTooSlow(f"速度只有 {format_bytes(downloaded_size / elapsed)}/s")
+                    finally:
+                        # 記錄已寫入的位元組數，供下次續傳；預先配置的空間截斷回實際寫入的大小
+                        state['bytes_written'] = offset + downloaded_size
+                        if preallocated:
+                            f.truncate(offset + downloaded_size)
+                        save_resume_state(part_path, state)
+                        elapsed = time.perf_counter() - transfer_start
+                        self.metrics.record_transfer(download_url, downloaded_size, elapsed)
+                        self.mirror_stats.record_transfer(download_url, downloaded_size, elapsed)
+        finally:
+            self.release_stream(response)
+        
+        if segmented:
+            if not self.download_segmented(download_url, part_path, state, title, download_id, headers):
+                if self.is_cancelled:
+                    return False
+                raise IOError("分段下載未完成")
+        return total_size, digest
+    
+    def download_segmented(self, download_url, part_path, state, title, download_id, headers):
+        """多連線分段下載：各段以 Range 請求寫入預先配置大小的 .part 檔，並各自重試"""
+        total_size = state['total_size']
+        if not state.get('segments'):
+            state['segments'] = split_byte_ranges(total_size, self.segment_count)
+        segments = state['segments']  # 每段為 [起始位置, 結束位置, 已寫入位元組數]
+        
+        if not os.path.exists(part_path) or os.path.getsize(part_path) != total_size:
+            # 預先配置檔案大小，各段直接寫入自己的位置
+            with open(part_path, 'wb') as f:
+                if self.preallocate:
+                    preallocate(f, total_size)
+                else:
+                    f.truncate(total_size)
+            for segment in segments:
+                segment[2] = 0
+        save_resume_state(part_path, state)
+        
+        validator = resume_validator(state, download_url)
+        state_lock = threading.Lock()
+        progress = ProgressThrottle(lambda done: self.on_progress(
+            download_id, f"📥 下載中: {title} ({done / total_size * 100:.1f}%)"))
+        self.on_progress(download_id, f"📥 分 {len(segments)} 段下載: {title}")
+        
+        def fetch_segment(segment):
+            start, end = segment[0], segment[1]
+            for attempt in range(SEGMENT_MAX_RETRIES):
+                position = start + segment[2]
+                if position > end:
+                    return True
+                if attempt > 0:
+                    self.metrics.inc('retries', stage='segment')
+                    self.metrics.inc('sleep_seconds', attempt, reason='segment_retry')
+                    time.sleep(attempt)
+                
+                segment_headers = dict(headers)
+                segment_headers['Range'] = f"bytes={position}-{end}"
+                segment_headers['Accept-Encoding'] = 'identity'
+                if validator:
+                    segment_headers['If-Range'] = validator
+                
+                try:
+                    response = self._fetch(download_url, 'file', stream=True, timeout=120, headers=segment_headers)
+                    try:
+                        response.raise_for_status()
+                        content_range_total = parse_content_range_total(response.headers.get('Content-Range'))
+                        if response.status_code != 206 or content_range_total != total_size:
+                            # 檔案已變更、換了內容不同的鏡像或伺服器不再支援 Range，整個 .part 都不可信
+                            raise RangeNotSatisfied(download_url)
+                        
+                        transfer_start, first_position = time.perf_counter(), position
+                        with open(part_path, 'r+b') as f:
+                            f.seek(position)
+                            try:
+                                for chunk in iter_response_chunks(response, end + 1 - position):
+                                    if self.is_cancelled:
+                                        return False
+                                    
+                                    chunk = chunk[:end + 1 - position]
+                                    f.write(chunk)
+                                    position += len(chunk)
+                                    self.limit_bandwidth(len(chunk))
+                                    with state_lock:
+                                        segment[2] += len(chunk)
+                                        progress.update(sum(s[2] for s in segments))
+                                    if position > end:
+                                        break
+                            finally:
+                                elapsed = time.perf_counter() - transfer_start
+                                self.metrics.record_transfer(download_url, position - first_position, elapsed)
+                                self.mirror_stats.record_transfer(download_url, position - first_position, elapsed)
+                    finally:
+                        self.release_stream(response)
+                except (RequestCancelled, RangeNotSatisfied):
+                    raise
+                except Exception as e:
+                    self.on_log(f"⚠️ 分段下載出錯: {title} [{start}-{end}] - {str(e)}")
+            
+            return start + segment[2] > end
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                results = list(executor.map(fetch_segment, segments))
+        except RangeNotSatisfied:
+            discard_partial(part_path)
+            raise IOError("伺服器不再支援分段續傳，將重新下載")
+        except RequestCancelled:
+            return False
+        finally:
+            with state_lock:
+                state['bytes_written'] = sum(s[2] for s in segments)
+                if os.path.exists(part_path):
+                    save_resume_state(part_path, state)
+        return all(results)
+    
+    def download_from(self, download_url, filepath, title, download_id, mirror_urls):
+        """從單一鏡像下載 (有 .part 檔時從中斷處續傳)，確認大小與 zip 結構後改名為正式檔名
+        
+        成功時回傳檔案的 SHA-256，取消時回傳 False，其他失敗以例外拋出
+        """
+        part_path = f"{filepath}.part"
+        alternatives = [url for url in mirror_urls if url != download_url]
+        
+        # 添加更多 headers 來模擬真實瀏覽器
+        headers = dict(DOWNLOAD_HEADERS)
+        
+        # 有未完成的 .part 檔時，從中斷處續傳 (也可能是其他鏡像下載到一半的檔案)
+        offset, state = load_resume_state(part_path, download_url, alternatives)
+        if state.get('segments'):
+            # 上次是分段下載，直接依各段進度續傳
+            total_size, digest = state['total_size'], None
+            if not self.download_segmented(download_url, part_path, state, title, download_id, headers):
+                if self.is_cancelled:
+                    return False
+                raise IOError("分段下載未完成")
+        else:
+            result = self.download_single(download_url, part_path, offset, state, title, download_id, headers,
+                                          alternatives)
+            if result is False:
+                return False
+            total_size, digest = result
+        
+        return self.finish_download(download_url, filepath, title, download_id, total_size, digest)
+    
+    def download_file(self, download_urls, filepath, title, max_retries=3):
+        """下載檔案 - 包含重試機制，先寫入 .part 檔並支援斷點續傳
+        
+        download_urls 為同一個檔案的所有鏡像 (也可以只傳一個網址)，切換與重試的順序見 MirrorFailover。
+        驗證失敗的 .part 會捨棄並重新下載。
+        成功時回傳檔案的 SHA-256，失敗或取消時回傳 False
+        """
+        failover = MirrorFailover(self, download_urls, filepath, title, max_retries)
+        # 生成唯一的識別符用於更新同一行
+        download_id = f"download_{hash(title) % 10000}"
+        for wait_time, download_url in failover.attempts():
+            if wait_time:
+                time.sleep(wait_time)
+            try:
+                self.on_progress(download_id, f"📥 開始下載: {title}")
+                sha256 = self.download_from(download_url, filepath, title, download_id, failover.mirror_urls)
+                if sha256:
+                    failover.succeeded(download_url)
+                return sha256
+            except RequestCancelled:
+                return False
+            except Exception as e:
+                failover.failed(download_url, e)
+        return False
+    
+    def http_error_status(self, error):
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return error.response.status_code
+        return None
+    
+    def put_until_cancelled(self, work_queue, item):
+        """放入佇列；佇列已滿時等待，取消時放棄"""
+        while not self.is_cancelled:
+            try:
+                work_queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def iter_queue(self, work_queue):
+        """逐一取出佇列項目，直到收到結束標記或被取消"""
+        while not self.is_cancelled:
+            try:
+                item = work_queue.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            yield item
+    
+    def resume_journal(self, manga_queue):
+        """把工作日誌中上次未完成的工作排入佇列，回傳日誌中已有的漫畫網址 (列表掃描時不再重複加入)"""
+        items, journal_links = self.load_journal()
+        for item in items:
+            if not self.put_until_cancelled(manga_queue, item):
+                break
+        return journal_links
+    
+    def discover_manga(self, manga_queue):
+        """列表頁生產者：先恢復工作日誌中未完成的工作，再依序掃描每個搜尋，
+        同一個漫畫 (依 aid) 在不同搜尋中只處理一次
+        """
+        queued_keys = {self.index_key_for(manga_url) for manga_url in self.resume_journal(manga_queue)}
+        for index, search in enumerate(self.searches):
+            if len(self.searches) > 1:
+                self.on_log(f"📚 搜尋 {index + 1}/{len(self.searches)}: {search.url}")
+            if not self.discover_search(manga_queue, index, search, queued_keys):
+                return
+        
+        self.on_log(f"🎯 總共找到 {self.total_count} 個漫畫")
+    
+    def discover_search(self, manga_queue, index, search, queued_keys):
+        """掃描一個搜尋的列表頁，邊掃描邊把漫畫網址送入佇列，到達搜尋結果的最後一頁就停止
+        (上次已掃描過的頁面不再抓取)；被取消時回傳 False
+        """
+        search_key, pages = self.unscanned_pages(search)
+        seen = RecentLinks()
+        if search.manga_urls is not None:
+            listings = fixed_listing_pages(search, pages)
+        else:
+            listings = self.iter_listing_pages(pages, search.url)
+        for page_num, listing in listings:
+            if self.is_cancelled:
+                return False
+            if listing is None:
+                continue  # 這頁抓取失敗，繼續掃描下一頁 (下次執行會再抓取)
+            
+            pending_links, stop_reason = self.take_listing(index, search_key, page_num, listing, seen, queued_keys)
+            for manga_url in pending_links:
+                if not self.put_until_cancelled(manga_queue, manga_url):
+                    return False
+            if stop_reason:
+                break
+        return True
+    
+    def schedule_retries(self, manga_queue):
+        """列表掃描結束後，依退避時間把失敗的工作重新排入佇列，直到每個漫畫都完成或移入失敗清單"""
+        while not self.is_cancelled:
+            self.job_finished.clear()
+            if self.all_completed():
+                return
+            for item in self.due_retries():
+                if not self.put_until_cancelled(manga_queue, item):
+                    return
+            self.job_finished.wait(QUEUE_POLL_INTERVAL)
+    
+    def produce(self, manga_queue):
+        """生產者執行緒：掃描列表頁、排入重試，最後通知每個解析執行緒結束"""
+        try:
+            self.discover_manga(manga_queue)
+            self.schedule_retries(manga_queue)
+        finally:
+            for _ in range(self.resolver_count):
+                self.put_until_cancelled(manga_queue, None)
+    
+    def resolve_manga(self, manga_url):
+        """解析單個漫畫：取得標題與最終下載連結，不需下載時回傳 None"""
+        page = self.get_gallery_page(manga_url)
+        if self.skip_existing(manga_url, page.title):
+            return None
+        return self.create_job(manga_url, page, self.get_download_links(manga_url))
+    
+    def resolve_worker(self, manga_queue, scheduler):
+        """解析階段：從漫畫佇列取出網址，探測檔案大小後把下載工作交給下載排程
+        (重試時佇列中可能是已解析的下載工作)
+        """
+        for item in self.iter_queue(manga_queue):
+            try:
+                if not self.resolve_item(item, scheduler):
+                    return
+            except RequestCancelled:
+                return
+            except Exception as e:
+                if not self.is_cancelled:
+                    self.on_log(f"❌ 處理失敗: {str(e)}")
+                    self.fail_job(item.manga_url if isinstance(item, DownloadJob) else item, str(e))
+    
+    def resolve_item(self, item, scheduler):
+        """解析一個佇列項目並交給下載排程；被取消時回傳 False"""
+        if isinstance(item, DownloadJob):
+            job = item
+        else:
+            with self.metrics.timer('stage_seconds', stage='resolve'):
+                job = self.resolve_manga(item)
+            if job is None:
+                self.complete_job(item)
+                return True
+        
+        if self.needs_size():
+            job.size = self.probe_size(job)
+        if self.harvest_only:
+            self.complete_job(job.manga_url)
+            return True
+        return scheduler.put(job, lambda: self.is_cancelled)
+    
+    def download_worker(self, scheduler):
+        """下載階段：從下載排程取出下一個工作並下載檔案"""
+        while True:
+            job = scheduler.get(lambda: self.is_cancelled)
+            if job is None:
+                return
+            # 未完成的部分保留在 .part 檔，下次執行時續傳；目前的位移也記入工作日誌
+            part_path = f"{job.filepath}.part"
+            try:
+                self.journal.mark_downloading(job.manga_url, partial_size(part_path))
+                with self.metrics.timer('stage_seconds', stage='download'):
+                    sha256 = self.download_file(job.download_urls, job.filepath, job.title)
+                if sha256:
+                    self.record_download(job, sha256)
+                elif self.is_cancelled:
+                    self.journal.mark_downloading(job.manga_url, partial_size(part_path))
+                else:
+                    self.fail_job(job.manga_url, "下載失敗", partial_size(part_path))
+            except Exception as e:
+                if not self.is_cancelled:
+                    self.on_log(f"❌ 處理失敗: {str(e)}")
+                    self.fail_job(job.manga_url, str(e), partial_size(part_path))
+            finally:
+                scheduler.done(job)
+    
+    def run_worker(self, target, *args):
+        """工作執行緒的入口：執行緒因未處理的例外結束時記下例外並中止整個執行
+        
+        該執行緒手上的漫畫不會再呼叫 complete_job/fail_job，完成數永遠到不了總數，
+        不中止的話生產者會在 schedule_retries 一直等待，run() 停在 producer.join()。
+        """
+        try:
+            target(*args)
+        except Exception as e:
+            self.on_log(f"❌ 工作執行緒異常結束: {str(e)}")
+            with self.stats_lock:
+                if self.worker_error is None:
+                    self.worker_error = e
+            self.cancel()
+    
+    def run(self):
+        """在目前執行緒執行到結束；完成時回傳 True，被取消時回傳 False，
+        有工作執行緒異常結束時拋出該執行緒的例外
+        """
+        try:
+            self.open_stores()
+            
+            self.total_count = 0
+            self.completed_count = 0
+            self.on_overall(0, 0)
+            
+            # 實際的請求速率與並發數由各主機的限速器依伺服器回應調整
+            effective_workers = self.max_workers
+            self.resolver_count = effective_workers
+            self.on_log(f"🚀 使用 {effective_workers} 個執行緒進行下載 (依伺服器回應自動調整速率)")
+            self.start_post_processing()
+            
+            # 列表掃描 → 解析 → 下載 三個階段以有界佇列與下載排程串接，
+            # 找到第一個漫畫就開始下載，不必等所有列表頁掃描完畢
+            manga_queue = queue.Queue(maxsize=MANGA_QUEUE_SIZE)
+            scheduler = DownloadScheduler(DOWNLOAD_QUEUE_SIZE, order=self.download_order,
+                                          max_inflight_bytes=self.max_inflight_bytes, prefer_tags=self.prefer_tags)
+            
+            producer = threading.Thread(target=self.run_worker, args=(self.produce, manga_queue), daemon=True)
+            resolvers = [
+                threading.Thread(target=self.run_worker, args=(self.resolve_worker, manga_queue, scheduler),
+                                 daemon=True)
+                for _ in range(self.resolver_count)
+            ]
+            downloaders = [
+                threading.Thread(target=self.run_worker, args=(self.download_worker, scheduler), daemon=True)
+                for _ in range(effective_workers)
+            ]
+            workers = [producer, *resolvers, *downloaders]
+            try:
+                for worker in workers:
+                    worker.start()
+                
+                producer.join()
+                for worker in resolvers:
+                    worker.join()
+                # 解析階段結束後，下載執行緒取完剩餘的工作就結束
+                scheduler.close()
+                for worker in downloaders:
+                    worker.join()
+            except KeyboardInterrupt:
+                # Ctrl+C：先讓所有執行緒停下，寫回 .part 的續傳資訊與工作日誌中的位移，才關閉資料庫
+                self.on_log("🛑 正在停止，等待進行中的工作保存進度…")
+                self.cancel()
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.join()
+                raise
+            if self.post_processor is not None:
+                # 等待剩餘的檔案處理完畢
+                self.post_processor.close(cancel=self.is_cancelled)
+            
+            if self.worker_error is not None:
+                raise self.worker_error
+            if self.is_cancelled:
+                return False
+            
+            self.finish_run()
+            return True
+            
+        finally:
+            self.close_stores()
@@ -0,0 +1,552 @@
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from batch_jobs import SearchProgress, SearchSpec
+from catalog import DEFAULT_CATALOG_PATH, Catalog
+from download_index import DEFAULT_INDEX_PATH, DownloadIndex, file_sha256, index_key
+from http_cache import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_PATH, DEFAULT_CACHE_TTL, REVALIDATE_KINDS, HttpCache
+from integrity import IntegrityError, VerificationManifest, check_zip_file
+from job_journal import (ACTIVE_STAGES, DEFAULT_JOURNAL_PATH, MAX_ATTEMPTS, STAGE_DEAD, STAGE_DONE, STAGE_FAILED,
+                         JobJournal, dead_letter_lines, journal_run_key)
+from metrics import PipelineMetrics
+from mirror_stats import DEFAULT_MIRROR_STATS_PATH, MirrorStats, MirrorTooSlow, mirror_host
+from page_parser import extract_aid, listing_page_url
+from postprocess import PostProcessor, existing_archive, post_process_summary
+from rate_limiter import KIND_LABELS, BandwidthLimiter, RateLimiter
+from resume_state import discard_partial, partial_size
+from scheduler import DEFAULT_MAX_INFLIGHT_BYTES, DEFAULT_ORDER, schedule_summary
+from transfer import fsync_file
+
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+}
+
+# 同時抓取的列表頁數 (實際請求速率仍由主機限速器控制)
+LISTING_CONCURRENCY = 4
+
+# 判斷列表頁是否重複時只比對最近幾頁的連結 (跨頁的重複由索引鍵集合處理)，掃描很多頁時記憶體不隨頁數增加
+SEEN_PAGE_WINDOW = 20
+
+# 所有鏡像都失敗時，第 n 次重試前等待 n * RETRY_WAIT_STEP 秒
+RETRY_WAIT_STEP = 5
+
+@dataclass(slots=True)
+class DownloadJob:
+    """解析完成、等待下載的漫畫"""
+    manga_url: str
+    title: str
+    filepath: str
+    download_urls: list     # 同一個檔案的所有鏡像，依下載頁上的順序
+    size: int = None        # 還需要下載的位元組數 (HEAD 探測，未知時為 None)
+    tags: list = None       # 漫畫頁上的標籤
+    group: int = 0          # 來源列表頁 (輪流排程用)
+
+class RangeNotSatisfied(Exception):
+    """分段請求沒有得到 206 回應"""
+
+class RecentLinks:
+    """最近 max_pages 頁新出現的漫畫連結"""
+    
+    def __init__(self, max_pages=SEEN_PAGE_WINDOW):
+        self._pages = deque()
+        self._links = set()
+        self.max_pages = max_pages
+    
+    def __contains__(self, manga_url):
+        return manga_url in self._links
+    
+    def add_page(self, manga_urls):
+        self._pages.append(manga_urls)
+        self._links.update(manga_urls)
+        if len(self._pages) > self.max_pages:
+            self._links.difference_update(self._pages.popleft())
+
+def take_new_links(listing, seen):
+    """取出列表頁中最近幾頁沒出現過的漫畫連結 (並加入 seen，一個 RecentLinks)
+    
+    回傳 (新連結, 停止原因)；停止原因為 None 表示應該繼續掃描下一頁。
+    """
+    new_links = [manga_url for manga_url in listing.links if manga_url not in seen]
+    seen.add_page(new_links)
+    if not listing.links:
+        return new_links, "沒有結果"
+    if not new_links:
+        # 部分網站對超出範圍的頁碼重複回傳最後一頁
+        return new_links, "的結果都與前面的頁面重複"
+    if listing.is_last():
+        return new_links, "是最後一頁"
+    return new_links, None
+
+def journal_item(record):
+    """工作日誌紀錄對應的佇列項目：解析過的直接成為下載工作，否則從漫畫網址開始解析"""
+    if record.download_urls:
+        return DownloadJob(record.manga_url, record.title, record.filepath, record.download_urls)
+    return record.manga_url
+
+class MirrorFailover:
+    """一個檔案的鏡像切換與重試順序；實際的下載與等待由引擎進行
+    
+    for wait_time, download_url in failover.attempts(): 先等待 wait_time 秒再從 download_url 下載，
+    成功時呼叫 succeeded，失敗時把例外交給 failed；迭代結束表示所有鏡像與重試都失敗了。
+    """
+    
+    def __init__(self, engine, download_urls, filepath, title, max_retries=3):
+        self.engine = engine
+        self.mirror_urls = [download_urls] if isinstance(download_urls, str) else list(download_urls)
+        self.filepath = filepath
+        self.title = title
+        self.max_retries = max_retries
+        self.attempt = 0
+        self.error = None
+        self.reason = None
+    
+    def attempts(self):
+        """依各鏡像過去的速度與錯誤率排序，產生 (等待秒數, 鏡像網址)"""
+        engine = self.engine
+        for attempt in range(self.max_retries):
+            self.attempt = attempt
+            wait_time = 0
+            if attempt > 0:
+                # 重試前等待，時間遞增
+                wait_time = attempt * RETRY_WAIT_STEP
+                engine.on_log(f"⏳ 等待 {wait_time} 秒後重試: {self.title} (第 {attempt + 1} 次嘗試)")
+                engine.metrics.inc('retries', stage='download')
+                engine.metrics.inc('sleep_seconds', wait_time, reason='retry_backoff')
+            
+            ranked = engine.mirror_stats.rank(self.mirror_urls)
+            for position, download_url in enumerate(ranked):
+                yield wait_time, download_url
+                wait_time = 0
+                if position + 1 < len(ranked):
+                    next_host = mirror_host(ranked[position + 1])
+                    engine.metrics.inc('mirror_failovers', reason=self.reason)
+                    engine.on_log(f"🔀 改用鏡像 {next_host}: {self.title} ({mirror_host(download_url)}: {self.error})")
+            
+            if not self.mirror_urls:
+                engine.on_log(f"❌ 下載失敗: {self.title} - {self.error}")
+                return
+            if attempt < self.max_retries - 1:
+                engine.on_log(f"⚠️ 下載出錯: {self.title} - {self.error} (將重試)")
+        
+        engine.on_log(f"❌ 下載失敗 (已重試 {self.max_retries} 次): {self.title} - {self.error}")
+    
+    def succeeded(self, download_url):
+        self.engine.mirror_stats.record_result(download_url, ok=True)
+    
+    def failed(self, download_url, error):
+        """記錄這個鏡像的失敗原因，決定之後是否還要嘗試它"""
+        engine = self.engine
+        self.reason = 'error'
+        status = engine.http_error_status(error)
+        if isinstance(error, MirrorTooSlow):
+            # 速度已記入鏡像統計，不算失敗
+            self.error, self.reason = str(error), 'slow'
+            return
+        engine.mirror_stats.record_result(download_url, ok=False)
+        if isinstance(error, IntegrityError):
+            # 內容有誤時續傳也沒有意義，捨棄 .part 從頭下載
+            discard_partial(f"{self.filepath}.part")
+            engine.metrics.inc('integrity_failures')
+            engine.manifest.record(os.path.basename(self.filepath), 'failed', source='download',
+                                   reason=str(error), url=download_url, attempt=self.attempt + 1)
+            self.error = f"檔案驗證失敗 - {str(error)}"
+        elif status in (429, 503):
+            self.error = "伺服器暫時無法使用"
+        elif status is not None:
+            # 這個鏡像沒有此檔案，之後不再嘗試
+            self.mirror_urls.remove(download_url)
+            self.error = f"HTTP {status}"
+        else:
+            self.error = str(error) or type(error).__name__
+
+class EngineBase:
+    """兩種下載引擎共用的部分：建構參數、工作日誌與下載索引的紀錄、列表頁去重、
+    鏡像切換、各資料庫的開關與結束時的報告；請求、等待與佇列由子類別實作
+    
+    進度透過建構時傳入的回呼函式回報：
+    on_log(訊息)、on_progress(下載 ID, 進度文字)、on_overall(已完成, 總數)
+    """
+    
+    def __init__(self, base_url, start_page, end_page, output_folder, max_workers,
+                 on_log=None, on_progress=None, on_overall=None,
+                 index_path=DEFAULT_INDEX_PATH, rate_limiter=None,
+                 cache_path=DEFAULT_CACHE_PATH, cache_ttl=DEFAULT_CACHE_TTL, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES,
+                 metrics_path=None, mirror_stats_path=DEFAULT_MIRROR_STATS_PATH,
+                 listing_concurrency=LISTING_CONCURRENCY, journal_path=DEFAULT_JOURNAL_PATH,
+                 max_attempts=MAX_ATTEMPTS, retry_dead=False, download_order=DEFAULT_ORDER,
+                 max_inflight_bytes=DEFAULT_MAX_INFLIGHT_BYTES, prefer_tags=(), bandwidth_limit=None,
+                 searches=None, on_search_progress=None, preallocate=True, fsync=False, post_process=None,
+                 catalog_path=DEFAULT_CATALOG_PATH, harvest_only=False):
+        self.base_url = base_url
+        self.start_page = start_page
+        self.end_page = end_page
+        self.output_folder = output_folder
+        self.max_workers = max_workers
+        self.listing_concurrency = listing_concurrency
+        # 寫檔方式：下載前預先配置檔案空間；完成時先 fsync 再改名 (較慢，但斷電後不會留下不完整的檔案)
+        self.preallocate = preallocate
+        self.fsync = fsync
+        # 下載完成後的 CBZ 打包與圖片重新壓縮 (PostProcessOptions，None 表示不處理)
+        self.post_process = post_process
+        self.post_processor = None
+        self.index_path = index_path
+        self.index = None
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.cache_max_bytes = cache_max_bytes
+        self.http_cache = None
+        # 漫畫目錄：記錄漫畫頁上的資訊與檔案大小；harvest_only 時只收集目錄資料，不下載檔案
+        self.catalog_path = catalog_path
+        self.catalog = None
+        self.harvest_only = harvest_only
+        # 工作日誌：journal_path 為 None 時只保存在記憶體 (仍會在本次執行內退避重試)
+        self.journal_path = journal_path
+        self.max_attempts = max_attempts
+        self.retry_dead = retry_dead
+        self.journal = None
+        self.dead_links = set()
+        # 下載排程：解析完成的工作依 download_order 排序，傳輸中的檔案大小合計不超過 max_inflight_bytes
+        self.download_order = download_order
+        self.max_inflight_bytes = max_inflight_bytes
+        self.prefer_tags = prefer_tags
+        self.bandwidth_limit = bandwidth_limit
+        self.job_groups = {}
+        self.on_log = on_log or (lambda message: None)
+        self.on_progress = on_progress or (lambda download_id, text: None)
+        self.on_overall = on_overall or (lambda current, total: None)
+        self.is_cancelled = False
+        self.completed_count = 0
+        self.total_count = 0
+        
+        # 批次執行：多個搜尋依序掃描，共用連線、限速、快取與跨搜尋去重；未指定時只有建構參數中的搜尋
+        self.searches = searches or [SearchSpec(base_url, start_page, end_page)]
+        self.search_progress = SearchProgress(self.searches, on_search_progress)
+        
+        # 各主機共用的自適應限速器 (取代固定的 sleep 與執行緒上限)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        
+        # 所有下載連線合計的頻寬上限 (位元組/秒)
+        self.bandwidth = BandwidthLimiter(bandwidth_limit) if bandwidth_limit else None
+        
+        # 各階段的請求次數、延遲、傳輸量與等待時間；metrics_path 有設定時於結束後寫出
+        self.metrics = PipelineMetrics()
+        self.metrics_path = metrics_path
+        
+        # 輸出資料夾中的驗證紀錄 (下載完成與驗證失敗都會記錄)
+        self.manifest = VerificationManifest(output_folder)
+        
+        # 各鏡像主機的速度與錯誤率，用來排序鏡像；mirror_stats_path 有設定時跨執行保留
+        self.mirror_stats = MirrorStats()
+        self.mirror_stats_path = mirror_stats_path
+        
+        # 保護完成數與總數；有漫畫完成時通知等待重試的生產者 (asyncio 版改用 asyncio.Event)
+        self.stats_lock = threading.Lock()
+        self.job_finished = threading.Event()
+    
+    def cancel(self):
+        self.is_cancelled = True
+        if self.post_processor is not None:
+            self.post_processor.cancel()
+    
+    def get_page_url(self, page_num, base_url=None):
+        """根據頁數生成頁面 URL (預設為建構參數中的搜尋)"""
+        return listing_page_url(base_url or self.base_url, page_num)
+    
+    def index_key_for(self, manga_url):
+        """漫畫在下載索引中的鍵 (優先使用 aid)"""
+        return index_key(manga_url, extract_aid(manga_url))
+    
+    def http_error_status(self, error):
+        """HTTP 錯誤回應的狀態碼 (依各引擎的 HTTP 函式庫)；不是 HTTP 錯誤時回傳 None"""
+        return None
+    
+    def cached_page(self, url, kind):
+        """回傳 (仍新鮮的快取內容, 快取紀錄)；沒有快取或需要向伺服器確認時內容為 None"""
+        if self.http_cache is None:
+            return None, None
+        entry = self.http_cache.lookup(url)
+        ttl = 0 if kind in REVALIDATE_KINDS else self.http_cache.ttl
+        if entry is not None and entry.is_fresh(ttl):
+            self.http_cache.record_hit(entry)
+            return entry.body, entry
+        return None, entry
+    
+    def mark_completed(self):
+        """完成一個漫畫 (無論成功與否) 並更新總體進度"""
+        with self.stats_lock:
+            self.completed_count += 1
+            completed, total = self.completed_count, self.total_count
+        self.job_finished.set()
+        self.on_overall(completed, total)
+    
+    def add_counts(self, total=0, completed=0):
+        """增加總數與完成數並更新總體進度"""
+        with self.stats_lock:
+            self.total_count += total
+            self.completed_count += completed
+            completed, total = self.completed_count, self.total_count
+        self.on_overall(completed, total)
+    
+    def load_journal(self):
+        """讀取工作日誌：回傳 (上次未完成、應立即排入佇列的項目, 日誌中已有的漫畫網址)，
+        列表掃描時不再重複加入日誌中已有的漫畫
+        """
+        if self.retry_dead:
+            revived = self.journal.revive_dead()
+            if revived:
+                self.on_log(f"♻️ 重新排入失敗清單中的 {revived} 個漫畫")
+        
+        # 失敗清單中的漫畫不再處理，列表掃描再次遇到時直接跳過
+        records = self.journal.load()
+        self.dead_links = {record.manga_url for record in records if record.stage == STAGE_DEAD}
+        records = [record for record in records if record.stage != STAGE_DEAD]
+        active = [record for record in records if record.stage in ACTIVE_STAGES]
+        done = sum(1 for record in records if record.stage == STAGE_DONE)
+        if records:
+            waiting = sum(1 for record in records if record.stage == STAGE_FAILED)
+            self.on_log(f"📒 從工作日誌恢復: 未完成 {len(active)} 個、等待重試 {waiting} 個、已完成 {done} 個")
+        self.add_counts(len(records), done)
+        
+        items = [journal_item(record) for record in [*active, *self.journal.take_due()]]
+        return items, {record.manga_url for record in records}
+    
+    def unscanned_pages(self, search):
+        """回傳 (搜尋在工作日誌中的鍵, 上次還沒掃描過的頁碼)"""
+        search_key = journal_run_key(search.url, self.output_folder)
+        pages = self.journal.unscanned_pages(search.start_page, search.end_page, search_key)
+        if not pages:
+            self.on_log("📒 列表頁在上次執行時已掃描完畢")
+        return search_key, pages
+    
+    def take_listing(self, index, search_key, page_num, listing, seen, queued_keys):
+        """記錄搜尋 index 的一個列表頁，回傳 (要送入佇列的漫畫網址, 停止原因)；
+        停止原因為 None 表示應該繼續掃描下一頁
+        """
+        manga_links, stop_reason = take_new_links(listing, seen)
+        
+        # 已由前面的搜尋 (或工作日誌) 排入的漫畫不重複計算
+        keys = {manga_url: self.index_key_for(manga_url) for manga_url in manga_links}
+        duplicates = [manga_url for manga_url in manga_links if keys[manga_url] in queued_keys]
+        if duplicates:
+            self.on_log(f"🔁 與前面的搜尋重複 {len(duplicates)} 個漫畫")
+            manga_links = [manga_url for manga_url in manga_links if keys[manga_url] not in queued_keys]
+        queued_keys.update(keys[manga_url] for manga_url in manga_links)
+        
+        # 下載索引中已完成、或在失敗清單中的漫畫直接跳過，不發出任何請求
+        done_keys = self.index.completed_keys([keys[manga_url] for manga_url in manga_links])
+        pending_links = [manga_url for manga_url in manga_links
+                         if keys[manga_url] not in done_keys and manga_url not in self.dead_links]
+        skipped = len(manga_links) - len(pending_links)
+        if skipped:
+            self.on_log(f"⏭️ 依下載索引與失敗清單跳過 {skipped} 個漫畫")
+        
+        # 先寫入工作日誌再送入佇列：之後各階段都只更新既有的紀錄
+        self.journal.record_listing(page_num, pending_links, last=bool(stop_reason), search=search_key)
+        self.search_progress.add(index, pending_links, skipped)
+        self.add_counts(len(manga_links), skipped)
+        self.job_groups.update(dict.fromkeys(pending_links, (index, page_num)))
+        
+        if stop_reason:
+            self.on_log(f"📭 第 {page_num} 頁{stop_reason}，停止掃描後面的頁面")
+        return pending_links, stop_reason
+    
+    def all_completed(self):
+        with self.stats_lock:
+            return self.completed_count >= self.total_count
+    
+    def due_retries(self):
+        """已過退避時間、應重新排入佇列的工作"""
+        for record in self.journal.take_due():
+            self.on_log(f"🔁 重新排入 (第 {record.attempts + 1} 次嘗試): {record.title or record.manga_url}")
+            self.metrics.inc('retries', stage='job')
+            yield journal_item(record)
+    
+    def complete_job(self, manga_url):
+        """漫畫已下載或已存在"""
+        # 已存在的漫畫不會建立下載工作，來源列表頁在這裡移除
+        self.job_groups.pop(manga_url, None)
+        self.journal.mark_done(manga_url)
+        self.search_progress.complete(manga_url)
+        self.mark_completed()
+    
+    def fail_job(self, manga_url, error, offset=None):
+        """記錄失敗：還有嘗試次數時等待退避後重新排入，否則移入失敗清單並算作完成"""
+        self.index.mark_failed(self.index_key_for(manga_url), manga_url)
+        record = self.journal.mark_failed(manga_url, error, offset)
+        if record is None or record.stage == STAGE_DEAD:
+            if record is not None:
+                self.on_log(f"☠️ 已失敗 {record.attempts} 次，移入失敗清單: {record.title or manga_url} - {error}")
+            self.job_groups.pop(manga_url, None)
+            self.search_progress.complete(manga_url)
+            self.mark_completed()
+            return
+        wait_time = record.next_attempt_at - time.time()
+        self.on_log(f"⏳ {wait_time:.0f} 秒後重新排入: {record.title or manga_url}")
+    
+    def archive_path(self, title):
+        return os.path.join(self.output_folder, f"{title}.zip")
+    
+    def skip_existing(self, manga_url, title):
+        """檔案已存在時記入下載索引並回傳 True (不必再取得下載連結)"""
+        existing = existing_archive(self.archive_path(title))
+        if not existing:
+            return False
+        self.on_log(f"⏭️ 跳過已存在: {title}")
+        self.index.mark_done(self.index_key_for(manga_url), manga_url, title, existing)
+        return True
+    
+    def create_job(self, manga_url, page, download_urls):
+        """記錄漫畫頁的解析結果並建立下載工作；沒有下載連結時拋出 IOError"""
+        if not download_urls:
+            raise IOError(f"無法找到下載連結: {page.title}")
+        filepath = self.archive_path(page.title)
+        self.index.mark_resolved(self.index_key_for(manga_url), manga_url, page.title, download_urls[0])
+        self.journal.mark_resolved(manga_url, page.title, filepath, download_urls)
+        return DownloadJob(manga_url, page.title, filepath, download_urls, tags=page.tags,
+                           group=self.job_groups.pop(manga_url, 0))
+    
+    def needs_size(self):
+        """依列表順序下載時不需要檔案大小 (只收集目錄資料時仍要記錄大小)"""
+        return self.download_order != 'fifo' or self.max_inflight_bytes is not None or self.harvest_only
+    
+    def remaining_size(self, job, size):
+        """記錄 HEAD 取得的檔案大小，回傳扣除 .part 已下載部分後還需要下載的位元組數"""
+        if not size:
+            return None
+        if self.catalog is not None:
+            self.catalog.set_size(self.index_key_for(job.manga_url), size)
+        return max(0, size - partial_size(f"{job.filepath}.part"))
+    
+    def finish_download(self, download_url, filepath, title, download_id, total_size, digest):
+        """確認 .part 的大小與 zip 結構正確後改名為正式檔名，回傳 SHA-256
+        
+        digest 為下載時邊寫邊算的 sha256 物件；分段下載的各段同時寫入不同位置，傳入 None 改為讀檔計算。
+        """
+        part_path = f"{filepath}.part"
+        written = os.path.getsize(part_path)
+        if total_size and written != total_size:
+            raise IOError(f"檔案大小不符 ({written}/{total_size} bytes)")
+        entries = check_zip_file(part_path)
+        sha256 = digest.hexdigest() if digest is not None else file_sha256(part_path)
+        if self.fsync:
+            fsync_file(part_path)
+        os.replace(part_path, filepath)
+        discard_partial(part_path)
+        
+        self.manifest.record(os.path.basename(filepath), 'ok', source='download', size=written,
+                             sha256=sha256, entries=entries, url=download_url)
+        self.on_progress(download_id, f"✅ 下載完成: {title}")
+        return sha256
+    
+    def record_download(self, job, sha256):
+        """下載完成：記入下載索引並交給後處理"""
+        key = self.index_key_for(job.manga_url)
+        self.index.mark_done(key, job.manga_url, job.title, job.filepath, sha256)
+        self.complete_job(job.manga_url)
+        if self.post_processor is not None:
+            self.post_processor.submit(job.filepath, job.title, key, job.manga_url)
+    
+    def open_stores(self):
+        """開啟下載索引、工作日誌、網頁快取與目錄，並讀入鏡像統計"""
+        # 確保輸出資料夾存在
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.index = DownloadIndex(self.index_path)
+        search_urls = '\n'.join(search.url for search in self.searches)
+        self.journal = JobJournal(self.journal_path or ':memory:',
+                                  journal_run_key(search_urls, self.output_folder), self.max_attempts)
+        if self.cache_path:
+            self.http_cache = HttpCache(self.cache_path, self.cache_ttl, self.cache_max_bytes)
+        if self.catalog_path:
+            self.catalog = Catalog(self.catalog_path)
+        if self.mirror_stats_path:
+            self.mirror_stats.load(self.mirror_stats_path)
+    
+    def close_stores(self):
+        """關閉所有資料庫，寫出鏡像統計與統計檔"""
+        if self.post_processor is not None:
+            self.post_processor.close(cancel=True)
+        if self.index is not None:
+            self.index.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        if self.mirror_stats_path:
+            self.mirror_stats.save(self.mirror_stats_path)
+        if self.metrics_path:
+            self.save_metrics()
+    
+    def start_post_processing(self):
+        """輸出下載排程設定，需要時啟動下載後處理"""
+        schedule = schedule_summary(self.download_order, self.max_inflight_bytes, self.prefer_tags,
+                                    self.bandwidth_limit)
+        self.on_log(f"🗂️ 下載排程: {schedule}")
+        if self.harvest_only:
+            self.on_log("📇 只收集目錄資料 (漫畫頁資訊與檔案大小)，不下載檔案")
+        elif self.post_process is not None:
+            self.post_processor = PostProcessor(self.post_process, self.on_log, self.manifest, self.index)
+            self.post_processor.start()
+            summary = post_process_summary(self.post_process, self.post_processor.workers)
+            self.on_log(f"🗜️ 下載後處理: {summary}")
+    
+    def finish_run(self):
+        """全部處理完畢：清除工作日誌 (只保留失敗清單)，下次執行重新掃描列表頁"""
+        self.journal.finish()
+        self.report_metrics()
+        self.on_log("🎉 所有下載任務完成！")
+    
+    def report_metrics(self):
+        """輸出本次執行的各階段統計"""
+        for line in self.metrics.summary_lines():
+            self.on_log(f"📊 {line}")
+        if self.http_cache is not None:
+            self.on_log(f"🗃️ 網頁快取: {self.http_cache.summary()}")
+        if self.catalog is not None:
+            galleries, tags = self.catalog.counts()
+            self.on_log(f"📇 目錄: {galleries} 本漫畫, {tags} 個標籤")
+        for line in self.mirror_stats.summary_lines():
+            self.on_log(f"🪞 鏡像 {line}")
+        for line in dead_letter_lines(self.journal.dead_letters()):
+            self.on_log(f"☠️ 失敗清單 {line}")
+        if len(self.searches) > 1:
+            for line in self.search_progress.summary_lines():
+                self.on_log(f"📚 {line}")
+        if self.post_processor is not None:
+            for line in self.post_processor.report.summary_lines():
+                self.on_log(f"🗜️ 後處理: {line}")
+        for host in self.rate_limiter.snapshot():
+            self.on_log(
+                f"🌐 {host['host']} ({KIND_LABELS[host['kind']]}): 速率 {host['rate']}/秒, 並發 {host['concurrency']}, "
+                f"請求 {host['requests']} 次, 被限速 {host['throttled']} 次"
+            )
+    
+    def save_metrics(self):
+        """寫出統計檔 (副檔名 .prom/.txt 為 Prometheus 文字格式，其餘為 JSON)"""
+        if self.http_cache is not None:
+            for result, count in self.http_cache.stats().items():
+                self.metrics.inc('cache_pages', count, result=result)
+        self.metrics.dump(self.metrics_path)
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+# 預設快取位置：與下載索引放在同一個使用者目錄下
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.comic_downloader', 'http_cache.sqlite3')
+
+# 快取內容在多久內視為新鮮、不需向伺服器確認 (秒)；超過後以 ETag/Last-Modified 重新驗證
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+# 快取總大小上限，超過時淘汰最久未使用的頁面
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 不論 TTL 每次都向伺服器確認的頁面 (未變更時伺服器只回應 304)：
+# 列表頁會出現新上傳的漫畫，下載頁上的鏡像連結會更換或失效
+REVALIDATE_KINDS = {'listing', 'download_page'}
+
+# 使用時間只用來決定淘汰順序：先累積在記憶體中，累積這麼多筆 (或淘汰、關閉時) 才一次寫入，讀取快取時不必每次寫檔
+USED_AT_BATCH_SIZE = 256
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,    -- 最後一次從伺服器取得或確認的時間
+    used_at REAL NOT NULL       -- 最後一次使用的時間 (LRU 淘汰依據)
+);
+CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at);
+'''
+
+@dataclass
+class CacheEntry:
+    """快取中的一個頁面"""
+    url: str
+    body: bytes
+    etag: str = None
+    last_modified: str = None
+    stored_at: float = 0.0
+    
+    def is_fresh(self, ttl):
+        return ttl > 0 and time.time() - self.stored_at < ttl
+    
+    def conditional_headers(self):
+        """重新驗證用的條件請求標頭"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+def is_storable(headers):
+    cache_control = (headers.get('Cache-Control') or '').lower()
+    return 'no-store' not in cache_control
+
+class HttpCache:
+    """本機 SQLite 網頁快取：保存頁面內容與 ETag/Last-Modified，支援條件請求與 LRU 淘汰"""
+    
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_CACHE_TTL, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._used_at = {}  # 尚未寫入資料庫的使用時間 {網址: 時間}
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        
+        # 本次執行的統計
+        self.hits = 0           # 新鮮，未發出請求
+        self.revalidated = 0    # 伺服器回應 304，沿用快取內容
+        self.misses = 0         # 沒有快取或內容已變更
+        self.bytes_saved = 0
+    
+    def close(self):
+        with self._lock:
+            self._flush_used_at()
+            self._conn.commit()
+            self._conn.close()
+    
+    def lookup(self, url):
+        """取得快取頁面並更新使用時間 (批次寫入)，沒有時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._used_at[url] = time.time()
+            if len(self._used_at) >= USED_AT_BATCH_SIZE:
+                self._flush_used_at()
+                self._conn.commit()
+        return CacheEntry(url, *row)
+    
+    def store(self, url, body, headers):
+        """保存伺服器回傳的 200 回應內容"""
+        with self._lock:
+            self.misses += 1
+        if not is_storable(headers):
+            return
+        now = time.time()
+        with self._lock:
+            self._used_at.pop(url, None)
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, size, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, headers.get('ETag'), headers.get('Last-Modified'), len(body), now, now),
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+    
+    def record_hit(self, entry):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(entry.body)
+    
+    def record_revalidated(self, entry, headers):
+        """伺服器回應 304：更新確認時間 (與新的驗證標頭)，沿用快取內容"""
+        etag = headers.get('ETag') or entry.etag
+        last_modified = headers.get('Last-Modified') or entry.last_modified
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += len(entry.body)
+            self._conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, stored_at = ? WHERE url = ?",
+                (etag, last_modified, time.time(), entry.url),
+            )
+            self._conn.commit()
+        return entry.body
+    
+    def _flush_used_at(self):
+        """把累積的使用時間寫入資料庫 (呼叫前需持有鎖，由呼叫端 commit)"""
+        if self._used_at:
+            self._conn.executemany("UPDATE pages SET used_at = ? WHERE url = ?",
+                                   [(used_at, url) for url, used_at in self._used_at.items()])
+            self._used_at.clear()
+    
+    def _evict(self):
+        """淘汰最久未使用的頁面直到總大小低於上限 (呼叫前需持有鎖)"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        self._flush_used_at()
+        while self.total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT url, size FROM pages ORDER BY used_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.total_bytes -= size
+    
+    def stats(self):
+        """本次執行的命中統計"""
+        with self._lock:
+            return {'hit': self.hits, 'revalidated': self.revalidated, 'miss': self.misses}
+    
+    def summary(self):
+        """本次執行的命中統計文字"""
+        with self._lock:
+            return (
+                f"命中 {self.hits}, 重新驗證 {self.revalidated}, 未命中 {self.misses}, "
+                f"節省 {self.bytes_saved / 1048576:.1f} MB"
+            )
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 每個輸出資料夾內的驗證紀錄 (JSON Lines，同一個檔案以最後一筆為準)
+MANIFEST_NAME = 'verification_manifest.jsonl'
+
+ZIP_LOCAL_HEADER = b'PK\x03\x04'
+ZIP_CENTRAL_HEADER = b'PK\x01\x02'
+ZIP_END_RECORD = b'PK\x05\x06'
+ZIP64_END_LOCATOR = b'PK\x06\x07'
+ZIP64_END_LOCATOR_SIZE = 20
+ZIP_SIGNATURE_SIZE = 4
+# 檢查開頭時最多保留的位元組數 (HTML 錯誤頁可能以空白開頭)
+ZIP_HEAD_SIZE = 64
+ZIP_END_RECORD_FORMAT = '<4s4H2LH'
+ZIP_END_RECORD_SIZE = struct.calcsize(ZIP_END_RECORD_FORMAT)
+ZIP_MAX_COMMENT = 0xFFFF
+
+VERIFY_WORKERS = 4
+
+class IntegrityError(IOError):
+    """下載內容不是完整的 zip 檔 (會觸發重新下載)"""
+
+def check_zip_signature(head):
+    """檢查檔案開頭：伺服器回傳的 HTML 錯誤頁或其他內容不會以 zip 標頭開始 (空的 zip 檔只有中央目錄結尾)"""
+    if head.startswith((ZIP_LOCAL_HEADER, ZIP_END_RECORD)):
+        return
+    if head.lstrip()[:1] == b'<':
+        raise IntegrityError("收到的是 HTML 網頁而不是 zip 檔")
+    raise IntegrityError("檔案開頭不是 zip 標頭")
+
+class ZipHeadCheck:
+    """串流下載時檢查 zip 標頭：第一塊資料可能比標頭還短，先累積到 ZIP_SIGNATURE_SIZE 位元組再檢查
+    
+    整個檔案不足 ZIP_SIGNATURE_SIZE 位元組時不會檢查，交給下載完成後的 check_zip_structure。
+    """
+    
+    def __init__(self):
+        self.head = b''
+        self.checked = False
+    
+    def feed(self, chunk):
+        if self.checked:
+            return
+        self.head += bytes(chunk[:ZIP_HEAD_SIZE - len(self.head)])
+        if len(self.head) >= ZIP_SIGNATURE_SIZE:
+            self.checked = True
+            check_zip_signature(self.head)
+
+def check_zip_structure(read_at, size):
+    """只讀取檔案尾端與中央目錄開頭，確認 zip 沒有被截斷；回傳項目數
+    
+    read_at(位置, 長度) 回傳該範圍的位元組，檔案與 mmap 都可以使用。
+    """
+    if size < ZIP_END_RECORD_SIZE:
+        raise IntegrityError("檔案太小，不是完整的 zip 檔")
+    check_zip_signature(read_at(0, ZIP_SIGNATURE_SIZE))
+    
+    tail_start = max(0, size - ZIP_END_RECORD_SIZE - ZIP_MAX_COMMENT)
+    tail = read_at(tail_start, size - tail_start)
+    position = tail.rfind(ZIP_END_RECORD)
+    if position < 0:
+        raise IntegrityError("找不到 zip 中央目錄結尾 (檔案可能被截斷)")
+    
+    (_, _, _, _, entries, directory_size, directory_offset,
+     comment_length) = struct.unpack_from(ZIP_END_RECORD_FORMAT, tail, position)
+    end_record_at = tail_start + position
+    if end_record_at + ZIP_END_RECORD_SIZE + comment_length > size:
+        raise IntegrityError("zip 中央目錄結尾不完整")
+    
+    if directory_offset == 0xFFFFFFFF or entries == 0xFFFF:
+        # ZIP64：確認定位記錄存在即可，不再細查
+        locator_at = end_record_at - ZIP64_END_LOCATOR_SIZE
+        if locator_at < 0 or read_at(locator_at, 4) != ZIP64_END_LOCATOR:
+            raise IntegrityError("ZIP64 定位記錄遺失")
+        return entries
+    
+    if directory_offset + directory_size > end_record_at:
+        raise IntegrityError("zip 中央目錄超出檔案範圍 (檔案可能被截斷)")
+    if entries and read_at(directory_offset, 4) != ZIP_CENTRAL_HEADER:
+        raise IntegrityError("zip 中央目錄位置不正確")
+    return entries
+
+def check_zip_file(path):
+    """以一般檔案讀取檢查 zip 結構，回傳項目數"""
+    with open(path, 'rb') as f:
+        def read_at(offset, length):
+            f.seek(offset)
+            return f.read(length)
+        return check_zip_structure(read_at, os.path.getsize(path))
+
+def hash_prefix(path, length, chunk_size=1024 * 1024):
+    """續傳時計算 .part 檔已下載部分的 SHA-256 (只讀取先前寫入的位元組)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                raise IntegrityError(".part 檔比續傳紀錄短")
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+class VerificationManifest:
+    """輸出資料夾中的驗證紀錄：每次下載完成、驗證失敗或整庫檢查都追加一筆"""
+    
+    def __init__(self, folder):
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self._lock = threading.Lock()
+    
+    def record(self, file, status, **fields):
+        entry = {'file': file, 'status': status, 'checked_at': round(time.time(), 3), **fields}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    
+    def latest(self, status=None):
+        """各檔案最後一筆紀錄 {檔名: 紀錄}；指定 status 時只看該狀態的紀錄"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 寫到一半中斷的行
+                if status is None or entry.get('status') == status:
+                    entries[entry['file']] = entry
+        return entries
+
+def verify_archive(path, expected_sha256=None):
+    """以 mmap 讀取檢查單一檔案：大小、SHA-256 與 zip 結構"""
+    result = {'file': os.path.basename(path), 'size': os.path.getsize(path)}
+    try:
+        if result['size'] == 0:
+            raise IntegrityError("檔案是空的")
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            result['entries'] = check_zip_structure(lambda offset, length: view[offset:offset + length],
+                                                    result['size'])
+            result['sha256'] = hashlib.sha256(view).hexdigest()
+    except (IntegrityError, OSError, ValueError) as e:
+        result.update(status='failed', reason=str(e))
+        return result
+    
+    if expected_sha256 and result['sha256'] != expected_sha256:
+        result.update(status='mismatch', reason=f"SHA-256 與紀錄不符 (紀錄 {expected_sha256[:12]}…)")
+    else:
+        result['status'] = 'ok'
+    return result
+
+def verify_library(folder, workers=VERIFY_WORKERS, on_result=None):
+    """平行檢查資料夾內所有 zip 檔，並把結果寫入驗證紀錄；回傳結果清單
+    
+    hashlib 計算大區塊時會釋放 GIL，搭配 mmap 讀取，多個執行緒即可平行計算。
+    """
+    manifest = VerificationManifest(folder)
+    verified = manifest.latest('ok')
+    paths = sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(('.zip', '.cbz')) and os.path.isfile(os.path.join(folder, name))
+    )
+    
+    def verify(path):
+        # 與最後一次驗證通過時的雜湊比較，找出下載後被改動或損壞的檔案
+        expected = verified.get(os.path.basename(path), {}).get('sha256')
+        result = verify_archive(path, expected)
+        manifest.record(source='verify', **result)
+        if on_result is not None:
+            on_result(result)
+        return result
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(verify, paths))
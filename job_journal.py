@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+# 預設位置：與下載索引放在同一個使用者目錄下
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.comic_downloader', 'journal.sqlite3')
+
+# 每個漫畫最多嘗試的次數 (每次嘗試內仍有 download_file 的重試與鏡像切換)，用完後移入失敗清單
+MAX_ATTEMPTS = 4
+
+# 失敗後重新排入前的等待時間 (秒)：每多失敗一次加倍，最多 RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 10 * 60
+
+STAGE_DISCOVERED = 'discovered'
+STAGE_RESOLVED = 'resolved'
+STAGE_DOWNLOADING = 'downloading'
+STAGE_DONE = 'done'
+STAGE_FAILED = 'failed'     # 等待退避時間後重試
+STAGE_DEAD = 'dead'         # 失敗清單：不再自動重試
+
+# 尚未完成、下次執行時直接排入佇列的階段
+ACTIVE_STAGES = (STAGE_DISCOVERED, STAGE_RESOLVED, STAGE_DOWNLOADING)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    run TEXT NOT NULL,              -- 搜尋網址 + 輸出資料夾
+    manga_url TEXT NOT NULL,
+    seq INTEGER NOT NULL,           -- 發現順序
+    stage TEXT NOT NULL,
+    title TEXT,
+    filepath TEXT,
+    download_urls TEXT,             -- JSON 陣列
+    offset INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run, manga_url)
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (run, stage);
+CREATE TABLE IF NOT EXISTS listing_pages (
+    run TEXT NOT NULL,              -- 搜尋網址 + 輸出資料夾 (批次中的每個搜尋各自記錄)
+    page INTEGER NOT NULL,
+    last INTEGER NOT NULL,          -- 1 表示搜尋結果在這頁結束
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (run, page)
+);
+'''
+
+def journal_run_key(base_url, output_folder):
+    """同一個搜尋下載到同一個資料夾視為同一次工作 (網址中的頁碼不影響)；
+    批次執行時 base_url 為所有搜尋網址，以換行分隔
+    """
+    search = re.sub(r'([?&](?:page|p)=|page-)\d+', r'\1', base_url)
+    return f"{search}|{os.path.abspath(output_folder)}"
+
+def retry_delay(attempts):
+    """第 attempts 次失敗後的等待時間"""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+@dataclass(slots=True)
+class JobRecord:
+    """工作日誌中的一本漫畫"""
+    manga_url: str
+    seq: int
+    stage: str
+    title: str = None
+    filepath: str = None
+    download_urls: list = field(default_factory=list)
+    offset: int = 0
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: str = None
+    updated_at: float = 0.0
+
+class JobJournal:
+    """SQLite 工作日誌：記錄一次搜尋中每本漫畫的階段 (已發現、已解析、下載中與位移、完成、失敗)
+    與已掃描的列表頁；程式當掉、關閉或取消後，下次執行只排入未完成的工作
+    
+    失敗的工作依 retry_delay() 退避後重新排入，失敗 max_attempts 次後移入失敗清單。
+    批次執行時所有搜尋共用同一組工作紀錄，列表頁則依 search (各搜尋的 journal_run_key) 分開記錄。
+    """
+    
+    def __init__(self, path, run, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.run = run
+        self.max_attempts = max_attempts
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._searches = {run}
+        self._next_seq = self._conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs WHERE run = ?", (run,)
+        ).fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _select(self, where, params=()):
+        cursor = self._conn.execute(f"SELECT * FROM jobs WHERE run = ? AND {where} ORDER BY seq",
+                                    (self.run, *params))
+        columns = [column[0] for column in cursor.description]
+        records = []
+        for row in cursor.fetchall():
+            values = dict(zip(columns, row))
+            del values['run']
+            values['download_urls'] = json.loads(values['download_urls'] or '[]')
+            records.append(JobRecord(**values))
+        return records
+    
+    def _update(self, manga_url, **fields):
+        columns = [*fields, 'updated_at']
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{column} = ?' for column in columns)} WHERE run = ? AND manga_url = ?",
+                [*fields.values(), time.time(), self.run, manga_url],
+            )
+            self._conn.commit()
+    
+    def load(self):
+        """本次工作的所有紀錄 (依發現順序)"""
+        with self._lock:
+            return self._select("1")
+    
+    def unscanned_pages(self, start_page, end_page, search=None):
+        """範圍內還沒掃描過的列表頁；已知搜尋結果在某頁結束時不包含其後的頁面"""
+        search = search or self.run
+        with self._lock:
+            self._searches.add(search)
+            rows = self._conn.execute(
+                "SELECT page, last FROM listing_pages WHERE run = ? AND page BETWEEN ? AND ?",
+                (search, start_page, end_page),
+            ).fetchall()
+        scanned = dict(rows)
+        end_page = min([page for page, last in scanned.items() if last], default=end_page)
+        return [page for page in range(start_page, end_page + 1) if page not in scanned]
+    
+    def record_listing(self, page_num, manga_urls, last, search=None):
+        """記錄掃描完的列表頁與其中要處理的漫畫 (同一個交易)"""
+        search = search or self.run
+        now = time.time()
+        with self._lock:
+            self._searches.add(search)
+            for manga_url in manga_urls:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (run, manga_url, seq, stage, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.run, manga_url, self._next_seq, STAGE_DISCOVERED, now),
+                )
+                self._next_seq += cursor.rowcount
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listing_pages (run, page, last, scanned_at) VALUES (?, ?, ?, ?)",
+                (search, page_num, int(last), now),
+            )
+            self._conn.commit()
+    
+    def mark_resolved(self, manga_url, title, filepath, download_urls):
+        self._update(manga_url, stage=STAGE_RESOLVED, title=title, filepath=filepath,
+                     download_urls=json.dumps(download_urls, ensure_ascii=False))
+    
+    def mark_downloading(self, manga_url, offset):
+        """開始下載或下載中斷：記錄 .part 檔已寫入的位移"""
+        self._update(manga_url, stage=STAGE_DOWNLOADING, offset=offset)
+    
+    def mark_done(self, manga_url):
+        self._update(manga_url, stage=STAGE_DONE, next_attempt_at=0, last_error=None)
+    
+    def mark_failed(self, manga_url, error, offset=None):
+        """記錄一次失敗並安排重試時間；回傳更新後的紀錄 (stage 為 failed 或 dead)"""
+        with self._lock:
+            records = self._select("manga_url = ?", (manga_url,))
+        if not records:
+            return None
+        record = records[0]
+        record.attempts += 1
+        record.last_error = error
+        if offset is not None:
+            record.offset = offset
+        if record.attempts >= self.max_attempts:
+            record.stage = STAGE_DEAD
+            record.next_attempt_at = 0.0
+        else:
+            record.stage = STAGE_FAILED
+            record.next_attempt_at = time.time() + retry_delay(record.attempts)
+        self._update(manga_url, stage=record.stage, attempts=record.attempts, offset=record.offset,
+                     next_attempt_at=record.next_attempt_at, last_error=error)
+        return record
+    
+    def take_due(self):
+        """取出退避時間已到的失敗工作，改回重試前的階段 (有下載連結時不必重新解析)"""
+        with self._lock:
+            records = self._select("stage = ? AND next_attempt_at <= ?", (STAGE_FAILED, time.time()))
+        for record in records:
+            record.stage = STAGE_RESOLVED if record.download_urls else STAGE_DISCOVERED
+            self._update(record.manga_url, stage=record.stage)
+        return records
+    
+    def dead_letters(self):
+        """失敗清單"""
+        with self._lock:
+            return self._select("stage = ?", (STAGE_DEAD,))
+    
+    def revive_dead(self):
+        """把失敗清單中的工作重新排入 (嘗試次數歸零)，回傳筆數"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET stage = ?, attempts = 0, next_attempt_at = 0, updated_at = ? "
+                "WHERE run = ? AND stage = ?",
+                (STAGE_FAILED, time.time(), self.run, STAGE_DEAD),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+    
+    def finish(self):
+        """整個搜尋都處理完畢：清除這次工作的紀錄，只保留失敗清單
+        
+        下次以同一個搜尋執行時會重新掃描列表頁，找出新上傳的漫畫 (已下載的由下載索引跳過)。
+        """
+        with self._lock:
+            self._conn.executemany("DELETE FROM listing_pages WHERE run = ?", [(search,) for search in self._searches])
+            self._conn.execute("DELETE FROM jobs WHERE run = ? AND stage != ?", (self.run, STAGE_DEAD))
+            self._conn.commit()
+
+def dead_letter_lines(records):
+    """供日誌顯示的失敗清單"""
+    return [f"{record.title or record.manga_url}: 失敗 {record.attempts} 次 - {record.last_error}" for record in records]
+
+def all_dead_letters(path):
+    """所有搜尋的失敗清單 [(工作, 紀錄)]，供命令列列出"""
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        runs = [row[0] for row in conn.execute("SELECT DISTINCT run FROM jobs WHERE stage = ?", (STAGE_DEAD,))]
+    finally:
+        conn.close()
+    letters = []
+    for run in runs:
+        journal = JobJournal(path, run)
+        try:
+            letters.extend((run, record) for record in journal.dead_letters())
+        finally:
+            journal.close()
+    return letters
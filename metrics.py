@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# 延遲直方圖的區間上界 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Prometheus 指標名稱前綴
+METRIC_PREFIX = 'comic_downloader'
+
+REQUEST_KIND_LABELS = {
+    'listing': '列表頁',
+    'gallery': '漫畫頁',
+    'download_page': '下載頁',
+    'probe': '大小探測',
+    'file': '檔案',
+}
+
+STAGE_LABELS = {
+    'listing': '列表頁',
+    'resolve': '解析漫畫',
+    'download': '下載檔案',
+}
+
+SLEEP_REASON_LABELS = {
+    'rate_limit': '限速',
+    'retry_backoff': '重試',
+    'segment_retry': '分段重試',
+    'bandwidth': '頻寬限制',
+}
+
+def format_bytes(size):
+    if size >= 1048576:
+        return f"{size / 1048576:.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 0.01:
+        return f"{seconds * 1000:.0f}ms"
+    return f"{seconds * 1000:.1f}ms"
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+class Histogram:
+    """固定區間的直方圖 (與 Prometheus 相同的累積區間格式)"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # 最後一格為 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q):
+        """以所在區間的上界估計分位數"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+    
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'max': round(self.max, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.bucket_counts)),
+        }
+
+class PipelineMetrics:
+    """下載流程的統計 (執行緒安全)
+    
+    計數器與直方圖都以 (名稱, 標籤) 區分，例如
+    requests{kind}、request_seconds{kind}、bytes{kind,host}、sleep_seconds{reason}、mirror_failovers{reason}。
+    """
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """記錄 with 區塊花費的時間 (發生例外也會記錄)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    def record_transfer(self, url, size, seconds):
+        """記錄一次檔案傳輸的位元組數與花費時間 (用於計算各主機的吞吐量)"""
+        host = urlparse(url).netloc
+        self.inc('bytes', size, kind='file', host=host)
+        self.inc('transfer_seconds', seconds, host=host)
+        self.observe('file_transfer_seconds', seconds, host=host)
+    
+    def counter(self, name, **labels):
+        """名稱相同、且包含指定標籤的計數器總和"""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (counter_name, counter_labels), value in self.counters.items()
+                       if counter_name == name and wanted <= set(counter_labels))
+    
+    def label_values(self, name, label):
+        """某個計數器出現過的標籤值"""
+        with self._lock:
+            return sorted({dict(labels)[label] for counter_name, labels in self.counters
+                           if counter_name == name and label in dict(labels)})
+    
+    def histogram(self, name, **labels):
+        with self._lock:
+            histogram = self.histograms.get((name, tuple(sorted(labels.items()))))
+            return histogram.to_dict() if histogram is not None else None
+    
+    def snapshot(self):
+        """所有統計的 JSON 可序列化版本"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': round(time.time() - self.started_at, 3),
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ],
+            }
+    
+    def to_prometheus(self):
+        """Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            lines.append(f"{METRIC_PREFIX}_elapsed_seconds {time.time() - self.started_at:.3f}")
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{METRIC_PREFIX}_{name}_total{format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip([*map(str, histogram.buckets), '+Inf'], histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{METRIC_PREFIX}_{name}_bucket{format_labels((*labels, ('le', bound)))} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}_{name}_sum{format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{METRIC_PREFIX}_{name}_count{format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+    
+    def dump(self, path):
+        """寫出統計檔：副檔名為 .prom 或 .txt 時使用 Prometheus 文字格式，否則為 JSON"""
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    
+    def summary_lines(self):
+        """供日誌與 GUI 統計面板顯示的摘要"""
+        elapsed = time.time() - self.started_at
+        lines = [f"已執行 {elapsed:.1f} 秒"]
+        
+        for kind, label in REQUEST_KIND_LABELS.items():
+            requests = self.counter('requests', kind=kind)
+            if not requests:
+                continue
+            line = f"{label}: {requests} 次"
+            latency = self.histogram('request_seconds', kind=kind)
+            if latency:
+                line += f", 回應 p50 {format_seconds(latency['p50'])} / p95 {format_seconds(latency['p95'])}"
+            parse = self.histogram('parse_seconds', kind=kind)
+            if parse:
+                line += f", 解析平均 {format_seconds(parse['sum'] / parse['count'])}"
+            size = self.counter('bytes', kind=kind)
+            if size:
+                line += f", {format_bytes(size)}"
+            lines.append(line)
+        
+        stages = []
+        for stage, label in STAGE_LABELS.items():
+            timing = self.histogram('stage_seconds', stage=stage)
+            if timing:
+                stages.append(f"{label} {format_seconds(timing['sum'] / timing['count'])}")
+        if stages:
+            lines.append(f"各階段平均: {', '.join(stages)}")
+        
+        for host in self.label_values('transfer_seconds', 'host'):
+            size = self.counter('bytes', kind='file', host=host)
+            seconds = self.counter('transfer_seconds', host=host)
+            if seconds > 0:
+                lines.append(f"{host}: {format_bytes(size)}, 每連線 {format_bytes(size / seconds)}/s")
+        
+        throttled = sum(self.counter('responses', status=status) for status in ('429', '503'))
+        retries = self.counter('retries')
+        errors = self.counter('request_errors')
+        integrity_failures = self.counter('integrity_failures')
+        failovers = self.counter('mirror_failovers')
+        sleeps = [f"{SLEEP_REASON_LABELS.get(reason, reason)} {self.counter('sleep_seconds', reason=reason):.1f}s"
+                  for reason in self.label_values('sleep_seconds', 'reason')]
+        lines.append(f"重試 {retries} 次, 切換鏡像 {failovers} 次, 被限速 (429/503) {throttled} 次, "
+                     f"連線錯誤 {errors} 次, 檔案驗證失敗 {integrity_failures} 次")
+        if sleeps:
+            lines.append(f"等待時間: {', '.join(sleeps)}")
+        return lines
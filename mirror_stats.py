@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+from urllib.parse import urlparse
+
+from metrics import format_bytes
+
+# 預設位置：與下載索引、網頁快取放在同一個使用者目錄下
+DEFAULT_MIRROR_STATS_PATH = os.path.join(os.path.expanduser('~'), '.comic_downloader', 'mirrors.sqlite3')
+
+# 速度與錯誤率以指數移動平均更新，新量測值所佔的比重
+EWMA_WEIGHT = 0.3
+
+# 傳輸量太少時速度主要反映連線建立時間，不列入平均
+MIN_SAMPLE_BYTES = 256 * 1024
+
+# 太久沒有更新的統計視為未知，讓鏡像有機會重新量測 (秒)
+STATS_MAX_AGE = 7 * 24 * 60 * 60
+
+# 傳輸持續這麼久後才比較速度 (秒)；低於最快替代鏡像的這個比例時改用替代鏡像續傳
+SLOW_CHECK_AFTER = 5.0
+SLOW_RATIO = 0.25
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS mirrors (
+    host TEXT PRIMARY KEY,
+    throughput REAL,            -- 每連線速度 (位元組/秒) 的移動平均
+    error_rate REAL NOT NULL,   -- 失敗比例的移動平均
+    successes INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+'''
+
+class MirrorTooSlow(IOError):
+    """傳輸中的鏡像明顯比其他鏡像慢 (會改用其他鏡像從中斷處續傳)"""
+
+def mirror_host(url):
+    return urlparse(url).netloc
+
+@dataclass
+class MirrorRecord:
+    """單一鏡像主機的量測結果"""
+    host: str
+    throughput: float = None
+    error_rate: float = 0.0
+    successes: int = 0
+    failures: int = 0
+    updated_at: float = 0.0
+    
+    def is_known(self):
+        return bool(self.successes or self.failures) and time.time() - self.updated_at < STATS_MAX_AGE
+    
+    def score(self):
+        """預期的有效速度：速度乘上成功率"""
+        return (self.throughput or 0.0) * (1 - self.error_rate)
+
+class MirrorStats:
+    """各鏡像主機的速度與錯誤率 (執行緒安全)
+    
+    執行開始時由 load() 讀入、結束時由 save() 寫回 SQLite，排序依據跨執行保留。
+    """
+    
+    def __init__(self):
+        self.records = {}
+        self._lock = threading.Lock()
+    
+    def _record(self, url):
+        host = mirror_host(url)
+        record = self.records.get(host)
+        if record is None:
+            record = self.records[host] = MirrorRecord(host)
+        return record
+    
+    def record_transfer(self, url, size, seconds):
+        """記錄一次傳輸的速度 (包含中途失敗的傳輸)"""
+        if size < MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        rate = size / seconds
+        with self._lock:
+            record = self._record(url)
+            if record.throughput is None:
+                record.throughput = rate
+            else:
+                record.throughput += EWMA_WEIGHT * (rate - record.throughput)
+            record.updated_at = time.time()
+    
+    def record_result(self, url, ok):
+        """記錄一次下載嘗試成功或失敗"""
+        with self._lock:
+            record = self._record(url)
+            if ok:
+                record.successes += 1
+            else:
+                record.failures += 1
+            record.error_rate += EWMA_WEIGHT * ((0.0 if ok else 1.0) - record.error_rate)
+            record.updated_at = time.time()
+    
+    def rank(self, urls):
+        """依預期速度排序鏡像：尚未量測 (或統計已過期) 的鏡像依頁面順序排在最前面，先量測一次"""
+        with self._lock:
+            def sort_key(item):
+                position, url = item
+                record = self.records.get(mirror_host(url))
+                if record is None or not record.is_known():
+                    return (0, 0.0, position)
+                return (1, -record.score(), position)
+            return [url for _, url in sorted(enumerate(urls), key=sort_key)]
+    
+    def best_score(self, urls):
+        """urls 中已量測鏡像的最高預期速度，都沒有量測時回傳 0"""
+        with self._lock:
+            scores = [self.records[mirror_host(url)].score() for url in urls
+                      if mirror_host(url) in self.records and self.records[mirror_host(url)].is_known()]
+        return max(scores, default=0.0)
+    
+    def should_leave(self, url, alternatives, transferred, seconds, remaining=None):
+        """傳輸中的鏡像是否該放棄：已傳輸夠久、剩下的部分還需要一段時間，
+        而且有替代鏡像的預期速度是目前速度的 1 / SLOW_RATIO 倍以上
+        
+        放棄時直接以目前速度取代該鏡像的平均速度，下次排序就會排在後面。
+        """
+        if not alternatives or seconds < SLOW_CHECK_AFTER:
+            return False
+        rate = transferred / seconds
+        if remaining is not None and remaining <= rate * SLOW_CHECK_AFTER:
+            return False
+        if rate >= self.best_score(alternatives) * SLOW_RATIO:
+            return False
+        with self._lock:
+            record = self._record(url)
+            record.throughput = rate
+            record.updated_at = time.time()
+        return True
+    
+    def snapshot(self):
+        """本次有量測紀錄的鏡像，依預期速度排序"""
+        with self._lock:
+            records = [record for record in self.records.values() if record.is_known()]
+        return sorted(records, key=lambda record: -record.score())
+    
+    def summary_lines(self):
+        """供日誌顯示的各鏡像統計"""
+        lines = []
+        for record in self.snapshot():
+            line = f"{record.host}: "
+            if record.throughput is not None:
+                line += f"每連線 {format_bytes(record.throughput)}/s, "
+            line += f"錯誤率 {record.error_rate * 100:.0f}%, 成功 {record.successes} 次, 失敗 {record.failures} 次"
+            lines.append(line)
+        return lines
+    
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            cursor = conn.execute("SELECT * FROM mirrors")
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for row in rows:
+                record = MirrorRecord(**dict(zip(columns, row)))
+                self.records[record.host] = record
+    
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        columns = [field.name for field in fields(MirrorRecord)]
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:])
+        with self._lock:
+            rows = [[getattr(record, column) for column in columns] for record in self.records.values()]
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                f"INSERT INTO mirrors ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(host) DO UPDATE SET {updates}",
+                rows,
+            )
+            conn.commit()
+        finally:
+            conn.close()
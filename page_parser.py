@@ -0,0 +1,395 @@
+import os
+import re
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+# 可選的高速解析器：lxml 或 selectolax (lexbor)，都沒有時使用 html.parser
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# 尋找漫畫連結 - 根據網站結構調整選擇器
+# 一般漫畫網站的連結可能在這些地方
+LINK_SELECTORS = [
+    'a[href*="/photos-index-aid-"]',  # wnacg 特定格式
+    '.pic_box a',
+    '.gallery a',
+    '.thumb a',
+    'a[href*="aid"]',
+    '.list-item a',
+]
+
+# 列表頁的分頁列與「下一頁」連結 (用來判斷是否已到最後一頁)
+PAGINATION_SELECTORS = ['.paginator a', '.pagination a', '.pager a']
+NEXT_PAGE_SELECTORS = ['a:contains("後頁")', 'a:contains("下一頁")']
+
+# 分頁連結中的頁碼 (page-2、?page=2 或搜尋結果的 &p=2)
+PAGE_NUMBER_PATTERN = re.compile(r'(?:page-|[?&](?:page|p)=)(\d+)')
+
+# 嘗試多種標題選擇器
+TITLE_SELECTORS = ['h1', 'h2', '.title', '#title', '.manga-title']
+
+# 漫畫頁上的標籤 (用於下載排程的優先標籤)
+TAG_SELECTORS = ['.tagshow', '.addtags a']
+
+# 漫畫頁上的資訊欄 (分類、頁數、上傳日期…) 與封面縮圖
+INFO_SELECTORS = ['.uwconn label', '.uwconn p', '.uwconn span']
+THUMBNAIL_SELECTORS = ['.uwthumb img', '.cover img']
+
+# 資訊欄文字中的各欄位 (網站有繁體與簡體兩種介面)
+INFO_PATTERNS = {
+    'category': re.compile(r'(?:分類|分类)[：:]\s*(.+?)\s*(?=頁數|页数|上傳於|上传于|$)'),
+    'page_count': re.compile(r'(?:頁數|页数)[：:]\s*(\d+)'),
+    'uploaded': re.compile(r'(?:上傳於|上传于)\s*(\d{4}-\d{1,2}-\d{1,2})'),
+    'size': re.compile(r'(?:檔案|文件)大小[：:]\s*([\d.]+)\s*([KMG]?B)', re.IGNORECASE),
+}
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# 尋找下載按鈕或連結
+DOWNLOAD_SELECTORS = [
+    'a[href*="download"]',
+    'a:contains("下載")',
+    'a:contains("本地下載")',
+    '.download-btn',
+    '#download',
+    'a[href*="down"]',
+]
+
+# 尋找本地下載連結
+FINAL_SELECTORS = [
+    'a:contains("本地下載一")',
+    'a:contains("本地下載二")',
+    'a:contains("本地下載")',
+    'a[href*=".zip"]',
+    'a[href*="download"]',
+    '.download-link',
+]
+
+# 所有鏡像的下載連結 (本地下載一、本地下載二…)
+MIRROR_SELECTORS = [
+    'a:contains("本地下載")',
+    'a[href*=".zip"]',
+]
+
+@dataclass(slots=True)
+class GalleryPage:
+    """單一漫畫頁面的解析結果"""
+    url: str
+    aid: str
+    title: str
+    download_page_url: str = None
+    tags: list = None
+    category: str = None
+    page_count: int = None
+    uploaded: str = None        # 上傳日期 (YYYY-MM-DD)
+    size: int = None            # 頁面上標示的檔案大小 (位元組)
+    thumbnail_url: str = None
+
+@dataclass(slots=True)
+class ListingPage:
+    """列表頁的解析結果"""
+    url: str
+    links: list                 # 漫畫連結 (已去除重複)
+    page_numbers: list = None   # 分頁列上出現的頁碼
+    has_next: bool = False      # 有「後頁」連結
+    
+    def is_last(self):
+        """有分頁列但沒有「後頁」連結時，這頁就是最後一頁；沒有分頁列時無法判斷"""
+        return bool(self.page_numbers) and not self.has_next
+
+def listing_page_url(base_url, page_num):
+    """把列表頁網址中的頁碼 (page-2、page=2 或 p=2) 換成 page_num；
+    網址沒有頁碼時加上查詢參數：搜尋結果用 p，其他列表用 page
+    """
+    match = PAGE_NUMBER_PATTERN.search(base_url)
+    if match:
+        return f"{base_url[:match.start(1)]}{page_num}{base_url[match.end(1):]}"
+    separator = '&' if '?' in base_url else '?'
+    name = 'p' if urlparse(base_url).path.startswith('/search') else 'page'
+    return f"{base_url}{separator}{name}={page_num}"
+
+def extract_aid(manga_url):
+    """從漫畫網址取出 aid，找不到時回傳 None"""
+    match = re.search(r'aid-(\d+)', manga_url)
+    return match.group(1) if match else None
+
+# ---- 預先編譯的擷取規則 ----
+
+@dataclass(frozen=True)
+class Rule:
+    """單一選擇器編譯後的比對條件 (只支援本專案用到的幾種寫法)"""
+    tag: str = None
+    href_contains: str = None
+    text_contains: str = None
+    ancestor_class: str = None
+    class_name: str = None
+    element_id: str = None
+
+SELECTOR_PATTERNS = [
+    (re.compile(r'^(\w+)\[href\*="([^"]+)"\]$'), lambda m: Rule(tag=m[1], href_contains=m[2])),
+    (re.compile(r'^(\w+):contains\("([^"]+)"\)$'), lambda m: Rule(tag=m[1], text_contains=m[2])),
+    (re.compile(r'^\.([\w-]+) (\w+)$'), lambda m: Rule(tag=m[2], ancestor_class=m[1])),
+    (re.compile(r'^\.([\w-]+)$'), lambda m: Rule(class_name=m[1])),
+    (re.compile(r'^#([\w-]+)$'), lambda m: Rule(element_id=m[1])),
+    (re.compile(r'^(\w+)$'), lambda m: Rule(tag=m[1])),
+]
+
+def compile_selector(selector):
+    for pattern, build in SELECTOR_PATTERNS:
+        match = pattern.match(selector)
+        if match:
+            return build(match)
+    raise ValueError(f"不支援的選擇器: {selector}")
+
+@dataclass
+class RuleGroup:
+    """一組依優先順序排列的選擇器：第一個有結果的選擇器勝出"""
+    name: str
+    rules: list
+    capture: str = 'href'   # 'text' 取文字，其他為要取的屬性 (如 'href'、'src')
+    limit: int = 1          # 每個選擇器最多保留幾個結果 (None 表示不限)
+    merge: bool = False     # True 時不取第一個有結果的選擇器，而是依序合併所有選擇器的結果
+    
+    @classmethod
+    def compile(cls, name, selectors, **options):
+        return cls(name, [compile_selector(selector) for selector in selectors], **options)
+
+LINK_GROUP = RuleGroup.compile('links', LINK_SELECTORS, limit=None)
+PAGINATION_GROUP = RuleGroup.compile('pagination', PAGINATION_SELECTORS, limit=None, merge=True)
+NEXT_PAGE_GROUP = RuleGroup.compile('next_page', NEXT_PAGE_SELECTORS)
+TITLE_GROUP = RuleGroup.compile('title', TITLE_SELECTORS, capture='text')
+TAG_GROUP = RuleGroup.compile('tags', TAG_SELECTORS, capture='text', limit=None, merge=True)
+INFO_GROUP = RuleGroup.compile('info', INFO_SELECTORS, capture='text', limit=None, merge=True)
+THUMBNAIL_GROUP = RuleGroup.compile('thumbnail', THUMBNAIL_SELECTORS, capture='src')
+DOWNLOAD_GROUP = RuleGroup.compile('download', DOWNLOAD_SELECTORS)
+FINAL_GROUP = RuleGroup.compile('final', FINAL_SELECTORS)
+MIRROR_GROUP = RuleGroup.compile('mirrors', MIRROR_SELECTORS, limit=None, merge=True)
+
+# ---- 解析器後端：把文件轉成 (標籤, 屬性取值函式, 文字函式, 祖先 class 函式) 的串流 ----
+
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+def decode_html(content):
+    """依 <meta charset> 解碼網頁內容，沒有宣告時視為 UTF-8"""
+    if isinstance(content, str):
+        return content
+    match = CHARSET_PATTERN.search(content[:4096])
+    encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return content.decode(encoding, errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+def iter_lxml(content):
+    try:
+        root = lxml.html.fromstring(decode_html(content))
+    except (lxml.etree.ParserError, ValueError):
+        # 例如帶有 XML 編碼宣告的文件 (lxml 不接受 str 輸入)：改用 html.parser，不能當成沒有內容的頁面
+        yield from iter_html_parser(content)
+        return
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue  # 註解與處理指令
+        yield (
+            element.tag,
+            element.get,
+            element.text_content,
+            lambda element=element: [a.get('class', '') for a in element.iterancestors()],
+        )
+
+def iter_selectolax(content):
+    tree = LexborHTMLParser(decode_html(content))
+    if tree.root is None:
+        return
+    for node in tree.root.traverse():
+        if node.tag.startswith('-'):
+            continue  # -comment、-text 等非元素節點
+        attributes = node.attributes
+        
+        def ancestors(node=node):
+            classes = []
+            parent = node.parent
+            while parent is not None:
+                classes.append(parent.attributes.get('class') or '')
+                parent = parent.parent
+            return classes
+        
+        yield node.tag, attributes.get, lambda node=node: node.text(deep=True), ancestors
+
+def soup_attribute_getter(element):
+    """BeautifulSoup 的 class 屬性是清單，轉成與其他後端相同的字串"""
+    def get(name):
+        value = element.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+    return get
+
+def iter_html_parser(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup.find_all(True):
+        yield (
+            element.name,
+            soup_attribute_getter(element),
+            element.get_text,
+            lambda element=element: [' '.join(parent.get('class') or []) for parent in element.parents],
+        )
+    soup.decompose()
+
+BACKENDS = {
+    'lxml': iter_lxml if lxml is not None else None,
+    'selectolax': iter_selectolax if LexborHTMLParser is not None else None,
+    'html.parser': iter_html_parser,
+}
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend is not None]
+
+def default_backend():
+    """預設使用最快的可用解析器；可用環境變數 COMIC_PARSER_BACKEND 指定"""
+    preferred = os.environ.get('COMIC_PARSER_BACKEND')
+    if preferred in available_backends():
+        return preferred
+    return available_backends()[0]
+
+parser_backend = default_backend()
+
+def set_backend(name):
+    """切換解析器後端 ('lxml'、'selectolax' 或 'html.parser')"""
+    global parser_backend
+    if name not in available_backends():
+        raise ValueError(f"解析器不可用: {name} (可用: {', '.join(available_backends())})")
+    parser_backend = name
+
+def rule_matches(rule, tag, get, text, ancestors):
+    if rule.tag is not None and tag != rule.tag:
+        return False
+    if rule.href_contains is not None and rule.href_contains not in (get('href') or ''):
+        return False
+    if rule.class_name is not None and rule.class_name not in (get('class') or '').split():
+        return False
+    if rule.element_id is not None and get('id') != rule.element_id:
+        return False
+    if rule.ancestor_class is not None and not any(rule.ancestor_class in c.split() for c in ancestors()):
+        return False
+    if rule.text_contains is not None and rule.text_contains not in text():
+        return False
+    return True
+
+def extract(content, groups, backend=None):
+    """單次走訪整份文件，同時套用所有規則組
+    
+    回傳 {組名: 勝出選擇器的結果清單}；每組取第一個有結果的選擇器，
+    與依序呼叫 soup.select 的結果相同，但文件只解析、走訪一次。
+    merge 組則回傳所有選擇器結果依序合併、去除重複後的清單。
+    """
+    matches = {group.name: [[] for _ in group.rules] for group in groups}
+    # 每組目前有結果的最高優先選擇器；比它優先順序低的規則已不可能勝出，不必再比對
+    best = {group.name: len(group.rules) for group in groups}
+    walk = BACKENDS[backend or parser_backend]
+    
+    for tag, get, text, ancestors in walk(content):
+        cached_ancestors = None
+        
+        def ancestor_classes():
+            nonlocal cached_ancestors
+            if cached_ancestors is None:
+                cached_ancestors = ancestors()
+            return cached_ancestors
+        
+        for group in groups:
+            buckets = matches[group.name]
+            last = len(group.rules) if group.merge else min(best[group.name] + 1, len(group.rules))
+            for index in range(last):
+                bucket = buckets[index]
+                if group.limit is not None and len(bucket) >= group.limit:
+                    continue
+                if not rule_matches(group.rules[index], tag, get, text, ancestor_classes):
+                    continue
+                if group.capture == 'text':
+                    bucket.append(text().strip())
+                else:
+                    value = get(group.capture)
+                    if not value:
+                        continue
+                    bucket.append(value)
+                best[group.name] = min(best[group.name], index)
+    
+    results = {}
+    for group in groups:
+        buckets = matches[group.name]
+        if group.merge:
+            results[group.name] = list(dict.fromkeys(value for bucket in buckets for value in bucket))
+        else:
+            results[group.name] = next((bucket for bucket in buckets if bucket), [])
+    return results
+
+def parse_manga_links(content, page_url, backend=None):
+    """從列表頁取出所有漫畫連結 (保留順序、去除重複)"""
+    return list(dict.fromkeys(urljoin(page_url, href) for href in extract(content, [LINK_GROUP], backend)['links']))
+
+def parse_listing_page(content, page_url, backend=None):
+    """解析列表頁，一次取出漫畫連結與分頁資訊"""
+    found = extract(content, [LINK_GROUP, PAGINATION_GROUP, NEXT_PAGE_GROUP], backend)
+    page_numbers = sorted({int(match.group(1)) for href in found['pagination']
+                           for match in [PAGE_NUMBER_PATTERN.search(href)] if match})
+    return ListingPage(
+        url=page_url,
+        links=list(dict.fromkeys(urljoin(page_url, href) for href in found['links'])),
+        page_numbers=page_numbers,
+        has_next=bool(found['next_page']),
+    )
+
+def clean_title(title, manga_url):
+    """清理檔案名稱中的非法字符並限制長度；沒有標題時使用 URL 的一部分"""
+    if not title:
+        return f"manga_{manga_url.split('-')[-1]}"
+    title = re.sub(r'[<>:"/\\|?*]', '_', title)
+    return title[:100]  # 限制長度
+
+def parse_gallery_info(lines):
+    """從資訊欄文字取出分類、頁數、上傳日期與檔案大小 (找不到的欄位不包含在結果中)"""
+    info = {}
+    for line in lines:
+        line = ' '.join(line.split())
+        for name, pattern in INFO_PATTERNS.items():
+            match = pattern.search(line)
+            if match is None or name in info:
+                continue
+            if name == 'page_count':
+                info[name] = int(match.group(1))
+            elif name == 'size':
+                info[name] = int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+            else:
+                info[name] = match.group(1).strip()
+    return info
+
+def parse_gallery_page(content, manga_url, backend=None):
+    """解析漫畫頁面，一次取出標題、標籤、資訊欄、封面與下載頁面連結"""
+    found = extract(content, [TITLE_GROUP, DOWNLOAD_GROUP, TAG_GROUP, INFO_GROUP, THUMBNAIL_GROUP], backend)
+    return GalleryPage(
+        url=manga_url,
+        aid=extract_aid(manga_url),
+        title=clean_title(found['title'][0] if found['title'] else None, manga_url),
+        download_page_url=urljoin(manga_url, found['download'][0]) if found['download'] else None,
+        tags=[tag for tag in found['tags'] if tag],
+        thumbnail_url=urljoin(manga_url, found['thumbnail'][0]) if found['thumbnail'] else None,
+        **parse_gallery_info(found['info']),
+    )
+
+def parse_final_download_link(content, download_page_url, backend=None):
+    """從下載頁面取出最終下載連結"""
+    found = extract(content, [FINAL_GROUP], backend)['final']
+    return urljoin(download_page_url, found[0]) if found else None
+
+def parse_download_mirrors(content, download_page_url, backend=None):
+    """從下載頁面取出所有鏡像的下載連結 (去除重複)，原本優先使用的連結排在第一個"""
+    found = extract(content, [FINAL_GROUP, MIRROR_GROUP], backend)
+    links = [*found['final'][:1], *found['mirrors']]
+    return list(dict.fromkeys(urljoin(download_page_url, href) for href in links))
@@ -0,0 +1,291 @@
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from download_index import file_sha256
+from integrity import check_zip_file
+from metrics import format_bytes
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow 為選用套件，未安裝時只能重新打包成 CBZ，不能重新壓縮圖片
+    Image = None
+
+PILLOW_AVAILABLE = Image is not None
+
+IMAGE_FORMATS = ('webp', 'avif')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.avif')
+# 只重新壓縮這些格式 (其他格式已經是高效率編碼，或是動畫)
+RECOMPRESS_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+DEFAULT_QUALITY = 80
+# 小於此大小的圖片重新壓縮的效益不大，直接保留
+DEFAULT_MIN_RECOMPRESS_BYTES = 512 * 1024
+# 超過此大小的項目不送進行程池，直接串流複製 (限制每個項目佔用的記憶體)
+MAX_RECOMPRESS_BYTES = 64 * 1024 * 1024
+# 複製項目時每次讀取的大小
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def image_format_available(image_format):
+    """目前安裝的 Pillow 能否輸出指定格式"""
+    return PILLOW_AVAILABLE and features.check(image_format)
+
+def post_process_summary(options, workers):
+    """供日誌顯示的後處理設定"""
+    details = []
+    if options.cbz:
+        details.append("重新打包為 CBZ" + (" (保留原始 zip)" if options.keep_original else ""))
+    if options.image_format:
+        details.append(f"大於 {format_bytes(options.min_recompress_bytes)} 的 PNG/JPEG 轉為 "
+                       f"{options.image_format.upper()} (品質 {options.quality}, {workers} 個行程)")
+    return ', '.join(details)
+
+def cbz_path(filepath):
+    return os.path.splitext(filepath)[0] + '.cbz'
+
+def existing_archive(filepath):
+    """已下載的 zip 或轉換後的 cbz 存在時回傳其路徑，否則回傳 None"""
+    for path in (filepath, cbz_path(filepath)):
+        if os.path.exists(path):
+            return path
+    return None
+
+def natural_key(name):
+    """依檔名中的數字大小排序 (2.jpg 排在 10.jpg 之前)"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name.lower())]
+
+def recompress_image(data, image_format, quality):
+    """在子行程中重新壓縮單張圖片；無法解碼或沒有變小時回傳 None"""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            output = BytesIO()
+            image.save(output, format=image_format.upper(), quality=quality)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    result = output.getvalue()
+    return result if len(result) < len(data) else None
+
+@dataclass
+class PostProcessOptions:
+    """下載完成後的處理：重新打包成 CBZ (頁面依序改名) 及/或把大張的 PNG、JPEG 重新壓縮成 WebP/AVIF"""
+    cbz: bool = False
+    image_format: str = None
+    quality: int = DEFAULT_QUALITY
+    min_recompress_bytes: int = DEFAULT_MIN_RECOMPRESS_BYTES
+    keep_original: bool = False
+    workers: int = None
+
+class PostProcessReport:
+    """後處理統計 (可跨執行緒使用)"""
+    
+    def __init__(self):
+        self.archives = 0
+        self.failed = 0
+        self.pages = 0
+        self.recompressed = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self._lock = threading.Lock()
+    
+    def add(self, pages, recompressed, bytes_before, bytes_after):
+        with self._lock:
+            self.archives += 1
+            self.pages += pages
+            self.recompressed += recompressed
+            self.bytes_before += bytes_before
+            self.bytes_after += bytes_after
+    
+    def add_failure(self):
+        with self._lock:
+            self.failed += 1
+    
+    def summary_lines(self):
+        with self._lock:
+            if not self.archives and not self.failed:
+                return []
+            saved = self.bytes_before - self.bytes_after
+            ratio = saved / self.bytes_before * 100 if self.bytes_before else 0.0
+            return [
+                f"{self.archives} 個檔案、{self.pages} 頁 (重新壓縮 {self.recompressed} 頁), 失敗 {self.failed} 個",
+                f"{format_bytes(self.bytes_before)} → {format_bytes(self.bytes_after)} "
+                f"(節省 {format_bytes(saved)}, {ratio:.1f}%)",
+            ]
+
+class PostProcessor:
+    """下載完成的 zip 交給背景執行緒依序處理，不佔用下載執行緒或事件迴圈
+    
+    每個項目直接從原始 zip 串流讀出、寫入新的封存檔，不會解壓到磁碟。需要重新壓縮的圖片送進行程池，
+    所有 CPU 核心同時處理；同時送出的圖片最多為行程數的兩倍，記憶體用量不隨封存檔大小增加。
+    處理失敗時保留原始檔案。原始 zip 被取代或刪除時，下載索引 (index) 中的路徑與雜湊改為新的檔案。
+    """
+    
+    def __init__(self, options, on_log=None, manifest=None, index=None):
+        self.options = options
+        self.on_log = on_log or (lambda message: None)
+        self.manifest = manifest
+        self.index = index
+        self.report = PostProcessReport()
+        self.workers = options.workers or os.cpu_count() or 1
+        self.window = self.workers * 2
+        self.cancelled = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self._executor = None
+    
+    def start(self):
+        if self.options.image_format:
+            # spawn：GUI 與下載執行緒都在執行中，fork 出的子行程可能繼承被鎖住的鎖
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def submit(self, filepath, title, key=None, manga_url=None):
+        """排入一個下載完成的 zip (不會等待)；key 與 manga_url 為下載索引中的紀錄"""
+        self._queue.put((filepath, title, key, manga_url))
+    
+    def cancel(self):
+        """中止處理中的檔案 (保留原始檔案)，不再處理剩餘的檔案"""
+        self.cancelled = True
+    
+    def close(self, cancel=False):
+        """等待已排入的檔案處理完畢 (cancel 時只中止)，並關閉行程池；可重複呼叫"""
+        if cancel:
+            self.cancel()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None or self.cancelled:
+                return
+            filepath, title, key, manga_url = item
+            try:
+                target, sha256 = self.process_archive(filepath, title)
+                # 保留原始 zip 時索引仍指向原檔
+                kept_original = self.options.cbz and self.options.keep_original
+                if self.index is not None and key is not None and not kept_original:
+                    self.index.mark_done(key, manga_url, title, target, sha256)
+            except Exception as e:
+                if not self.cancelled:
+                    self.report.add_failure()
+                    self.on_log(f"⚠️ 後處理失敗，保留原始檔案: {title} - {str(e)}")
+    
+    def output_name(self, info, number, width, extension):
+        """新封存檔中的項目名稱：CBZ 的頁面依序編號，其他項目保留原名"""
+        if number is None:
+            return info.filename
+        if self.options.cbz:
+            return f"{number:0{width}d}{extension.lower()}"
+        return os.path.splitext(info.filename)[0] + extension
+    
+    def should_recompress(self, info, names):
+        """names 為新封存檔中已使用的項目名稱
+        
+        只重新壓縮時項目保留原名、只換副檔名，1.png 與 1.jpg 都會變成 1.webp；新名稱已被使用時保留原圖。
+        """
+        if not (self._executor is not None
+                and info.filename.lower().endswith(RECOMPRESS_EXTENSIONS)
+                and self.options.min_recompress_bytes <= info.file_size <= MAX_RECOMPRESS_BYTES):
+            return False
+        if self.options.cbz:
+            return True
+        name = os.path.splitext(info.filename)[0] + f".{self.options.image_format}"
+        if name in names:
+            return False
+        names.add(name)
+        return True
+    
+    def process_archive(self, filepath, title):
+        """轉換單一封存檔；CBZ 寫成同名的 .cbz，只重新壓縮時取代原本的 zip。回傳 (新檔案路徑, SHA-256)"""
+        target = cbz_path(filepath) if self.options.cbz else filepath
+        temp_path = f"{target}.repack"
+        bytes_before = os.path.getsize(filepath)
+        recompressed = 0
+        
+        try:
+            with zipfile.ZipFile(filepath) as source, zipfile.ZipFile(temp_path, 'w') as output:
+                entries = [info for info in source.infolist() if not info.is_dir()]
+                pages = sorted((info for info in entries if info.filename.lower().endswith(IMAGE_EXTENSIONS)),
+                               key=lambda info: natural_key(info.filename))
+                numbers = {info.filename: number for number, info in enumerate(pages, 1)}
+                width = max(3, len(str(len(pages))))
+                # 非圖片項目 (如 ComicInfo.xml) 排在頁面之後
+                ordered = pages + [info for info in entries if info.filename not in numbers]
+                names = {info.filename for info in entries}
+                
+                # 依序寫出，只有等待中的圖片佔用記憶體
+                pending = deque()
+                for info in ordered:
+                    if self.cancelled:
+                        raise InterruptedError("已取消")
+                    if self.should_recompress(info, names):
+                        data = source.read(info)
+                        future = self._executor.submit(recompress_image, data, self.options.image_format,
+                                                       self.options.quality)
+                        pending.append((info, data, future))
+                    else:
+                        pending.append((info, None, None))
+                    while len(pending) > self.window or (pending and pending[0][2] is None):
+                        recompressed += self.write_entry(source, output, pending.popleft(), numbers, width)
+                while pending:
+                    recompressed += self.write_entry(source, output, pending.popleft(), numbers, width)
+            
+            check_zip_file(temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        if self.options.cbz and not self.options.keep_original:
+            os.remove(filepath)
+        bytes_after = os.path.getsize(target)
+        sha256 = file_sha256(target)
+        self.report.add(len(numbers), recompressed, bytes_before, bytes_after)
+        if self.manifest is not None:
+            self.manifest.record(os.path.basename(target), 'ok', source='postprocess', size=bytes_after,
+                                 sha256=sha256, entries=len(entries))
+        self.on_log(f"🗜️ 後處理完成: {title} ({format_bytes(bytes_before)} → {format_bytes(bytes_after)}, "
+                    f"重新壓縮 {recompressed} 頁)")
+        return target, sha256
+    
+    def write_entry(self, source, output, item, numbers, width):
+        """寫出一個項目；回傳 1 表示使用了重新壓縮的內容"""
+        info, data, future = item
+        number = numbers.get(info.filename)
+        result = future.result() if future is not None else None
+        if result is not None:
+            extension = f".{self.options.image_format}"
+        else:
+            extension = os.path.splitext(info.filename)[1]
+        # 圖片本身已經壓縮過，不再壓縮
+        compress_type = zipfile.ZIP_STORED if number is not None else zipfile.ZIP_DEFLATED
+        entry = zipfile.ZipInfo(self.output_name(info, number, width, extension), date_time=info.date_time)
+        entry.compress_type = compress_type
+        
+        if result is not None:
+            output.writestr(entry, result)
+            return 1
+        if data is not None:
+            output.writestr(entry, data)
+            return 0
+        entry.file_size = info.file_size
+        force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+        with source.open(info) as src, output.open(entry, 'w', force_zip64=force_zip64) as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        return 0
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# 等待時每隔多久檢查一次是否已取消
+POLL_INTERVAL = 0.2
+
+# 視為「伺服器要求降速」的狀態碼
+THROTTLE_STATUS_CODES = (429, 503)
+
+class RequestCancelled(Exception):
+    """等待請求額度時被取消"""
+
+@dataclass
+class HostPolicy:
+    """單一主機的限速參數"""
+    initial_rate: float = 1.0        # 每秒請求數
+    min_rate: float = 0.2
+    max_rate: float = 10.0
+    burst: float = 3.0               # 令牌桶容量
+    initial_concurrency: int = 2
+    max_concurrency: int = 8
+    rate_increase: float = 0.2       # 每次成功回應增加的速率 (加法增加)
+    backoff_factor: float = 0.5      # 被限速時的縮減倍率 (乘法減少)
+
+# 網頁主機與檔案鏡像主機的預設參數
+PAGE_POLICY = HostPolicy(initial_rate=2.0, rate_increase=0.5)
+FILE_POLICY = HostPolicy(initial_rate=0.5, max_rate=4.0, burst=1.0,
+                         initial_concurrency=2, max_concurrency=6)
+KIND_LABELS = {'page': '網頁', 'file': '檔案'}
+
+def parse_retry_after(value):
+    """解析 Retry-After 標頭 (秒數或 HTTP 日期)，無法解析時回傳 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HostLimiter:
+    """單一主機 (網頁或檔案請求) 的令牌桶 + AIMD 並發控制"""
+    
+    def __init__(self, host, policy, kind='page'):
+        self.host = host
+        self.kind = kind
+        self.policy = policy
+        self.rate = policy.initial_rate
+        self.concurrency = policy.initial_concurrency
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.success_streak = 0
+        self.last_refill = time.monotonic()
+        self.request_count = 0
+        self.throttled_count = 0
+        self._cond = threading.Condition()
+    
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.tokens = min(self.policy.burst, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+    
+    def _try_acquire(self):
+        """嘗試取得額度：成功回傳 None，否則回傳建議的等待秒數 (需持有鎖)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= self.concurrency:
+            return POLL_INTERVAL
+        if self.tokens < 1.0:
+            return (1.0 - self.tokens) / self.rate
+        
+        self.tokens -= 1.0
+        self.in_flight += 1
+        self.request_count += 1
+        return None
+    
+    def acquire(self, is_cancelled=None):
+        """等待取得一個請求額度 (速率令牌 + 並發名額)"""
+        with self._cond:
+            while True:
+                if is_cancelled is not None and is_cancelled():
+                    raise RequestCancelled(self.host)
+                
+                wait = self._try_acquire()
+                if wait is None:
+                    return
+                self._cond.wait(min(wait, POLL_INTERVAL))
+    
+    async def acquire_async(self):
+        """acquire 的 asyncio 版本：等待期間不阻塞事件迴圈，可被 task.cancel() 中斷"""
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+            if wait is None:
+                return
+            await asyncio.sleep(min(wait, POLL_INTERVAL))
+    
+    def release(self, status_code=None, retry_after=None, error=False):
+        """歸還請求額度，並依回應結果調整速率與並發數"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            
+            # Retry-After 只在 429/503 時代表要求降速 (其他回應附帶的 Retry-After 不予理會)
+            if status_code in THROTTLE_STATUS_CODES:
+                self._back_off(parse_retry_after(retry_after))
+            elif error or (status_code is not None and status_code >= 500):
+                self.success_streak = 0
+            elif status_code is not None:
+                self._grow()
+            
+            self._cond.notify_all()
+    
+    def _grow(self):
+        policy = self.policy
+        self.rate = min(policy.max_rate, self.rate + policy.rate_increase)
+        self.success_streak += 1
+        # 連續成功的次數達到目前並發數時，並發數 +1
+        if self.success_streak >= self.concurrency:
+            self.concurrency = min(policy.max_concurrency, self.concurrency + 1)
+            self.success_streak = 0
+    
+    def _back_off(self, retry_after):
+        policy = self.policy
+        self.rate = max(policy.min_rate, self.rate * policy.backoff_factor)
+        self.concurrency = max(1, int(self.concurrency * policy.backoff_factor))
+        self.success_streak = 0
+        self.throttled_count += 1
+        self.tokens = 0.0
+        
+        delay = retry_after if retry_after is not None else 1.0 / self.rate
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+    
+    def snapshot(self):
+        with self._cond:
+            return {
+                'host': self.host,
+                'kind': self.kind,
+                'rate': round(self.rate, 2),
+                'concurrency': self.concurrency,
+                'in_flight': self.in_flight,
+                'requests': self.request_count,
+                'throttled': self.throttled_count,
+            }
+
+class RateLimiter:
+    """依主機分別追蹤的限速器集合：同一個主機的網頁與檔案請求各自使用自己的參數與令牌桶"""
+    
+    def __init__(self, page_policy=PAGE_POLICY, file_policy=FILE_POLICY):
+        self.policies = {'page': page_policy, 'file': file_policy}
+        self._hosts = {}
+        self._lock = threading.Lock()
+    
+    def for_url(self, url, kind='page'):
+        """取得網址所屬主機在這個類別 (page/file) 的限速器"""
+        host = urlparse(url).netloc
+        if kind not in self.policies:
+            kind = 'page'
+        with self._lock:
+            limiter = self._hosts.get((host, kind))
+            if limiter is None:
+                limiter = HostLimiter(host, self.policies[kind], kind)
+                self._hosts[host, kind] = limiter
+            return limiter
+    
+    def snapshot(self):
+        with self._lock:
+            limiters = list(self._hosts.values())
+        return [limiter.snapshot() for limiter in limiters]
+
+class BandwidthLimiter:
+    """所有下載連線共用的頻寬上限 (位元組/秒)：每收到一個區塊就預約傳輸時間，超前時等待"""
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate / 4  # 允許累積的額度 (秒數 × 速率)
+        self.next_time = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, size):
+        """預約 size 位元組的傳輸時間，回傳需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            # 閒置期間最多累積 burst 的額度
+            self.next_time = max(self.next_time, now - self.burst / self.rate) + size / self.rate
+            return max(0.0, self.next_time - now)
+    
+    def consume(self, size):
+        """等待到可以再傳輸 size 位元組為止，回傳等待的秒數"""
+        delay = self.reserve(size)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    async def consume_async(self, size):
+        delay = self.reserve(size)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
@@ -0,0 +1,74 @@
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+# .part 檔旁邊的續傳資訊 (JSON)：
+# url, etag, last_modified, total_size, bytes_written，分段下載時另有 segments；
+# preallocated 表示 .part 檔預先配置了完整大小，已下載的位元組數以 bytes_written 為準
+
+def parse_content_range_total(content_range):
+    """從 Content-Range 標頭 (如 bytes 0-99/1000) 取出檔案總大小"""
+    match = re.search(r'/(\d+)\s*$', content_range or '')
+    return int(match.group(1)) if match else None
+
+def read_resume_state(part_path):
+    """讀取 .part 檔旁的續傳資訊，沒有或無法解析時回傳空的 dict"""
+    try:
+        with open(f"{part_path}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_resume_state(part_path, download_url, mirror_urls=()):
+    """讀取 .part 檔的續傳資訊，回傳 (可續傳的位移, 紀錄內容)
+    
+    mirror_urls 為同一個檔案的其他鏡像：.part 由其中之一下載時也可以續傳。
+    """
+    if not os.path.exists(part_path):
+        return 0, {}
+    state = read_resume_state(part_path)
+    
+    # 下載網址改變且沒有 ETag/Last-Modified 可驗證時，不冒險續傳
+    has_validator = state.get('etag') or state.get('last_modified')
+    if state.get('url') != download_url and state.get('url') not in mirror_urls and not has_validator:
+        return 0, {}
+    if state.get('preallocated') and not state.get('segments'):
+        # 程式當掉時來不及把預先配置的空間截斷：截斷到紀錄中的已寫入大小
+        offset = min(os.path.getsize(part_path), state.get('bytes_written') or 0)
+        with open(part_path, 'r+b') as f:
+            f.truncate(offset)
+        return offset, state
+    return os.path.getsize(part_path), state
+
+def resume_validator(state, download_url):
+    """續傳請求的 If-Range 值；換到其他主機的鏡像時 ETag 不通用，改由呼叫端比對 Content-Range 的總大小"""
+    if urlparse(state.get('url') or '').netloc != urlparse(download_url).netloc:
+        return None
+    return state.get('etag') or state.get('last_modified')
+
+def partial_size(part_path):
+    """.part 檔中已下載的位元組數 (沒有時為 0)
+    
+    預先配置或分段下載的 .part 檔從一開始就是完整大小，改以續傳資訊中的進度為準。
+    """
+    if not os.path.exists(part_path):
+        return 0
+    size = os.path.getsize(part_path)
+    state = read_resume_state(part_path)
+    if state.get('segments'):
+        return min(size, sum(segment[2] for segment in state['segments']))
+    if state.get('preallocated'):
+        return min(size, state.get('bytes_written') or 0)
+    return size
+
+def save_resume_state(part_path, state):
+    """寫入 .part 檔旁的續傳資訊"""
+    with open(f"{part_path}.json", 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+def discard_partial(part_path):
+    """刪除 .part 檔與續傳資訊"""
+    for path in (part_path, f"{part_path}.json"):
+        if os.path.exists(path):
+            os.remove(path)
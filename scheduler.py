@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import threading
+
+from metrics import format_bytes
+from rate_limiter import POLL_INTERVAL
+
+# 下載順序：smallest = 剩餘大小最小的先下載；fair = 各列表頁輪流；fifo = 依解析完成的順序
+ORDERS = ('smallest', 'fair', 'fifo')
+DEFAULT_ORDER = 'smallest'
+
+ORDER_LABELS = {
+    'smallest': '小檔優先',
+    'fair': '各頁輪流',
+    'fifo': '依列表順序',
+}
+
+# 同時傳輸中的檔案大小合計上限 (位元組)；None 表示只受下載執行緒數限制
+DEFAULT_MAX_INFLIGHT_BYTES = 512 * 1024 * 1024
+
+def schedule_summary(order, max_inflight_bytes, prefer_tags=(), bandwidth_limit=None):
+    """供日誌顯示的下載排程設定"""
+    details = [ORDER_LABELS[order]]
+    if prefer_tags:
+        details.append(f"優先標籤 {', '.join(prefer_tags)}")
+    if max_inflight_bytes is not None:
+        details.append(f"傳輸中上限 {format_bytes(max_inflight_bytes)}")
+    if bandwidth_limit:
+        details.append(f"頻寬上限 {format_bytes(bandwidth_limit)}/s")
+    return ', '.join(details)
+
+class JobQueue:
+    """待下載工作的排序與傳輸中位元組計算 (不含等待機制，呼叫端需自行加鎖)
+    
+    有偏好標籤的工作一律排在前面。傳輸中的大小已達上限時不再交出工作，
+    但沒有任何傳輸時一定交出，避免超過上限的大檔永遠等不到。
+    大小未知的工作以目前已知大小的平均值估算。
+    """
+    
+    def __init__(self, order=DEFAULT_ORDER, max_inflight_bytes=DEFAULT_MAX_INFLIGHT_BYTES, prefer_tags=()):
+        if order not in ORDERS:
+            raise ValueError(f"不支援的下載順序: {order}")
+        self.order = order
+        self.max_inflight_bytes = max_inflight_bytes
+        self.prefer_tags = set(prefer_tags)
+        self.inflight_bytes = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._group_turns = {}
+        self._costs = {}
+        self._known_count = 0
+        self._known_bytes = 0
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    @property
+    def inflight(self):
+        return len(self._costs)
+    
+    def estimate(self, job):
+        if job.size is not None:
+            return job.size
+        return self._known_bytes // self._known_count if self._known_count else 0
+    
+    def _sort_key(self, job):
+        priority = 0 if self.prefer_tags.intersection(job.tags or ()) else 1
+        seq = next(self._seq)
+        if self.order == 'smallest':
+            return (priority, self.estimate(job), seq)
+        if self.order == 'fair':
+            # 每個列表頁的第 n 個工作排在所有頁的第 n + 1 個工作之前
+            turn = self._group_turns.get(job.group, 0)
+            self._group_turns[job.group] = turn + 1
+            return (priority, turn, seq)
+        return (priority, seq)
+    
+    def push(self, job):
+        if job.size is not None:
+            self._known_count += 1
+            self._known_bytes += job.size
+        heapq.heappush(self._heap, (self._sort_key(job), job))
+    
+    def pop(self):
+        """取出下一個可以開始的工作，沒有或已達傳輸中上限時回傳 None"""
+        if not self._heap:
+            return None
+        job = self._heap[0][1]
+        cost = self.estimate(job)
+        if (self._costs and self.max_inflight_bytes is not None
+                and self.inflight_bytes + cost > self.max_inflight_bytes):
+            return None
+        heapq.heappop(self._heap)
+        self._costs[id(job)] = cost
+        self.inflight_bytes += cost
+        return job
+    
+    def release(self, job):
+        """工作結束 (不論成功與否)，歸還傳輸中的額度"""
+        self.inflight_bytes -= self._costs.pop(id(job), 0)
+
+class DownloadScheduler:
+    """執行緒版下載排程：解析階段 put()，下載執行緒 get() 取得下一個工作、結束後 done()
+    
+    最多保留 capacity 個待下載工作 (滿了就讓解析階段等待)，排序只在這個範圍內進行。
+    """
+    
+    def __init__(self, capacity, **options):
+        self.jobs = JobQueue(**options)
+        self.capacity = capacity
+        self.closed = False
+        self._cond = threading.Condition()
+    
+    def put(self, job, is_cancelled):
+        """加入工作；已滿時等待，取消時回傳 False"""
+        with self._cond:
+            while len(self.jobs) >= self.capacity:
+                if is_cancelled():
+                    return False
+                self._cond.wait(POLL_INTERVAL)
+            self.jobs.push(job)
+            self._cond.notify_all()
+            return True
+    
+    def get(self, is_cancelled):
+        """取得下一個工作；排程已關閉且沒有剩餘工作、或被取消時回傳 None"""
+        with self._cond:
+            while not is_cancelled():
+                job = self.jobs.pop()
+                if job is not None:
+                    self._cond.notify_all()
+                    return job
+                if self.closed and not len(self.jobs):
+                    return None
+                self._cond.wait(POLL_INTERVAL)
+            return None
+    
+    def done(self, job):
+        with self._cond:
+            self.jobs.release(job)
+            self._cond.notify_all()
+    
+    def close(self):
+        """不會再有新的工作 (下載執行緒取完剩餘工作後結束)"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class AsyncDownloadScheduler:
+    """DownloadScheduler 的 asyncio 版本 (只能在同一個事件迴圈中使用)"""
+    
+    def __init__(self, capacity, **options):
+        self.jobs = JobQueue(**options)
+        self.capacity = capacity
+        self.closed = False
+        self._cond = asyncio.Condition()
+    
+    async def put(self, job):
+        async with self._cond:
+            await self._cond.wait_for(lambda: len(self.jobs) < self.capacity)
+            self.jobs.push(job)
+            self._cond.notify_all()
+    
+    async def get(self):
+        async with self._cond:
+            while True:
+                job = self.jobs.pop()
+                if job is not None:
+                    self._cond.notify_all()
+                    return job
+                if self.closed and not len(self.jobs):
+                    return None
+                await self._cond.wait()
+    
+    async def done(self, job):
+        async with self._cond:
+            self.jobs.release(job)
+            self._cond.notify_all()
+    
+    async def close(self):
+        async with self._cond:
+            self.closed = True
+            self._cond.notify_all()
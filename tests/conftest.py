@@ -0,0 +1,58 @@
+import re
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+
+def make_zip(pages=8, page_size=4096):
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+        for number in range(pages):
+            archive.writestr(f"{number + 1}.jpg", bytes([number]) * page_size)
+    return output.getvalue()
+
+class ZipHandler(BaseHTTPRequestHandler):
+    """提供一個 zip 檔，支援 Range 請求；範圍超出檔案大小時回傳 416"""
+    
+    def do_GET(self):
+        data = self.server.data
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        self.server.requests.append(self.headers.get('Range'))
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            end = int(match.group(2)) if match.group(2) else len(data) - 1
+            body = data[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def zip_server():
+    """本機 HTTP 伺服器：server.url 為 zip 檔網址，server.requests 記錄每個請求的 Range 標頭"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ZipHandler)
+    server.data = make_zip()
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_port}/files/1.zip"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,47 @@
+import sqlite3
+
+import http_cache
+from http_cache import HttpCache
+
+def used_at(path, url):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT used_at FROM pages WHERE url = ?", (url,)).fetchone()[0]
+
+def test_lookup_batches_used_at_until_close(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = HttpCache(path)
+    cache.store('http://a/1', b'x' * 10, {})
+    stored = used_at(path, 'http://a/1')
+    
+    assert cache.lookup('http://a/1').body == b'x' * 10
+    # 使用時間還沒寫入資料庫
+    assert used_at(path, 'http://a/1') == stored
+    cache.close()
+    assert used_at(path, 'http://a/1') > stored
+
+def test_lookup_flushes_used_at_after_batch_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, 'USED_AT_BATCH_SIZE', 2)
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = HttpCache(path)
+    cache.store('http://a/1', b'1', {})
+    cache.store('http://a/2', b'2', {})
+    stored = used_at(path, 'http://a/1')
+    cache.lookup('http://a/1')
+    cache.lookup('http://a/2')
+    assert used_at(path, 'http://a/1') > stored
+    cache.close()
+
+def test_eviction_uses_batched_used_at(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), max_bytes=25)
+    cache.store('http://a/1', b'1' * 10, {})
+    cache.store('http://a/2', b'2' * 10, {})
+    # 1 最近用過，超過上限時淘汰的是 2
+    cache.lookup('http://a/1')
+    cache.store('http://a/3', b'3' * 10, {})
+    assert cache.lookup('http://a/1') is not None
+    assert cache.lookup('http://a/2') is None
+    cache.close()
+
+def test_download_pages_are_always_revalidated():
+    assert 'listing' in http_cache.REVALIDATE_KINDS
+    assert 'download_page' in http_cache.REVALIDATE_KINDS
@@ -0,0 +1,44 @@
+import struct
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from integrity import (ZIP64_END_LOCATOR_SIZE, ZIP_END_RECORD, ZIP_END_RECORD_FORMAT, IntegrityError, ZipHeadCheck,
+                       check_zip_signature, check_zip_structure)
+
+def read_from(data):
+    def read_at(offset, length):
+        # 和檔案的 seek 一樣，不接受負的位置
+        assert offset >= 0
+        return data[offset:offset + length]
+    return read_at
+
+def test_head_check_waits_for_full_signature():
+    check = ZipHeadCheck()
+    # 第一塊只有 1 個位元組，不能當成錯誤
+    check.feed(b'P')
+    check.feed(memoryview(b'K'))
+    assert not check.checked
+    check.feed(b'\x03\x04rest')
+    assert check.checked
+
+def test_head_check_rejects_html_split_across_chunks():
+    check = ZipHeadCheck()
+    check.feed(b'  ')
+    with pytest.raises(IntegrityError, match='HTML'):
+        check.feed(b'<html>')
+
+def test_empty_zip_signature():
+    output = BytesIO()
+    zipfile.ZipFile(output, 'w').close()
+    data = output.getvalue()
+    check_zip_signature(data[:4])
+    assert check_zip_structure(read_from(data), len(data)) == 0
+
+def test_zip64_marker_near_start_does_not_read_before_file():
+    # 中央目錄結尾前面不足一個 ZIP64 定位記錄的長度
+    data = b'PK\x03\x04' + struct.pack(ZIP_END_RECORD_FORMAT, ZIP_END_RECORD, 0, 0, 0xFFFF, 0xFFFF, 0, 0xFFFFFFFF, 0)
+    assert len(data) - 22 < ZIP64_END_LOCATOR_SIZE
+    with pytest.raises(IntegrityError, match='ZIP64'):
+        check_zip_structure(read_from(data), len(data))
@@ -0,0 +1,81 @@
+import pytest
+
+import job_journal
+from job_journal import (RETRY_BASE_DELAY, RETRY_MAX_DELAY, STAGE_DEAD, STAGE_DISCOVERED, STAGE_DONE, STAGE_FAILED,
+                         STAGE_RESOLVED, JobJournal, retry_delay)
+
+URL = 'https://example.com/photos-index-aid-1.html'
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / 'journal.sqlite3'), 'search|folder', max_attempts=3)
+    journal.record_listing(1, [URL], last=False)
+    yield journal
+    journal.close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可以手動前進的 time.time()"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(job_journal.time, 'time', lambda: now[0])
+    return now
+
+def test_retry_delay_doubles_up_to_the_cap():
+    assert [retry_delay(attempt) for attempt in (1, 2, 3)] == [RETRY_BASE_DELAY, RETRY_BASE_DELAY * 2,
+                                                               RETRY_BASE_DELAY * 4]
+    assert retry_delay(50) == RETRY_MAX_DELAY
+
+def test_failed_job_is_due_after_backoff(journal, clock):
+    record = journal.mark_failed(URL, 'timeout', offset=123)
+    assert record.stage == STAGE_FAILED
+    assert record.attempts == 1
+    assert record.offset == 123
+    assert record.next_attempt_at == clock[0] + RETRY_BASE_DELAY
+    
+    assert journal.take_due() == []
+    clock[0] += RETRY_BASE_DELAY
+    due = journal.take_due()
+    assert [entry.manga_url for entry in due] == [URL]
+    # 還沒有下載連結，重新從解析階段開始
+    assert due[0].stage == STAGE_DISCOVERED
+    assert journal.take_due() == []
+
+def test_resolved_job_keeps_its_download_links_on_retry(journal, clock):
+    journal.mark_resolved(URL, 'Title', '/tmp/Title.zip', ['https://a/1.zip', 'https://b/1.zip'])
+    journal.mark_failed(URL, 'timeout')
+    clock[0] += RETRY_BASE_DELAY
+    [record] = journal.take_due()
+    assert record.stage == STAGE_RESOLVED
+    assert record.download_urls == ['https://a/1.zip', 'https://b/1.zip']
+
+def test_job_moves_to_dead_letters_after_max_attempts(journal, clock):
+    for attempt in range(1, 3):
+        assert journal.mark_failed(URL, f'error {attempt}').stage == STAGE_FAILED
+        clock[0] += retry_delay(attempt)
+        journal.take_due()
+    record = journal.mark_failed(URL, 'error 3')
+    assert record.stage == STAGE_DEAD
+    assert record.attempts == 3
+    clock[0] += RETRY_MAX_DELAY
+    assert journal.take_due() == []
+    assert [(entry.manga_url, entry.last_error) for entry in journal.dead_letters()] == [(URL, 'error 3')]
+
+def test_revive_dead_and_finish_keeps_dead_letters(journal, clock):
+    other = 'https://example.com/photos-index-aid-2.html'
+    journal.record_listing(2, [other], last=True)
+    for _ in range(3):
+        journal.mark_failed(URL, 'gone')
+    journal.mark_done(other)
+    
+    journal.finish()
+    assert [record.stage for record in journal.load()] == [STAGE_DEAD]
+    assert journal.revive_dead() == 1
+    [record] = journal.take_due()
+    assert record.attempts == 0
+    assert journal.dead_letters() == []
+
+def test_unscanned_pages_stop_at_the_last_page(journal):
+    journal.record_listing(3, [], last=True)
+    assert journal.unscanned_pages(1, 10) == [2]
+    journal.mark_done(URL)
+    assert [record.stage for record in journal.load()] == [STAGE_DONE]
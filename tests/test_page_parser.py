@@ -0,0 +1,79 @@
+import os
+import re
+
+import pytest
+
+from job_journal import journal_run_key
+from page_parser import available_backends, listing_page_url, parse_listing_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+SEARCH_URL = 'https://www.wnacg.com/search/index.php?q=test&syn=yes&f=_all&s=create_time_DESC&p=1'
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture(params=available_backends())
+def backend(request):
+    return request.param
+
+def test_real_listing_pagination(backend):
+    listing = parse_listing_page(read_fixture('listing.html'), SEARCH_URL, backend)
+    assert len(listing.links) == 24
+    # 搜尋結果的分頁連結以 &p=N 表示頁碼
+    assert listing.page_numbers == list(range(1, 11))
+    assert listing.has_next
+    assert not listing.is_last()
+
+def test_real_listing_last_page(backend):
+    # 去掉「後頁」連結，模擬搜尋結果的最後一頁
+    content = re.sub(r'<span class="next">.*?</span>', '', read_fixture('listing.html'))
+    listing = parse_listing_page(content, SEARCH_URL, backend)
+    assert listing.page_numbers
+    assert not listing.has_next
+    assert listing.is_last()
+
+@pytest.mark.parametrize('href, number', [
+    ('/albums-index-page-3-sname-test.html', 3),
+    ('/albums/index.php?page=4', 4),
+    ('/search/index.php?q=test&p=5', 5),
+])
+def test_page_number_formats(backend, href, number):
+    content = (f'<div class="paginator"><a href="{href}">{number}</a>'
+               f'<span class="next"><a href="{href}">後頁&gt;</a></span></div>')
+    listing = parse_listing_page(content, SEARCH_URL, backend)
+    assert listing.page_numbers == [number]
+    assert listing.has_next
+
+def test_listing_without_paginator_is_not_last(backend):
+    content = '<div class="pic_box"><a href="/photos-index-aid-1.html">1</a></div>'
+    listing = parse_listing_page(content, SEARCH_URL, backend)
+    assert listing.links == ['https://www.wnacg.com/photos-index-aid-1.html']
+    # 沒有分頁列時無法判斷，由空白頁或重複頁停止掃描
+    assert not listing.is_last()
+
+def test_xml_declaration_is_not_an_empty_page(backend):
+    # lxml 不接受帶有編碼宣告的 str，解析失敗時不能把列表頁當成沒有結果
+    content = '<?xml version="1.0" encoding="utf-8"?>\n' + read_fixture('listing.html')
+    for document in (content, content.encode('utf-8')):
+        listing = parse_listing_page(document, SEARCH_URL, backend)
+        assert len(listing.links) == 24
+        assert listing.has_next
+
+@pytest.mark.parametrize('base_url, expected', [
+    # 搜尋結果以 &p=N 分頁
+    ('https://www.wnacg.com/search/index.php?q=test&syn=yes&p=1',
+     'https://www.wnacg.com/search/index.php?q=test&syn=yes&p=2'),
+    ('https://www.wnacg.com/search/index.php?q=test', 'https://www.wnacg.com/search/index.php?q=test&p=2'),
+    ('https://www.wnacg.com/albums-index-page-1-sname-test.html',
+     'https://www.wnacg.com/albums-index-page-2-sname-test.html'),
+    ('https://www.wnacg.com/albums/index.php?page=1&sort=new', 'https://www.wnacg.com/albums/index.php?page=2&sort=new'),
+    ('https://www.wnacg.com/albums.html', 'https://www.wnacg.com/albums.html?page=2'),
+])
+def test_listing_page_url(base_url, expected):
+    assert listing_page_url(base_url, 2) == expected
+
+def test_journal_run_key_ignores_page_number(tmp_path):
+    first = journal_run_key('https://www.wnacg.com/search/index.php?q=test&p=1', str(tmp_path))
+    assert first == journal_run_key('https://www.wnacg.com/search/index.php?q=test&p=7', str(tmp_path))
+    assert first != journal_run_key('https://www.wnacg.com/search/index.php?q=other&p=1', str(tmp_path))
@@ -0,0 +1,55 @@
+import os
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from download_index import DownloadIndex, file_sha256
+from postprocess import PostProcessOptions, PostProcessor, image_format_available
+
+def noisy_image(image_format):
+    from PIL import Image
+    image = Image.effect_noise((256, 256), 64).convert('RGB')
+    output = BytesIO()
+    # 最高品質的 JPEG 與 PNG 重新壓縮成 WebP 後都會變小
+    image.save(output, format=image_format, quality=100)
+    return output.getvalue()
+
+def write_zip(path, entries):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+
+@pytest.mark.skipif(not image_format_available('webp'), reason='需要支援 WebP 的 Pillow')
+def test_recompress_keeps_entry_names_unique(tmp_path):
+    path = str(tmp_path / 'a.zip')
+    write_zip(path, {'1.png': noisy_image('PNG'), '1.jpg': noisy_image('JPEG'), '2.webp': b'w',
+                     '2.png': noisy_image('PNG')})
+    processor = PostProcessor(PostProcessOptions(image_format='webp', min_recompress_bytes=0, workers=1))
+    processor.start()
+    try:
+        processor.process_archive(path, 'a')
+    finally:
+        processor.close()
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+    assert len(names) == len(set(names)) == 4
+    # 1.jpg 先轉成 1.webp，1.png 與 2.png 的新名稱已被使用，保留原圖
+    assert names == ['1.webp', '1.png', '2.png', '2.webp']
+
+def test_cbz_updates_download_index(tmp_path):
+    path = str(tmp_path / 'a.zip')
+    write_zip(path, {'2.jpg': b'2', '1.jpg': b'1'})
+    index = DownloadIndex(':memory:')
+    index.mark_done('aid:1', 'http://a/1', 'a', path, file_sha256(path))
+    processor = PostProcessor(PostProcessOptions(cbz=True), index=index)
+    processor.start()
+    processor.submit(path, 'a', 'aid:1', 'http://a/1')
+    processor.close()
+    
+    row = index.get('aid:1')
+    assert not os.path.exists(path)
+    assert row['filepath'] == str(tmp_path / 'a.cbz')
+    assert row['sha256'] == file_sha256(row['filepath'])
+    assert row['size'] == os.path.getsize(row['filepath'])
+    index.close()
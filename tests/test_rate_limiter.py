@@ -0,0 +1,62 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from rate_limiter import FILE_POLICY, PAGE_POLICY, HostLimiter, HostPolicy, RateLimiter, parse_retry_after
+
+POLICY = HostPolicy(initial_rate=4.0, min_rate=0.5, max_rate=10.0, initial_concurrency=4, max_concurrency=8)
+
+def test_parse_retry_after_seconds_and_date():
+    assert parse_retry_after('30') == 30.0
+    assert parse_retry_after('-5') == 0.0
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_throttle_status_backs_off_and_honours_retry_after(status):
+    limiter = HostLimiter('example.com', POLICY)
+    limiter.acquire()
+    limiter.release(status, '30')
+    assert limiter.rate == POLICY.initial_rate * POLICY.backoff_factor
+    assert limiter.concurrency == 2
+    assert limiter.throttled_count == 1
+    assert limiter.blocked_until - time.monotonic() > 25
+
+@pytest.mark.parametrize('status', [200, 304])
+def test_retry_after_on_success_is_ignored(status):
+    limiter = HostLimiter('example.com', POLICY)
+    limiter.acquire()
+    limiter.release(status, '30')
+    assert limiter.rate == POLICY.initial_rate + POLICY.rate_increase
+    assert limiter.throttled_count == 0
+    assert limiter.blocked_until == 0.0
+
+def test_server_error_without_throttle_keeps_rate():
+    limiter = HostLimiter('example.com', POLICY)
+    limiter.acquire()
+    limiter.release(500)
+    limiter.acquire()
+    limiter.release(error=True)
+    assert limiter.rate == POLICY.initial_rate
+    assert limiter.throttled_count == 0
+
+def test_concurrency_grows_after_a_streak_of_successes():
+    limiter = HostLimiter('example.com', POLICY)
+    for _ in range(POLICY.initial_concurrency):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.concurrency == POLICY.initial_concurrency + 1
+
+def test_pages_and_files_on_the_same_host_have_separate_limiters():
+    limiter = RateLimiter()
+    # 先請求檔案，網頁仍使用網頁的參數
+    files = limiter.for_url('https://img.example.com/1.zip', 'file')
+    pages = limiter.for_url('https://img.example.com/photos-index-aid-1.html', 'page')
+    assert files is not pages
+    assert files.policy is FILE_POLICY
+    assert pages.policy is PAGE_POLICY
+    assert limiter.for_url('https://img.example.com/2.zip', 'file') is files
+    assert limiter.for_url('https://img.example.com/other', 'unknown') is pages
+    assert sorted(entry['kind'] for entry in limiter.snapshot()) == ['file', 'page']
@@ -0,0 +1,119 @@
+import asyncio
+import os
+
+import pytest
+
+from async_engine import AsyncDownloadEngine
+from downloader_core import MangaDownloader
+from resume_state import (load_resume_state, parse_content_range_total, partial_size, read_resume_state,
+                          save_resume_state)
+
+ENGINE_OPTIONS = dict(cache_path=None, mirror_stats_path=None, journal_path=None, catalog_path=None)
+
+@pytest.mark.parametrize('header, total', [
+    ('bytes 0-99/1000', 1000),
+    ('bytes */4096', 4096),
+    ('bytes 0-99/*', None),
+    (None, None),
+])
+def test_parse_content_range_total(header, total):
+    assert parse_content_range_total(header) == total
+
+def test_load_resume_state_truncates_preallocated_part(tmp_path):
+    part_path = str(tmp_path / 'a.zip.part')
+    with open(part_path, 'wb') as f:
+        f.write(b'x' * 1000)
+    save_resume_state(part_path, {'url': 'http://a/1.zip', 'preallocated': True, 'bytes_written': 300})
+    offset, state = load_resume_state(part_path, 'http://a/1.zip')
+    assert offset == 300
+    assert os.path.getsize(part_path) == 300
+    assert state['bytes_written'] == 300
+
+def test_load_resume_state_rejects_other_url_without_validator(tmp_path):
+    part_path = str(tmp_path / 'a.zip.part')
+    with open(part_path, 'wb') as f:
+        f.write(b'x' * 100)
+    save_resume_state(part_path, {'url': 'http://a/1.zip'})
+    assert load_resume_state(part_path, 'http://b/1.zip') == (0, {})
+    # 其他鏡像下載的 .part 可以續傳
+    assert load_resume_state(part_path, 'http://b/1.zip', ['http://a/1.zip'])[0] == 100
+
+def test_partial_size(tmp_path):
+    part_path = str(tmp_path / 'a.zip.part')
+    assert partial_size(part_path) == 0
+    with open(part_path, 'wb') as f:
+        f.write(b'\0' * 1000)
+    assert partial_size(part_path) == 1000
+    # 預先配置或分段下載的 .part 是完整大小，以續傳資訊中的進度為準
+    save_resume_state(part_path, {'preallocated': True, 'bytes_written': 300})
+    assert partial_size(part_path) == 300
+    save_resume_state(part_path, {'segments': [[0, 499, 100], [500, 999, 50]], 'bytes_written': 0})
+    assert partial_size(part_path) == 150
+    assert read_resume_state(part_path)['bytes_written'] == 0
+
+def download_from(engine_name, output, url):
+    """以指定的引擎從 url 下載一次 (不重試)，回傳 SHA-256"""
+    filepath = os.path.join(output, 'a.zip')
+    if engine_name == 'thread':
+        engine = MangaDownloader(url, 1, 1, output, 1, index_path=os.path.join(output, 'index.sqlite3'),
+                                 segment_count=1, **ENGINE_OPTIONS)
+        return engine.download_from(url, filepath, 'a', 'download_a', [url])
+    
+    aiohttp = pytest.importorskip('aiohttp')
+    engine = AsyncDownloadEngine(url, 1, 1, output, 1, index_path=os.path.join(output, 'index.sqlite3'),
+                                 **ENGINE_OPTIONS)
+    
+    async def run():
+        async with aiohttp.ClientSession() as engine.session:
+            return await engine.download_from(url, filepath, 'a', 'download_a', [url])
+    return asyncio.run(run())
+
+def write_part(output, url, content):
+    part_path = os.path.join(output, 'a.zip.part')
+    with open(part_path, 'wb') as f:
+        f.write(content)
+    save_resume_state(part_path, {'url': url})
+    return part_path
+
+@pytest.mark.parametrize('engine_name', ['thread', 'async'])
+def test_resume_from_partial(engine_name, tmp_path, zip_server):
+    output = str(tmp_path)
+    write_part(output, zip_server.url, zip_server.data[:1000])
+    assert download_from(engine_name, output, zip_server.url)
+    assert zip_server.requests == ['bytes=1000-']
+    with open(os.path.join(output, 'a.zip'), 'rb') as f:
+        assert f.read() == zip_server.data
+
+@pytest.mark.parametrize('engine_name', ['thread', 'async'])
+def test_416_with_complete_partial_finishes_without_download(engine_name, tmp_path, zip_server):
+    output = str(tmp_path)
+    part_path = write_part(output, zip_server.url, zip_server.data)
+    assert download_from(engine_name, output, zip_server.url)
+    # 只發出一次續傳請求 (得到 416)，沒有重新下載整個檔案
+    assert zip_server.requests == [f'bytes={len(zip_server.data)}-']
+    assert not os.path.exists(part_path)
+    with open(os.path.join(output, 'a.zip'), 'rb') as f:
+        assert f.read() == zip_server.data
+
+@pytest.mark.parametrize('engine_name', ['thread', 'async'])
+def test_416_with_oversized_partial_discards_it(engine_name, tmp_path, zip_server):
+    output = str(tmp_path)
+    part_path = write_part(output, zip_server.url, zip_server.data + b'extra')
+    with pytest.raises(IOError):
+        download_from(engine_name, output, zip_server.url)
+    assert not os.path.exists(part_path)
+    assert not os.path.exists(f"{part_path}.json")
+
+@pytest.mark.parametrize('engine_name', ['thread', 'async'])
+def test_resume_segmented_partial(engine_name, tmp_path, zip_server):
+    output = str(tmp_path)
+    size = len(zip_server.data)
+    middle = size // 2
+    # 執行緒版引擎分段下載到一半：第一段寫了 1000 位元組，第二段還沒開始
+    part_path = write_part(output, zip_server.url, zip_server.data[:1000] + b'\0' * (size - 1000))
+    save_resume_state(part_path, {'url': zip_server.url, 'total_size': size, 'bytes_written': 1000,
+                                  'segments': [[0, middle - 1, 1000], [middle, size - 1, 0]]})
+    assert download_from(engine_name, output, zip_server.url)
+    assert sorted(zip_server.requests) == [f'bytes=1000-{middle - 1}', f'bytes={middle}-{size - 1}']
+    with open(os.path.join(output, 'a.zip'), 'rb') as f:
+        assert f.read() == zip_server.data
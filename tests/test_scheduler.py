@@ -0,0 +1,72 @@
+import pytest
+
+from downloader_core import DownloadJob
+from scheduler import JobQueue
+
+def make_job(name, size=None, tags=None, group=0):
+    return DownloadJob(f"https://example.com/{name}", name, f"/tmp/{name}.zip", [f"https://a/{name}.zip"],
+                       size=size, tags=tags, group=group)
+
+def drain(queue):
+    names = []
+    while len(queue):
+        job = queue.pop()
+        names.append(job.title)
+        queue.release(job)
+    return names
+
+def test_smallest_first():
+    queue = JobQueue('smallest', max_inflight_bytes=None)
+    for name, size in [('large', 300), ('small', 10), ('medium', 100)]:
+        queue.push(make_job(name, size))
+    assert drain(queue) == ['small', 'medium', 'large']
+
+def test_unknown_size_uses_the_average_of_known_sizes():
+    queue = JobQueue('smallest', max_inflight_bytes=None)
+    queue.push(make_job('a', 100))
+    queue.push(make_job('b', 300))
+    unknown = make_job('unknown')
+    assert queue.estimate(unknown) == 200
+    queue.push(unknown)
+    queue.push(make_job('c', 250))
+    assert drain(queue) == ['a', 'unknown', 'c', 'b']
+
+def test_fair_takes_turns_between_listing_pages():
+    queue = JobQueue('fair', max_inflight_bytes=None)
+    for name in ['1a', '1b', '1c']:
+        queue.push(make_job(name, group=1))
+    for name in ['2a', '2b']:
+        queue.push(make_job(name, group=2))
+    assert drain(queue) == ['1a', '2a', '1b', '2b', '1c']
+
+def test_fifo_keeps_order():
+    queue = JobQueue('fifo', max_inflight_bytes=None)
+    for name, size in [('c', 3), ('a', 1), ('b', 2)]:
+        queue.push(make_job(name, size))
+    assert drain(queue) == ['c', 'a', 'b']
+
+@pytest.mark.parametrize('order', ['smallest', 'fair', 'fifo'])
+def test_preferred_tags_go_first(order):
+    queue = JobQueue(order, max_inflight_bytes=None, prefer_tags=['favourite'])
+    queue.push(make_job('plain', 1))
+    queue.push(make_job('tagged', 500, tags=['other', 'favourite']))
+    assert drain(queue) == ['tagged', 'plain']
+
+def test_inflight_cap_holds_jobs_until_bytes_are_released():
+    queue = JobQueue('smallest', max_inflight_bytes=150)
+    for name, size in [('a', 100), ('b', 100), ('huge', 1000)]:
+        queue.push(make_job(name, size))
+    first = queue.pop()
+    assert first.title == 'a'
+    assert queue.pop() is None          # 100 + 100 超過上限
+    queue.release(first)
+    second = queue.pop()
+    assert second.title == 'b'
+    queue.release(second)
+    # 沒有任何傳輸時，超過上限的大檔也會交出
+    assert queue.pop().title == 'huge'
+    assert queue.inflight_bytes == 1000
+
+def test_unknown_order_is_rejected():
+    with pytest.raises(ValueError):
+        JobQueue('random')
@@ -0,0 +1,85 @@
+import errno
+import os
+import time
+
+# 每次讀取的區塊大小：從 MIN_CHUNK_SIZE 開始，讀取很快就加倍、很慢就減半，
+# 高速連線時每個區塊的 Python 開銷攤到 MB 級的資料上，慢速連線時仍能及時取消與切換鏡像
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.1
+
+# 下載進度的回報間隔 (秒)：寫入迴圈只累加位元組數，不必每個區塊都組字串、發訊號
+PROGRESS_INTERVAL = 0.25
+
+class AdaptiveChunkSize:
+    """依每次讀取花費的時間調整下一次讀取的大小"""
+    
+    def __init__(self, minimum=MIN_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE, target=CHUNK_TARGET_SECONDS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self.size = minimum
+    
+    def update(self, read_size, seconds):
+        if read_size >= self.size and seconds < self.target / 2:
+            self.size = min(self.size * 2, self.maximum)
+        elif seconds > self.target * 2:
+            self.size = max(self.size // 2, self.minimum)
+
+def iter_response_chunks(response, limit=None):
+    """以 readinto 把 requests 串流回應讀進可重複使用的緩衝區，逐塊產生 memoryview
+    
+    產生的 memoryview 在下一次讀取時就會被覆寫，呼叫端必須在迭代下一塊之前用完 (寫檔、計算雜湊)。
+    limit 為最多讀取的位元組數 (分段下載的範圍)。伺服器壓縮了內容時改用 iter_content 解壓縮。
+    """
+    if response.headers.get('Content-Encoding', 'identity').lower() not in ('', 'identity'):
+        for chunk in response.iter_content(chunk_size=MIN_CHUNK_SIZE):
+            yield memoryview(chunk)
+        return
+    
+    chunk_size = AdaptiveChunkSize()
+    buffer = memoryview(bytearray(chunk_size.size))
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size.size if remaining is None else min(chunk_size.size, remaining)
+        if len(buffer) < size:
+            buffer = memoryview(bytearray(size))
+        start = time.perf_counter()
+        count = response.raw.readinto(buffer[:size])
+        if not count:
+            return
+        chunk_size.update(count, time.perf_counter() - start)
+        if remaining is not None:
+            remaining -= count
+        yield buffer[:count]
+
+class ProgressThrottle:
+    """限制進度回報頻率：update() 只比較時間，距離上次回報超過 interval 秒才呼叫 report(已完成位元組數)"""
+    
+    def __init__(self, report, interval=PROGRESS_INTERVAL):
+        self.report = report
+        self.interval = interval
+        self.next_time = 0.0
+    
+    def update(self, done):
+        now = time.monotonic()
+        if now >= self.next_time:
+            self.next_time = now + self.interval
+            self.report(done)
+
+def preallocate(f, size):
+    """預先配置檔案空間 (減少碎片、提早發現磁碟空間不足)；不支援 posix_fallocate 時改為設定檔案大小"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            # 部分檔案系統不支援 (EOPNOTSUPP、EINVAL)
+    f.truncate(size)
+
+def fsync_file(path):
+    """把檔案內容寫入磁碟 (改名為正式檔名之前呼叫，斷電後不會留下內容不完整的 zip)"""
+    with open(path, 'r+b') as f:
+        os.fsync(f.fileno())